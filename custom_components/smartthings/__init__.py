@@ -2,44 +2,89 @@
 from __future__ import annotations
 
 import asyncio
-from collections.abc import Iterable
+from collections import Counter, defaultdict
+from collections.abc import Awaitable, Callable, Iterable, Mapping
+from functools import partial
 from http import HTTPStatus
+from itertools import count
 import logging
+from time import monotonic
+from typing import Any, TypeVar
 
-from aiohttp.client_exceptions import ClientConnectionError, ClientResponseError
-from pysmartapp.event import EVENT_TYPE_DEVICE
+from aiohttp.client_exceptions import (
+    ClientConnectionError,
+    ClientError,
+    ClientResponseError,
+)
 from pysmartthings import APIInvalidGrant, Attribute, Capability, DeviceEntity, SmartThings
+from pysmartthings.api import Api
+from pysmartthings.device import Status
 
 from homeassistant.config_entries import SOURCE_IMPORT, ConfigEntry
 from homeassistant.const import CONF_ACCESS_TOKEN, CONF_CLIENT_ID, CONF_CLIENT_SECRET
-from homeassistant.core import HomeAssistant
+from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant, callback
 from homeassistant.exceptions import (
     ConfigEntryAuthFailed,
     ConfigEntryError,
     ConfigEntryNotReady,
 )
-from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers import config_validation as cv, entity_registry as er
 from homeassistant.helpers.aiohttp_client import async_get_clientsession
-from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.debounce import Debouncer
 from homeassistant.helpers.event import async_track_time_interval
 from homeassistant.helpers.typing import ConfigType
 from homeassistant.loader import async_get_loaded_integration
 from homeassistant.setup import SetupPhases, async_pause_setup
 
+from .commands import CommandBatcher
 from .const import (
+    COMMAND_CONFIRMATION_TIMEOUT,
+    COMPONENT_STATUS_URL,
+    API_PREWARM_CONNECTIONS,
     CONF_APP_ID,
+    CONF_CAPTURE_TRAFFIC,
+    CONF_HIGH_PRIORITY_CAPABILITIES,
+    CONF_INGESTION_SIDECAR,
     CONF_INSTALLED_APP_ID,
     CONF_LOCATION_ID,
+    CONF_LOW_PRIORITY_CAPABILITIES,
+    CONF_OFFLOAD_VERIFICATION,
+    CONF_OPTIMISTIC_COMMANDS,
     CONF_REFRESH_TOKEN,
+    CONF_SIDECAR_HOST,
+    CONF_SIDECAR_PORT,
+    CONF_TRANSPORT,
     DATA_BROKERS,
+    DATA_CIRCUIT_BREAKERS,
+    DATA_EVENT_ROUTER,
     DATA_MANAGER,
+    DATA_SETUP_STAGES,
+    DATA_SIGNATURE_VERIFIER,
+    DEFAULT_HIGH_PRIORITY_CAPABILITIES,
+    DEFAULT_LOW_PRIORITY_CAPABILITIES,
+    DEFAULT_SIDECAR_HOST,
+    DEFAULT_SIDECAR_PORT,
+    DEFAULT_TRANSPORT,
+    DEVICE_STATUS_OFFLINE,
     DOMAIN,
+    EVENT_ID_CACHE_SIZE,
+    EVENT_ID_CACHE_TTL,
     PLATFORMS,
-    SIGNAL_SMARTTHINGS_BUTTON,
-    SIGNAL_SMARTTHINGS_UPDATE,
+    SUBSCRIPTION_SYNC_COOLDOWN,
     TOKEN_REFRESH_INTERVAL,
+    CustomAttribute,
+    CustomCapability,
+    EventPriority,
+    EventTransport,
 )
+from .ingest import DeviceEvent, EventIdCache
+from .lock_codes import LockCodeIndex
 from .smartapp import (
+    ATTRIBUTE_ALL,
+    async_start_capture,
+    async_start_sidecar,
+    async_stop_capture,
+    async_stop_sidecar,
     format_unique_id,
     setup_smartapp,
     setup_smartapp_endpoint,
@@ -48,15 +93,22 @@ from .smartapp import (
     validate_installed_app,
     validate_webhook_requirements,
 )
+from .resilience import CircuitOpenError, SetupStages
+from .services import async_setup_services
+from .session import async_close_api_session, async_get_api_session
+from .stream import SmartThingsEventStream
 
 _LOGGER = logging.getLogger(__name__)
 
+_T = TypeVar("_T")
+
 CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
 
 
 async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
     """Initialize the SmartThings platform."""
     await setup_smartapp_endpoint(hass, False)
+    async_setup_services(hass)
     return True
 
 
@@ -92,14 +144,23 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
             ),
         )
 
-    if not validate_webhook_requirements(hass):
+    transport = entry.options.get(CONF_TRANSPORT, DEFAULT_TRANSPORT)
+    # The event stream does not need Home Assistant to be reachable
+    if transport != EventTransport.STREAM and not validate_webhook_requirements(
+        hass
+    ):
         _LOGGER.warning(
             "The 'base_url' of the 'http' integration must be configured and start with"
             " 'https://'"
         )
         return False
 
-    api = SmartThings(async_get_clientsession(hass), entry.data[CONF_ACCESS_TOKEN])
+    api_session = async_get_api_session(hass)
+    api = SmartThings(api_session.session, entry.data[CONF_ACCESS_TOKEN])
+    # Results of the calls below are kept when setup is retried
+    stages = hass.data[DOMAIN][DATA_SETUP_STAGES].setdefault(
+        entry.entry_id, SetupStages(hass.data[DOMAIN][DATA_CIRCUIT_BREAKERS])
+    )
 
     # Ensure platform modules are loaded since the DeviceBroker will
     # import them below and we want them to be cached ahead of time
@@ -108,42 +169,76 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
     await async_get_loaded_integration(hass, DOMAIN).async_get_platforms(PLATFORMS)
 
     try:
+        # Open connections for the device status requests while the
+        # requests before them run
+        prewarm = hass.async_create_task(
+            api_session.async_prewarm(API_PREWARM_CONNECTIONS)
+        )
         # See if the app is already setup. This occurs when there are
         # installs in multiple SmartThings locations (valid use-case)
         manager = hass.data[DOMAIN][DATA_MANAGER]
         smart_app = manager.smartapps.get(entry.data[CONF_APP_ID])
         if not smart_app:
             # Validate and setup the app.
-            app = await api.app(entry.data[CONF_APP_ID])
+            app = await stages.async_run(
+                "app", "apps", partial(api.app, entry.data[CONF_APP_ID])
+            )
             smart_app = setup_smartapp(hass, app)
 
         # Validate and retrieve the installed app.
-        installed_app = await validate_installed_app(
-            api, entry.data[CONF_INSTALLED_APP_ID]
+        installed_app = await stages.async_run(
+            "installed_app",
+            "installedapps",
+            partial(validate_installed_app, api, entry.data[CONF_INSTALLED_APP_ID]),
         )
 
         # Get rooms
-        rooms = await api.rooms(location_id=entry.data[CONF_LOCATION_ID])
+        rooms = await stages.async_run(
+            "rooms",
+            "locations",
+            partial(api.rooms, location_id=entry.data[CONF_LOCATION_ID]),
+        )
 
         # Get scenes
-        scenes = await async_get_entry_scenes(entry, api)
+        scenes = await stages.async_run(
+            "scenes", "scenes", partial(async_get_entry_scenes, entry, api)
+        )
 
         # Get SmartApp token to sync subscriptions
-        token = await api.generate_tokens(
-            entry.data[CONF_CLIENT_ID],
-            entry.data[CONF_CLIENT_SECRET],
-            entry.data[CONF_REFRESH_TOKEN],
+        token = await stages.async_run(
+            "token",
+            "oauth",
+            partial(
+                api.generate_tokens,
+                entry.data[CONF_CLIENT_ID],
+                entry.data[CONF_CLIENT_SECRET],
+                entry.data[CONF_REFRESH_TOKEN],
+            ),
         )
         hass.config_entries.async_update_entry(
             entry, data={**entry.data, CONF_REFRESH_TOKEN: token.refresh_token}
         )
 
         # Get devices and their current status
-        devices = await api.devices(location_ids=[installed_app.location_id])
+        devices = list(
+            await stages.async_run(
+                "devices",
+                "devices",
+                partial(api.devices, location_ids=[installed_app.location_id]),
+            )
+        )
+        await prewarm
+        status_api = Api(api_session.session, entry.data[CONF_ACCESS_TOKEN])
 
         async def retrieve_device_status(device):
             try:
-                await device.status.refresh()
+                if data := await stages.async_run(
+                    f"status {device.device_id}",
+                    "devices",
+                    partial(status_api.get_device_status, device.device_id),
+                    keep=False,
+                ):
+                    device.status.apply_data(data)
             except ClientResponseError:
                 _LOGGER.debug(
                     (
@@ -159,6 +254,13 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
         await asyncio.gather(*(retrieve_device_status(d) for d in devices.copy()))
         # Custom Component >>
         for device in devices:
+            # Leave out the capabilities the device reports as disabled
+            if "custom.disabledCapabilities" in device.capabilities and (
+                disabled := device.status.attributes["disabledCapabilities"].value
+            ):
+                for capability in disabled:
+                    if capability in device.capabilities:
+                        device.capabilities.remove(capability)
             _LOGGER.debug(
                 "Adding device:\n - name: %s\n - components: %s\n - capabilities: %s",
                 device.label,
@@ -167,15 +269,6 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
             )
         # Custom Component <<
 
-        # Sync device subscriptions
-        await smartapp_sync_subscriptions(
-            hass,
-            token.access_token,
-            installed_app.location_id,
-            installed_app.installed_app_id,
-            devices,
-        )
-
         # Setup device broker
         with async_pause_setup(hass, SetupPhases.WAIT_IMPORT_PLATFORMS):
             # DeviceBroker has a side effect of importing platform
@@ -186,6 +279,7 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
             )
         broker.connect()
         hass.data[DOMAIN][DATA_BROKERS][entry.entry_id] = broker
+        hass.data[DOMAIN][DATA_SETUP_STAGES].pop(entry.entry_id)
 
     except APIInvalidGrant as ex:
         raise ConfigEntryAuthFailed from ex
@@ -196,14 +290,50 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
             ) from ex
         _LOGGER.debug(ex, exc_info=True)
         raise ConfigEntryNotReady from ex
-    except (ClientConnectionError, RuntimeWarning) as ex:
+    except (
+        CircuitOpenError,
+        ClientConnectionError,
+        RuntimeWarning,
+        TimeoutError,
+    ) as ex:
         _LOGGER.debug(ex, exc_info=True)
         raise ConfigEntryNotReady from ex
+    finally:
+        # A failed setup does not wait for the connections it opened
+        if not prewarm.done():
+            prewarm.cancel()
+
+    if entry.options.get(CONF_CAPTURE_TRAFFIC):
+        await async_start_capture(hass)
+    if entry.options.get(CONF_OFFLOAD_VERIFICATION):
+        hass.data[DOMAIN][DATA_SIGNATURE_VERIFIER].offload = True
+    if entry.options.get(CONF_INGESTION_SIDECAR):
+        await async_start_sidecar(
+            hass,
+            entry.options.get(CONF_SIDECAR_HOST, DEFAULT_SIDECAR_HOST),
+            entry.options.get(CONF_SIDECAR_PORT, DEFAULT_SIDECAR_PORT),
+        )
 
+    entry.async_on_unload(entry.add_update_listener(async_update_options))
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+
+    # Sync the webhook subscriptions to what the created entities use
+    await broker.async_sync_subscriptions()
     return True
 
 
+async def async_update_options(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Reload the config entry when its options change.
+
+    Listeners are also called when the entry data changes, such as after
+    every token refresh, which must not reload the entry.
+    """
+    broker = hass.data[DOMAIN][DATA_BROKERS].get(entry.entry_id)
+    if broker and broker.options == entry.options:
+        return
+    await hass.config_entries.async_reload(entry.entry_id)
+
+
 async def async_get_entry_scenes(entry: ConfigEntry, api):
     """Get the scenes within an integration."""
     try:
@@ -224,15 +354,41 @@ async def async_get_entry_scenes(entry: ConfigEntry, api):
 
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
+    # Entities still send commands and drop registrations while unloading,
+    # so only tear down the broker and the shared resources afterwards
+    if not await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
+        return False
+
     broker = hass.data[DOMAIN][DATA_BROKERS].pop(entry.entry_id, None)
     if broker:
-        broker.disconnect()
+        await broker.async_disconnect()
 
-    return await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
+    # Stop the ingestion sidecar once no loaded entry uses it anymore
+    if not _any_loaded_entry_option(hass, CONF_INGESTION_SIDECAR):
+        await async_stop_sidecar(hass)
+    # Same for the traffic capture and the verification offload
+    if not _any_loaded_entry_option(hass, CONF_CAPTURE_TRAFFIC):
+        await async_stop_capture(hass)
+    hass.data[DOMAIN][DATA_SIGNATURE_VERIFIER].offload = _any_loaded_entry_option(
+        hass, CONF_OFFLOAD_VERIFICATION
+    )
+    if not hass.data[DOMAIN][DATA_BROKERS]:
+        await async_close_api_session(hass)
+
+    return True
+
+
+def _any_loaded_entry_option(hass: HomeAssistant, option: str) -> bool:
+    """Return true if a loaded config entry enables an option."""
+    return any(
+        hass.config_entries.async_get_entry(entry_id).options.get(option)
+        for entry_id in hass.data[DOMAIN][DATA_BROKERS]
+    )
 
 
 async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
     """Perform clean-up when entry is being removed."""
+    hass.data.get(DOMAIN, {}).get(DATA_SETUP_STAGES, {}).pop(entry.entry_id, None)
     api = SmartThings(async_get_clientsession(hass), entry.data[CONF_ACCESS_TOKEN])
 
     # Remove the installed_app, which if already removed raises a HTTPStatus.FORBIDDEN error.
@@ -294,15 +450,265 @@ class DeviceBroker:
         """Create a new instance of the DeviceBroker."""
         self._hass = hass
         self._entry = entry
+        # The options the broker was set up with
+        self.options = dict(entry.options)
         self._installed_app_id = entry.data[CONF_INSTALLED_APP_ID]
         self._smart_app = smart_app
         self._token = token
-        self._event_disconnect = None
+        self._event_priorities = {
+            **{
+                capability: EventPriority.LOW
+                for capability in entry.options.get(
+                    CONF_LOW_PRIORITY_CAPABILITIES, DEFAULT_LOW_PRIORITY_CAPABILITIES
+                )
+            },
+            **{
+                capability: EventPriority.HIGH
+                for capability in entry.options.get(
+                    CONF_HIGH_PRIORITY_CAPABILITIES, DEFAULT_HIGH_PRIORITY_CAPABILITIES
+                )
+            },
+        }
+        self._seen_events = EventIdCache(
+            EVENT_ID_CACHE_SIZE, EVENT_ID_CACHE_TTL.total_seconds()
+        )
+        self._last_event_times: dict[tuple[str, str, str, str], float] = {}
+        # Events of less important devices wait for the loop to run once
+        self._pending_events: dict[str, list[DeviceEvent]] = {}
+        self._pending_events_handle: asyncio.Handle | None = None
+        self.stats: Counter[str] = Counter()
         self._regenerate_token_remove = None
+        self._token_lock = asyncio.Lock()
+        self._reauth_started = False
+        self._event_stream: SmartThingsEventStream | None = None
+        self._api: Api | None = None
+        self.commands: CommandBatcher | None = None
+        self._confirmations: dict[
+            tuple[str, str, str], tuple[float, asyncio.TimerHandle]
+        ] = {}
+        self._reconciling: set[tuple[str, str]] = set()
+        self.optimistic_commands = entry.options.get(CONF_OPTIMISTIC_COMMANDS, False)
+        self._optimistic_values: dict[tuple[str, str, str], tuple[int, Any]] = {}
+        self._optimistic_tokens = count(1)
+        self._transport = entry.options.get(CONF_TRANSPORT, DEFAULT_TRANSPORT)
+        self._subscriptions: defaultdict[
+            str | None, Counter[tuple[str, str]]
+        ] = defaultdict(Counter)
+        self._subscriptions_ready = False
+        self._synced_targets: dict[str, set[str]] | None = None
+        self._subscription_debouncer = Debouncer(
+            hass,
+            _LOGGER,
+            cooldown=SUBSCRIPTION_SYNC_COOLDOWN,
+            immediate=False,
+            function=self.async_sync_subscriptions,
+        )
+        self._entity_registry_remove = None
         self.devices = {device.device_id: device for device in devices}
+        self.availability = {
+            device_id: device.status.attributes[
+                CustomAttribute.device_watch_device_status
+            ].value
+            != DEVICE_STATUS_OFFLINE
+            for device_id, device in self.devices.items()
+        }
+        self._health_subscription_remove = None
+        self._attribute_versions: dict[str, int] = {}
+        self._device_listeners: dict[tuple[str, bool], list[Callable[[], None]]] = {}
+        self.lock_codes = LockCodeIndex()
+        for device_id, device in self.devices.items():
+            if CustomCapability.lock_codes in device.capabilities:
+                lock_codes = device.status.attributes[CustomAttribute.lock_codes]
+                self.lock_codes.rebuild(device_id, lock_codes.value)
         self.rooms = {room.room_id: room for room in rooms}
         self.scenes = {scene.scene_id: scene for scene in scenes}
 
+    def get_attribute_version(self, device_id: str) -> int:
+        """Return the version of the attributes of the device."""
+        return self._attribute_versions.get(device_id, 0)
+
+    def bump_attribute_version(self, device_id: str) -> None:
+        """Mark the attributes of the device as changed."""
+        self._attribute_versions[device_id] = (
+            self._attribute_versions.get(device_id, 0) + 1
+        )
+
+    def _get_component_status(self, device_id: str, component_id: str):
+        """Return the status of a component of a device."""
+        status = self.devices[device_id].status
+        if component_id != "main":
+            status = status.components[component_id]
+        return status
+
+    def get_confirmed_value(
+        self, device_id: str, component_id: str, attribute: str
+    ) -> Any:
+        """Return the last value of an attribute the device reported."""
+        if optimistic := self._optimistic_values.get(
+            (device_id, component_id, attribute)
+        ):
+            return optimistic[1].value
+        return self._get_component_status(device_id, component_id).attributes[
+            attribute
+        ].value
+
+    def is_pending(self, device_id: str, component_id: str, attribute: str) -> bool:
+        """Return true if an attribute holds a value the device did not report."""
+        return (device_id, component_id, attribute) in self._optimistic_values
+
+    def is_settled(self, device_id: str, component_id: str, attribute: str) -> bool:
+        """Return true if no command awaits the device to report an attribute."""
+        key = (device_id, component_id, attribute)
+        return key not in self._optimistic_values and key not in self._confirmations
+
+    @callback
+    def async_set_optimistic_value(
+        self, device_id: str, component_id: str, attribute: str, value: Any
+    ) -> int | None:
+        """Set an attribute to the value a command is expected to result in.
+
+        The reported value is kept to roll back to until the device reports
+        the attribute. Returns a token identifying this value to roll back,
+        or None when the value is the reported one.
+        """
+        key = (device_id, component_id, attribute)
+        attributes = self._get_component_status(device_id, component_id).attributes
+        confirmed = (
+            optimistic[1]
+            if (optimistic := self._optimistic_values.get(key))
+            else attributes[attribute]
+        )
+        token = None
+        if value == confirmed.value:
+            self._optimistic_values.pop(key, None)
+            attributes[attribute] = confirmed
+        else:
+            token = next(self._optimistic_tokens)
+            self._optimistic_values[key] = (token, confirmed)
+            attributes[attribute] = confirmed._replace(value=value)
+        self.bump_attribute_version(device_id)
+        self._async_notify_listeners(device_id, False)
+        return token
+
+    @callback
+    def async_rollback_optimistic_value(
+        self, device_id: str, component_id: str, attribute: str, token: int
+    ) -> None:
+        """Restore the reported value of an attribute after a failed command.
+
+        Nothing is restored when a later value replaced the one of the token
+        or the device reported the attribute since.
+        """
+        key = (device_id, component_id, attribute)
+        if (optimistic := self._optimistic_values.get(key)) is None or (
+            optimistic[0] != token
+        ):
+            return
+        del self._optimistic_values[key]
+        self._get_component_status(device_id, component_id).attributes[
+            attribute
+        ] = optimistic[1]
+        self.bump_attribute_version(device_id)
+        self._async_notify_listeners(device_id, False)
+
+    @callback
+    def async_track_confirmation(
+        self, device_id: str, component_id: str, attribute: str
+    ) -> None:
+        """Expect the device to report an attribute after a command.
+
+        When the device does not report it in time, the status of the
+        component is fetched again instead of the whole device status.
+        """
+        key = (device_id, component_id, attribute)
+        if tracked := self._confirmations.get(key):
+            tracked[1].cancel()
+        self._confirmations[key] = (
+            monotonic(),
+            self._hass.loop.call_later(
+                COMMAND_CONFIRMATION_TIMEOUT, self._async_confirmation_timeout, key
+            ),
+        )
+
+    def _confirm(self, key: tuple[str, str, str]) -> None:
+        """Stop waiting for the device to report an attribute."""
+        if tracked := self._confirmations.pop(key, None):
+            tracked[1].cancel()
+            self.stats["confirmed_commands"] += 1
+            self.stats["confirmation_ms"] += int((monotonic() - tracked[0]) * 1000)
+
+    @callback
+    def _async_confirmation_timeout(self, key: tuple[str, str, str]) -> None:
+        """Refresh the component of an attribute the device did not report."""
+        sent, _ = self._confirmations.pop(key)
+        device_id, component_id, attribute = key
+        self.stats["confirmation_timeouts"] += 1
+        if not self.is_available(device_id):
+            # The device reports its status once it is back online
+            self.stats["skipped_reconciliations"] += 1
+            return
+        if (device_id, component_id) in self._reconciling:
+            return
+        _LOGGER.debug(
+            "Device %s did not report %s of component %s, refreshing the component",
+            device_id,
+            attribute,
+            component_id,
+        )
+        self._reconciling.add((device_id, component_id))
+        self._hass.async_create_background_task(
+            self._async_reconcile_component(device_id, component_id, sent),
+            f"smartthings reconcile {device_id} {component_id}",
+        )
+
+    async def _async_reconcile_component(
+        self, device_id: str, component_id: str, sent: float
+    ) -> None:
+        """Replace the status of a component with the one of the API."""
+        start = monotonic()
+        try:
+            data = await self._api.get(
+                COMPONENT_STATUS_URL.format(
+                    device_id=device_id, component_id=component_id
+                )
+            )
+        except ClientError as err:
+            self.stats["failed_reconciliations"] += 1
+            _LOGGER.warning(
+                "Unable to refresh the status of component %s of device %s: %s",
+                component_id,
+                device_id,
+                err,
+            )
+            return
+        finally:
+            self._reconciling.discard((device_id, component_id))
+        attributes = self._get_component_status(device_id, component_id).attributes
+        for capability, values in data.items():
+            for attribute, value in values.items():
+                attributes[attribute] = Status(
+                    value.get("value"), value.get("unit"), value.get("data")
+                )
+                self._async_attribute_reported(
+                    device_id, component_id, capability, attribute, value.get("value")
+                )
+        self.prune_device_status(device_id)
+        self.bump_attribute_version(device_id)
+        self._async_notify_listeners(device_id, False)
+        self.stats["reconciliations"] += 1
+        self.stats["reconciliation_ms"] += int((monotonic() - start) * 1000)
+        _LOGGER.debug(
+            "Refreshed component %s of device %s %.1fs after the command in %.0f ms",
+            component_id,
+            device_id,
+            monotonic() - sent,
+            (monotonic() - start) * 1000,
+        )
+
+    def is_available(self, device_id: str) -> bool:
+        """Return false if the device is known to be offline."""
+        return self.availability.get(device_id, True)
+
     def get_capabilities(self, device: DeviceEntity):
         """Assign capabilities to devices."""
         capabilities = device.capabilities.copy()
@@ -317,49 +723,417 @@ class DeviceBroker:
         # Tokens expire in 30 days and once expired, cannot be recovered.
         async def regenerate_refresh_token(now):
             """Generate a new refresh token and update the config entry."""
-            await self._token.refresh(
-                self._entry.data[CONF_CLIENT_ID],
-                self._entry.data[CONF_CLIENT_SECRET],
-            )
-            self._hass.config_entries.async_update_entry(
-                self._entry,
-                data={
-                    **self._entry.data,
-                    CONF_REFRESH_TOKEN: self._token.refresh_token,
-                },
-            )
-            _LOGGER.debug(
-                "Regenerated refresh token for installed app: %s",
-                self._installed_app_id,
-            )
+            await self.async_refresh_token()
 
         self._regenerate_token_remove = async_track_time_interval(
             self._hass, regenerate_refresh_token, TOKEN_REFRESH_INTERVAL
         )
 
-        # Connect handler to incoming device events
-        self._event_disconnect = self._smart_app.connect_event(self._event_handler)
+        # Send the commands of entities in batches per device
+        api_session = async_get_api_session(self._hass)
+        self._api = Api(api_session.session, self._entry.data[CONF_ACCESS_TOKEN])
+        self.commands = CommandBatcher(self._hass, self._api, self.stats)
+
+        # Route incoming device events of the installed app to this broker
+        self._hass.data[DOMAIN][DATA_EVENT_ROUTER][
+            self._installed_app_id
+        ] = self._event_handler
+
+        # Receive device events over the event stream
+        if self._transport in (EventTransport.STREAM, EventTransport.BOTH):
+            self._event_stream = SmartThingsEventStream(
+                self._hass,
+                api_session.stream_session,
+                self._entry.data[CONF_LOCATION_ID],
+                self._installed_app_id,
+                lambda: self._token.access_token,
+                self.async_refresh_token,
+                self._event_handler,
+            )
+            self._event_stream.start()
+
+        # Follow the health of all devices to drive their availability
+        self._health_subscription_remove = self.async_register_subscription(
+            {
+                CustomCapability.health_check: [
+                    CustomAttribute.device_watch_device_status
+                ]
+            }
+        )
+
+        # Follow entities of the entry being enabled or disabled
+        self._entity_registry_remove = self._hass.bus.async_listen(
+            er.EVENT_ENTITY_REGISTRY_UPDATED, self._async_entity_registry_updated
+        )
+
+    async def async_refresh_token(self, expired_token: str | None = None) -> None:
+        """Refresh the tokens of the installed app and update the config entry.
+
+        Refreshes are made one at a time. A caller that passes the access
+        token that was rejected returns right away when another caller
+        replaced it meanwhile, so requests failing together share a single
+        refresh. Reauthentication is started when the refresh is rejected.
+        """
+        async with self._token_lock:
+            if expired_token is not None and expired_token != self._token.access_token:
+                return
+            if self._reauth_started:
+                raise APIInvalidGrant(
+                    "Reauthentication of the installed app is required"
+                )
+            try:
+                await self._token.refresh(
+                    self._entry.data[CONF_CLIENT_ID],
+                    self._entry.data[CONF_CLIENT_SECRET],
+                )
+            except (APIInvalidGrant, ClientResponseError) as err:
+                if isinstance(err, ClientResponseError) and err.status not in (
+                    HTTPStatus.BAD_REQUEST,
+                    HTTPStatus.UNAUTHORIZED,
+                ):
+                    raise
+                self._reauth_started = True
+                _LOGGER.warning(
+                    "Unable to refresh the token of installed app %s, "
+                    "reauthentication is required",
+                    self._installed_app_id,
+                )
+                self._entry.async_start_reauth(self._hass)
+                raise
+            self.stats["token_refreshes"] += 1
+        self._hass.config_entries.async_update_entry(
+            self._entry,
+            data={
+                **self._entry.data,
+                CONF_REFRESH_TOKEN: self._token.refresh_token,
+            },
+        )
+        _LOGGER.debug(
+            "Regenerated refresh token for installed app: %s",
+            self._installed_app_id,
+        )
+
+    async def async_call_with_token(self, call: Callable[[str], Awaitable[_T]]) -> _T:
+        """Make a call with the access token of the installed app.
+
+        A call rejected with 401 waits for the shared token refresh and is
+        made once more with the new token. The 401 is raised when the token
+        cannot be refreshed.
+        """
+        token = self._token.access_token
+        try:
+            return await call(token)
+        except ClientResponseError as err:
+            if err.status != HTTPStatus.UNAUTHORIZED:
+                raise
+            try:
+                await self.async_refresh_token(token)
+            except (APIInvalidGrant, ClientError):
+                _LOGGER.debug("Unable to refresh the token", exc_info=True)
+                raise err from None
+        self.stats["token_retries"] += 1
+        return await call(self._token.access_token)
+
+    @callback
+    def async_register_subscription(
+        self, targets: Mapping[str, Iterable[str]], device_id: str | None = None
+    ) -> CALLBACK_TYPE:
+        """Register capability attributes that need to receive events.
+
+        Registrations for a device only let events of that device through,
+        otherwise events of all devices are. Returns a callback that removes
+        the registration again.
+        """
+        pairs = [
+            (capability, attribute)
+            for capability, attributes in targets.items()
+            for attribute in attributes
+        ]
+        self._subscriptions[device_id].update(pairs)
+        self._async_subscriptions_changed()
+        return partial(self._async_remove_subscription, device_id, pairs)
+
+    @callback
+    def _async_remove_subscription(
+        self, device_id: str | None, pairs: list[tuple[str, str]]
+    ) -> None:
+        """Remove a registration of capability attributes."""
+        subscriptions = self._subscriptions[device_id]
+        subscriptions.subtract(pairs)
+        for pair in pairs:
+            if subscriptions[pair] <= 0:
+                subscriptions.pop(pair, None)
+        if not subscriptions:
+            del self._subscriptions[device_id]
+        self._async_subscriptions_changed()
+
+    @callback
+    def async_add_device_listener(
+        self, device_id: str, listener: Callable[[], None], button: bool = False
+    ) -> CALLBACK_TYPE:
+        """Listen for updates of a device, or its button presses.
+
+        Listeners are kept per device so that an update only reaches the
+        entities of the updated device. Returns a callback that removes the
+        listener again.
+        """
+        key = (device_id, button)
+        self._device_listeners.setdefault(key, []).append(listener)
+        return partial(self._async_remove_device_listener, key, listener)
+
+    @callback
+    def _async_remove_device_listener(
+        self, key: tuple[str, bool], listener: Callable[[], None]
+    ) -> None:
+        """Remove a listener for updates of a device."""
+        listeners = self._device_listeners[key]
+        listeners.remove(listener)
+        if not listeners:
+            del self._device_listeners[key]
+
+    @callback
+    def _async_notify_listeners(self, device_id: str, button: bool) -> None:
+        """Call the listeners of a device."""
+        for listener in list(self._device_listeners.get((device_id, button), ())):
+            try:
+                listener()
+            except Exception:  # pylint: disable=broad-except
+                _LOGGER.exception("Error updating listener of device %s", device_id)
+
+    @callback
+    def _async_subscriptions_changed(self) -> None:
+        """Resync the subscriptions once registrations settle."""
+        if self._subscriptions_ready:
+            self._subscription_debouncer.async_schedule_call()
+
+    @callback
+    def _async_entity_registry_updated(self, event: Event) -> None:
+        """Resync the subscriptions when entities are enabled or disabled.
+
+        Disabled entities are removed and drop their registrations, enabled
+        ones register once the entry is reloaded.
+        """
+        if event.data["action"] != "update":
+            return
+        if "disabled_by" not in event.data.get("changes", {}):
+            return
+        registry_entry = er.async_get(self._hass).async_get(event.data["entity_id"])
+        if registry_entry and registry_entry.config_entry_id == self._entry.entry_id:
+            self._subscription_debouncer.async_schedule_call()
+
+    def _get_subscription_targets(self) -> dict[str, set[str]]:
+        """Return the attributes of each capability that are registered."""
+        targets: dict[str, set[str]] = {}
+        for subscriptions in self._subscriptions.values():
+            for capability, attribute in subscriptions:
+                targets.setdefault(capability, set()).add(attribute)
+        return targets
+
+    def _is_subscribed(self, evt: DeviceEvent) -> bool:
+        """Return true if anything registered the attribute of the event."""
+        if not self._subscriptions_ready:
+            return True
+        for device_id in (evt.device_id, None):
+            if (subscriptions := self._subscriptions.get(device_id)) and (
+                (evt.capability, evt.attribute) in subscriptions
+                or (evt.capability, ATTRIBUTE_ALL) in subscriptions
+            ):
+                return True
+        return False
+
+    def _get_retained_attributes(self, device_id: str) -> set[str] | None:
+        """Return the attributes of a device to keep, or None to keep all."""
+        retained: set[str] = set()
+        for subscriptions in (
+            self._subscriptions.get(device_id),
+            self._subscriptions.get(None),
+        ):
+            for _, attribute in subscriptions or ():
+                if attribute == ATTRIBUTE_ALL:
+                    return None
+                retained.add(attribute)
+        return retained
+
+    def prune_device_status(self, device_id: str) -> None:
+        """Drop the attributes of a device status that nothing registered.
+
+        The status of a device holds every attribute of every capability,
+        including large values such as supported value lists, while
+        entities only read the attributes they register. Events of other
+        attributes are dropped, so pruned attributes are not added back.
+        """
+        if (retained := self._get_retained_attributes(device_id)) is None:
+            return
+        status = self.devices[device_id].status
+        pruned = 0
+        for component in (status, *status.components.values()):
+            attributes = component.attributes
+            for attribute in [key for key in attributes if key not in retained]:
+                del attributes[attribute]
+                pruned += 1
+        self.stats["pruned_attributes"] += pruned
+
+    async def async_sync_subscriptions(self) -> None:
+        """Synchronize the subscriptions of the installed app."""
+        self._subscriptions_ready = True
+        # Registrations are complete, so keep only what they use
+        for device_id in self.devices:
+            self.prune_device_status(device_id)
+        targets = self._get_subscription_targets()
+        if self._transport == EventTransport.STREAM:
+            # Events arrive over the stream, so remove the webhook subscriptions
+            targets = {}
+        if targets == self._synced_targets:
+            return
+        try:
+            await self.async_call_with_token(
+                lambda token: smartapp_sync_subscriptions(
+                    self._hass,
+                    token,
+                    self._entry.data[CONF_LOCATION_ID],
+                    self._installed_app_id,
+                    targets,
+                )
+            )
+        except ClientError:
+            _LOGGER.exception(
+                "Unable to synchronize subscriptions for installed app: %s",
+                self._installed_app_id,
+            )
+        else:
+            self._synced_targets = targets
 
     def disconnect(self):
         """Disconnects handlers/listeners for device/lifecycle events."""
         if self._regenerate_token_remove:
             self._regenerate_token_remove()
-        if self._event_disconnect:
-            self._event_disconnect()
-
-    async def _event_handler(self, req, resp, app):
-        """Broker for incoming events."""
-        # Do not process events received from a different installed app
-        # under the same parent SmartApp (valid use-scenario)
-        if req.installed_app_id != self._installed_app_id:
-            return
+        if self._event_stream:
+            self._event_stream.stop()
+        if self._entity_registry_remove:
+            self._entity_registry_remove()
+        if self._health_subscription_remove:
+            self._health_subscription_remove()
+        # Registrations dropped from now on must not sync the subscriptions
+        self._subscriptions_ready = False
+        self._subscription_debouncer.async_shutdown()
+        for _, timer in self._confirmations.values():
+            timer.cancel()
+        self._confirmations.clear()
+        if self._pending_events_handle:
+            self._pending_events_handle.cancel()
+            self._pending_events_handle = None
+        self._pending_events.clear()
+        router = self._hass.data.get(DOMAIN, {}).get(DATA_EVENT_ROUTER, {})
+        if router.get(self._installed_app_id) == self._event_handler:
+            router.pop(self._installed_app_id)
+
+    async def async_disconnect(self) -> None:
+        """Disconnect and settle the commands that are being sent."""
+        self.disconnect()
+        if self.commands:
+            await self.commands.async_shutdown()
 
-        updated_buttons = set()
-        updated_devices = set()
-        for evt in req.events:
-            if evt.event_type != EVENT_TYPE_DEVICE:
+    def _event_priority(self, evt: DeviceEvent) -> EventPriority:
+        """Return the processing priority of an event."""
+        return self._event_priorities.get(evt.capability, EventPriority.NORMAL)
+
+    def _is_stale_event(self, evt: DeviceEvent) -> bool:
+        """Return true if a newer event was already applied to the attribute."""
+        if evt.event_time is None:
+            return False
+        key = (evt.device_id, evt.component_id, evt.capability, evt.attribute)
+        if (last := self._last_event_times.get(key)) is not None and (
+            evt.event_time < last
+        ):
+            return True
+        self._last_event_times[key] = evt.event_time
+        return False
+
+    @callback
+    def _event_handler(self, events: list[DeviceEvent]):
+        """Broker for incoming events of the installed app."""
+        for evt in events:
+            if evt.device_id not in self.devices:
                 continue
-            if not (device := self.devices.get(evt.device_id)):
+            if not self._is_subscribed(evt):
+                self.stats["unsubscribed_events"] += 1
+                continue
+            if self._seen_events.seen(evt.event_id):
+                self.stats["duplicate_events"] += 1
+                _LOGGER.debug("Dropped duplicate event: %s", evt.event_id)
+                continue
+            self._pending_events.setdefault(evt.device_id, []).append(evt)
+
+        if self._pending_events and not self._pending_events_handle:
+            self._async_process_pending_events()
+
+    @callback
+    def _async_process_pending_events(self) -> None:
+        """Update the devices with the most important events pending.
+
+        Devices with less important events are updated once the loop ran,
+        so the state changes of the others are handled first. The events
+        of each device are applied in the order they arrived, and events
+        arriving meanwhile join the events pending for their device.
+        """
+        self._pending_events_handle = None
+        priorities = {
+            device_id: min(map(self._event_priority, batch))
+            for device_id, batch in self._pending_events.items()
+        }
+        if not priorities:
+            return
+        priority = min(priorities.values())
+        for device_id, device_priority in priorities.items():
+            if device_priority == priority:
+                self._async_process_device_events(
+                    device_id, self._pending_events.pop(device_id)
+                )
+        if self._pending_events:
+            self._pending_events_handle = self._hass.loop.call_soon(
+                self._async_process_pending_events
+            )
+
+    @callback
+    def _async_attribute_reported(
+        self,
+        device_id: str,
+        component_id: str,
+        capability: str,
+        attribute: str,
+        value: Any,
+    ) -> None:
+        """Update what depends on an attribute the device reported.
+
+        Used for events as well as the status fetched when reconciling.
+        """
+        # The reported value settles any optimistic one
+        key = (device_id, component_id, attribute)
+        self._optimistic_values.pop(key, None)
+        self._confirm(key)
+        if (
+            capability == CustomCapability.health_check
+            and attribute == CustomAttribute.device_watch_device_status
+        ):
+            self.availability[device_id] = value != DEVICE_STATUS_OFFLINE
+        elif (
+            capability == CustomCapability.lock_codes
+            and attribute == CustomAttribute.lock_codes
+        ):
+            self.lock_codes.rebuild(device_id, value)
+
+    @callback
+    def _async_process_device_events(
+        self, device_id: str, events: list[DeviceEvent]
+    ):
+        """Apply the events of a single device in order."""
+        device = self.devices[device_id]
+        updated_button = False
+        updated_device = False
+        for evt in events:
+            if self._is_stale_event(evt):
+                self.stats["stale_events"] += 1
+                _LOGGER.debug("Dropped out-of-order event: %s", evt.event_id)
                 continue
             device.status.apply_attribute_update(
                 evt.component_id,
@@ -368,29 +1142,32 @@ class DeviceBroker:
                 evt.value,
                 data=evt.data,
             )
-
-            data = {
-                "location_id": evt.location_id,
-                "device_id": evt.device_id,
-                "component_id": evt.component_id,
-                "capability": evt.capability,
-                "attribute": evt.attribute,
-                "value": evt.value,
-                "data": evt.data,
-            }
-            if all(
-                [
-                    evt.capability == Capability.button,
-                    evt.attribute == Attribute.button,
-                ]
+            self.bump_attribute_version(device_id)
+            self._async_attribute_reported(
+                device_id, evt.component_id, evt.capability, evt.attribute, evt.value
+            )
+            if (
+                evt.capability == CustomCapability.lock_codes
+                and evt.attribute == CustomAttribute.code_changed
             ):
-                _LOGGER.debug("Button pressed: %s", data)
-                updated_buttons.add(device.device_id)
+                self.lock_codes.apply_change(device_id, evt.value, evt.data)
+
+            button = (
+                evt.capability == Capability.button
+                and evt.attribute == Attribute.button
+            )
+            if button:
+                updated_button = True
             else:
-                _LOGGER.debug("Update received: %s", data)
-                updated_devices.add(device.device_id)
+                updated_device = True
+            if _LOGGER.isEnabledFor(logging.DEBUG):
+                _LOGGER.debug(
+                    "%s: %s",
+                    "Button pressed" if button else "Update received",
+                    evt._asdict(),
+                )
 
-        if updated_buttons:
-            async_dispatcher_send(self._hass, SIGNAL_SMARTTHINGS_BUTTON, updated_buttons)
-        if updated_devices:
-            async_dispatcher_send(self._hass, SIGNAL_SMARTTHINGS_UPDATE, updated_devices)
+        if updated_button:
+            self._async_notify_listeners(device_id, True)
+        if updated_device:
+            self._async_notify_listeners(device_id, False)
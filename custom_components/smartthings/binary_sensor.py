@@ -25,7 +25,7 @@ from .const import (
 )
 from .entity import SmartThingsEntity
 
-@dataclass
+@dataclass(frozen=True, kw_only=True)
 class SmartThingsBinarySensorEntityDescription(BinarySensorEntityDescription):
     """Class to describe a SmartThings binary sensor entity."""
 
@@ -83,7 +83,7 @@ async def async_setup_entry(
                 for attribute in attributes:
                     entities.append(
                         SmartThingsBinarySensorEntity(
-                            device, capability, attribute, room,
+                            broker, device, capability, attribute, room,
                         )
                     )
 
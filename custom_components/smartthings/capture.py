@@ -0,0 +1,109 @@
+"""Capture of SmartApp webhook traffic for offline replay.
+
+Captured lifecycle payloads are written as gzip compressed NDJSON records
+with the time they were received and the request headers minus the
+signature. This module has no dependency on Home Assistant so that the
+replay tooling can read captures outside of it.
+"""
+from __future__ import annotations
+
+from collections.abc import Iterator, Mapping
+import gzip
+from pathlib import Path
+from threading import Lock
+from time import time
+from typing import Any
+
+from .ingest import json_dumps, json_loads
+
+# Headers that carry the signature of a request and are never captured
+STRIPPED_HEADERS = {"authorization"}
+
+
+class TrafficCapture:
+    """Write captured requests to a size bounded, rotated file.
+
+    Records are buffered in memory by record and handed out by
+    pop_pending on the event loop. write does the blocking I/O and is meant
+    to be run in an executor. Once the compressed file reaches the maximum
+    size it is rotated, keeping the given number of previous files.
+    """
+
+    def __init__(self, path: Path, max_bytes: int, backup_count: int) -> None:
+        """Create a new instance of the capture."""
+        self._path = path
+        self._max_bytes = max_bytes
+        self._backup_count = backup_count
+        self._pending: list[bytes] = []
+        self._lock = Lock()
+        self._raw = None
+        self._file: gzip.GzipFile | None = None
+
+    def record(self, headers: Mapping[str, str], payload: Any) -> None:
+        """Buffer a received request."""
+        record = {
+            "time": time(),
+            "headers": {
+                key: value
+                for key, value in headers.items()
+                if key.lower() not in STRIPPED_HEADERS
+            },
+            "payload": payload,
+        }
+        self._pending.append(json_dumps(record) + b"\n")
+
+    def pop_pending(self) -> list[bytes]:
+        """Return the buffered records and clear the buffer."""
+        pending, self._pending = self._pending, []
+        return pending
+
+    def write(self, lines: list[bytes]) -> None:
+        """Write records to the file."""
+        with self._lock:
+            for line in lines:
+                if self._file is None:
+                    self._open()
+                self._file.write(line)
+            if self._file is None:
+                return
+            self._file.flush()
+            if self._raw.tell() >= self._max_bytes:
+                self._close()
+                self._rotate()
+
+    def close(self, lines: list[bytes]) -> None:
+        """Write the last records and close the file."""
+        self.write(lines)
+        with self._lock:
+            self._close()
+
+    def _open(self) -> None:
+        if self._path.exists() and self._path.stat().st_size >= self._max_bytes:
+            self._rotate()
+        self._raw = self._path.open("ab")
+        self._file = gzip.GzipFile(fileobj=self._raw, mode="ab")
+
+    def _close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._raw.close()
+            self._file = self._raw = None
+
+    def _rotate(self) -> None:
+        for index in range(self._backup_count, 0, -1):
+            source = self._backup_path(index - 1) if index > 1 else self._path
+            if source.exists():
+                source.replace(self._backup_path(index))
+        if self._backup_count == 0:
+            self._path.unlink(missing_ok=True)
+
+    def _backup_path(self, index: int) -> Path:
+        return self._path.with_name(f"{self._path.name}.{index}")
+
+
+def read_capture(path: Path) -> Iterator[dict[str, Any]]:
+    """Yield the records of a capture file in the order they were received."""
+    with gzip.open(path, "rb") as file:
+        for line in file:
+            if line.strip():
+                yield json_loads(line)
@@ -0,0 +1,259 @@
+"""Batching and queueing of SmartThings device commands."""
+from __future__ import annotations
+
+import asyncio
+from collections import Counter
+from collections.abc import Coroutine, Sequence
+import logging
+from typing import Any
+
+from pysmartthings.api import API_DEVICE_COMMAND, Api
+
+from homeassistant.core import HomeAssistant, callback
+
+from .const import COMMAND_BATCH_DELAY, COMMAND_BATCH_MAX_SIZE, COMMAND_SHUTDOWN_TIMEOUT
+
+_LOGGER = logging.getLogger(__name__)
+
+COMMAND_SUCCESS_STATUSES = ("ACCEPTED", "COMPLETED")
+
+
+def _command_data(
+    component_id: str, capability: str, command: str, args: Sequence[Any] | None
+) -> dict[str, Any]:
+    """Return the request data of a command."""
+    data: dict[str, Any] = {
+        "component": component_id,
+        "capability": capability,
+        "command": command,
+    }
+    if args:
+        data["arguments"] = list(args)
+    return data
+
+
+class CommandBatcher:
+    """Send the commands issued to a device within a short delay together.
+
+    SmartThings executes a list of commands per device request, so commands
+    that entities of the same device issue at about the same time, such as
+    from a single automation, are collected and sent as one request. Each
+    caller receives the result of its own command.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        api: Api,
+        stats: Counter[str],
+        delay: float = COMMAND_BATCH_DELAY,
+        max_size: int = COMMAND_BATCH_MAX_SIZE,
+    ) -> None:
+        """Create a new instance of the batcher."""
+        self._hass = hass
+        self._api = api
+        self._stats = stats
+        self._delay = delay
+        self._max_size = max_size
+        self._pending: dict[str, list[tuple[dict[str, Any], asyncio.Future]]] = {}
+        self._timers: dict[str, asyncio.TimerHandle] = {}
+        self._in_flight: set[tuple[str, str, str]] = set()
+        self._latest: dict[
+            tuple[str, str, str], tuple[str, Sequence[Any] | None, asyncio.Future]
+        ] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    async def async_send(
+        self,
+        device_id: str,
+        component_id: str,
+        capability: str,
+        command: str,
+        args: Sequence[Any] | None = None,
+    ) -> bool:
+        """Queue a command for the device and return whether it succeeded."""
+        data = _command_data(component_id, capability, command, args)
+        future = self._hass.loop.create_future()
+        pending = self._pending.setdefault(device_id, [])
+        pending.append((data, future))
+        if len(pending) >= self._max_size:
+            self._async_flush(device_id)
+        elif device_id not in self._timers:
+            self._timers[device_id] = self._hass.loop.call_later(
+                self._delay, self._async_flush, device_id
+            )
+        return await future
+
+    async def async_send_now(
+        self,
+        device_id: str,
+        component_id: str,
+        capability: str,
+        command: str,
+        args: Sequence[Any] | None = None,
+    ) -> bool:
+        """Send a command in a request of its own and return whether it succeeded.
+
+        A rejected request fails every command in it, so commands that are
+        more likely to be invalid are kept out of the batches.
+        """
+        future = self._hass.loop.create_future()
+        await self._async_send_batch(
+            device_id,
+            [(_command_data(component_id, capability, command, args), future)],
+        )
+        return await future
+
+    async def async_send_latest(
+        self,
+        device_id: str,
+        component_id: str,
+        capability: str,
+        command: str,
+        args: Sequence[Any] | None = None,
+        *,
+        current: bool = False,
+    ) -> bool:
+        """Send a command where only the latest value of a burst matters.
+
+        Commands of slider-style controls are sent one at a time per device
+        component and capability. A command issued while another is in
+        flight waits and replaces any command already waiting, which then
+        returns false without being sent. A command is not sent at all when
+        nothing is in flight and current tells that the device already has
+        its value.
+        """
+        key = (device_id, component_id, capability)
+        if key not in self._in_flight:
+            if current:
+                self._stats["skipped_commands"] += 1
+                return True
+            self._in_flight.add(key)
+            return await self._async_send_in_flight(key, command, args)
+        if replaced := self._latest.pop(key, None):
+            self._stats["superseded_commands"] += 1
+            if not replaced[2].done():
+                replaced[2].set_result(False)
+        future = self._hass.loop.create_future()
+        self._latest[key] = (command, args, future)
+        return await future
+
+    async def _async_send_in_flight(
+        self,
+        key: tuple[str, str, str],
+        command: str,
+        args: Sequence[Any] | None,
+    ) -> bool:
+        """Send the in flight command of a key and then the one waiting."""
+        try:
+            return await self.async_send(*key, command, args)
+        finally:
+            if waiting := self._latest.pop(key, None):
+                self._async_create_task(
+                    self._async_send_waiting(key, *waiting),
+                    f"smartthings command {key[0]} {key[2]}",
+                )
+            else:
+                self._in_flight.discard(key)
+
+    async def _async_send_waiting(
+        self,
+        key: tuple[str, str, str],
+        command: str,
+        args: Sequence[Any] | None,
+        future: asyncio.Future,
+    ) -> None:
+        """Send a command that waited and hand out its result."""
+        try:
+            result = await self._async_send_in_flight(key, command, args)
+        except asyncio.CancelledError:
+            if not future.done():
+                future.set_result(False)
+            raise
+        except Exception as err:  # pylint: disable=broad-except
+            if not future.done():
+                future.set_exception(err)
+        else:
+            if not future.done():
+                future.set_result(result)
+
+    @callback
+    def _async_flush(self, device_id: str) -> None:
+        """Send the queued commands of the device."""
+        if timer := self._timers.pop(device_id, None):
+            timer.cancel()
+        if not (batch := self._pending.pop(device_id, None)):
+            return
+        self._async_create_task(
+            self._async_send_batch(device_id, batch),
+            f"smartthings commands {device_id}",
+        )
+
+    @callback
+    def _async_create_task(self, target: Coroutine[Any, Any, None], name: str) -> None:
+        """Run a send in the background until it is done or shut down."""
+        task = self._hass.async_create_background_task(target, name)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _async_send_batch(
+        self, device_id: str, batch: list[tuple[dict[str, Any], asyncio.Future]]
+    ) -> None:
+        """Send a batch of commands and hand out the results."""
+        self._stats["command_requests"] += 1
+        self._stats["commands"] += len(batch)
+        try:
+            response = await self._api.post(
+                API_DEVICE_COMMAND.format(device_id=device_id),
+                {"commands": [data for data, _ in batch]},
+            )
+        except asyncio.CancelledError:
+            for _, future in batch:
+                if not future.done():
+                    future.set_result(False)
+            raise
+        except Exception as err:  # pylint: disable=broad-except
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(err)
+            return
+        try:
+            results = response["results"]
+        except (KeyError, TypeError):
+            results = []
+        _LOGGER.debug(
+            "Sent %s commands to device %s: %s", len(batch), device_id, results
+        )
+        # Results are returned in the order of the commands
+        for index, (_, future) in enumerate(batch):
+            if future.done():
+                continue
+            try:
+                status = results[index]["status"]
+            except (IndexError, KeyError, TypeError):
+                status = None
+            future.set_result(status in COMMAND_SUCCESS_STATUSES)
+
+    async def async_shutdown(self) -> None:
+        """Send batched commands right away and drop waiting ones.
+
+        Commands being sent are given a short time to complete and are
+        cancelled after it. Commands that are dropped or cancelled return
+        false.
+        """
+        for device_id in list(self._pending):
+            self._async_flush(device_id)
+        for _, _, future in self._latest.values():
+            if not future.done():
+                future.set_result(False)
+        self._latest.clear()
+        self._in_flight.clear()
+        if not self._tasks:
+            return
+        _, pending = await asyncio.wait(
+            list(self._tasks), timeout=COMMAND_SHUTDOWN_TIMEOUT
+        )
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.wait(pending)
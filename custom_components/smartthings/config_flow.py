@@ -10,19 +10,59 @@ from pysmartthings import APIResponseError, AppOAuth, SmartThings
 from pysmartthings.installedapp import format_install_url
 import voluptuous as vol
 
-from homeassistant.config_entries import SOURCE_REAUTH, ConfigFlow, ConfigFlowResult
+from homeassistant.config_entries import (
+    SOURCE_REAUTH,
+    ConfigEntry,
+    ConfigFlow,
+    ConfigFlowResult,
+    OptionsFlow,
+)
 from homeassistant.const import CONF_ACCESS_TOKEN, CONF_CLIENT_ID, CONF_CLIENT_SECRET
+from homeassistant.core import callback
+from homeassistant.const import Platform, UnitOfTime
+from homeassistant.helpers import config_validation as cv, entity_registry as er
 from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.selector import (
+    EntitySelector,
+    EntitySelectorConfig,
+    NumberSelector,
+    NumberSelectorConfig,
+    NumberSelectorMode,
+    SelectSelector,
+    SelectSelectorConfig,
+    SelectSelectorMode,
+)
 
 from .const import (
     APP_OAUTH_CLIENT_NAME,
     APP_OAUTH_SCOPES,
     CONF_APP_ID,
+    CONF_CAPTURE_TRAFFIC,
+    CONF_DEADBAND,
+    CONF_HIGH_PRIORITY_CAPABILITIES,
+    CONF_INGESTION_SIDECAR,
     CONF_INSTALLED_APP_ID,
     CONF_LOCATION_ID,
+    CONF_LOW_PRIORITY_CAPABILITIES,
+    CONF_MAX_INTERVAL,
+    CONF_MIN_INTERVAL,
+    CONF_OFFLOAD_VERIFICATION,
+    CONF_OPTIMISTIC_COMMANDS,
     CONF_REFRESH_TOKEN,
+    CONF_RELATIVE_DEADBAND,
+    CONF_SIDECAR_HOST,
+    CONF_SIDECAR_PORT,
+    CONF_THROTTLED_SENSOR,
+    CONF_TRANSPORT,
+    DATA_BROKERS,
+    DEFAULT_HIGH_PRIORITY_CAPABILITIES,
+    DEFAULT_LOW_PRIORITY_CAPABILITIES,
+    DEFAULT_SIDECAR_HOST,
+    DEFAULT_SIDECAR_PORT,
+    DEFAULT_TRANSPORT,
     DOMAIN,
     VAL_UID_MATCHER,
+    EventTransport,
 )
 from .smartapp import (
     create_app,
@@ -37,6 +77,25 @@ from .smartapp import (
 
 _LOGGER = logging.getLogger(__name__)
 
+DEADBAND_SELECTOR = NumberSelector(
+    NumberSelectorConfig(min=0, step="any", mode=NumberSelectorMode.BOX)
+)
+INTERVAL_SELECTOR = NumberSelector(
+    NumberSelectorConfig(
+        min=0,
+        step="any",
+        unit_of_measurement=UnitOfTime.SECONDS,
+        mode=NumberSelectorMode.BOX,
+    )
+)
+# Throttle settings of sensors kept in their entity registry options
+THROTTLE_SETTINGS = {
+    CONF_DEADBAND: DEADBAND_SELECTOR,
+    CONF_RELATIVE_DEADBAND: DEADBAND_SELECTOR,
+    CONF_MIN_INTERVAL: INTERVAL_SELECTOR,
+    CONF_MAX_INTERVAL: INTERVAL_SELECTOR,
+}
+
 
 class SmartThingsFlowHandler(ConfigFlow, domain=DOMAIN):
     """Handle configuration of SmartThings integrations."""
@@ -56,6 +115,12 @@ class SmartThingsFlowHandler(ConfigFlow, domain=DOMAIN):
         self.refresh_token = None
         self.endpoints_initialized = False
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry: ConfigEntry) -> OptionsFlow:
+        """Get the options flow for this handler."""
+        return SmartThingsOptionsFlowHandler()
+
     async def async_step_import(self, import_data: None) -> ConfigFlowResult:
         """Occurs when a previously entry setup fails and is re-initiated."""
         return await self.async_step_user(import_data)
@@ -296,3 +361,132 @@ class SmartThingsFlowHandler(ConfigFlow, domain=DOMAIN):
         location = await self.api.location(data[CONF_LOCATION_ID])
 
         return self.async_create_entry(title=location.name, data=data)
+
+
+class SmartThingsOptionsFlowHandler(OptionsFlow):
+    """Handle options of SmartThings integrations."""
+
+    def __init__(self) -> None:
+        """Create a new instance of the options flow handler."""
+        self.options: dict[str, Any] = {}
+        self.sensor_entity_id: str | None = None
+
+    async def async_step_init(
+        self, user_input: dict[str, Any] | None = None
+    ) -> ConfigFlowResult:
+        """Manage the event processing options."""
+        if user_input is not None:
+            self.sensor_entity_id = user_input.pop(CONF_THROTTLED_SENSOR, None)
+            self.options = user_input
+            if self.sensor_entity_id:
+                return await self.async_step_sensor_throttling()
+            return self.async_create_entry(data=self.options)
+
+        options = self.config_entry.options
+        high = options.get(
+            CONF_HIGH_PRIORITY_CAPABILITIES, DEFAULT_HIGH_PRIORITY_CAPABILITIES
+        )
+        low = options.get(
+            CONF_LOW_PRIORITY_CAPABILITIES, DEFAULT_LOW_PRIORITY_CAPABILITIES
+        )
+        # Offer the capabilities of the devices in the location
+        capabilities = {*high, *low}
+        if broker := self.hass.data[DOMAIN][DATA_BROKERS].get(
+            self.config_entry.entry_id
+        ):
+            for device in broker.devices.values():
+                capabilities.update(broker.get_capabilities(device))
+        selector = SelectSelector(
+            SelectSelectorConfig(
+                options=sorted(capabilities),
+                multiple=True,
+                custom_value=True,
+                mode=SelectSelectorMode.DROPDOWN,
+            )
+        )
+
+        return self.async_show_form(
+            step_id="init",
+            data_schema=vol.Schema(
+                {
+                    vol.Optional(
+                        CONF_HIGH_PRIORITY_CAPABILITIES, default=list(high)
+                    ): selector,
+                    vol.Optional(
+                        CONF_LOW_PRIORITY_CAPABILITIES, default=list(low)
+                    ): selector,
+                    vol.Optional(
+                        CONF_TRANSPORT,
+                        default=options.get(CONF_TRANSPORT, DEFAULT_TRANSPORT),
+                    ): SelectSelector(
+                        SelectSelectorConfig(
+                            options=list(EventTransport),
+                            translation_key=CONF_TRANSPORT,
+                        )
+                    ),
+                    vol.Optional(
+                        CONF_INGESTION_SIDECAR,
+                        default=options.get(CONF_INGESTION_SIDECAR, False),
+                    ): bool,
+                    vol.Optional(
+                        CONF_SIDECAR_HOST,
+                        default=options.get(CONF_SIDECAR_HOST, DEFAULT_SIDECAR_HOST),
+                    ): cv.string,
+                    vol.Optional(
+                        CONF_SIDECAR_PORT,
+                        default=options.get(CONF_SIDECAR_PORT, DEFAULT_SIDECAR_PORT),
+                    ): cv.port,
+                    vol.Optional(
+                        CONF_CAPTURE_TRAFFIC,
+                        default=options.get(CONF_CAPTURE_TRAFFIC, False),
+                    ): bool,
+                    vol.Optional(
+                        CONF_OPTIMISTIC_COMMANDS,
+                        default=options.get(CONF_OPTIMISTIC_COMMANDS, False),
+                    ): bool,
+                    vol.Optional(
+                        CONF_OFFLOAD_VERIFICATION,
+                        default=options.get(CONF_OFFLOAD_VERIFICATION, False),
+                    ): bool,
+                    vol.Optional(CONF_THROTTLED_SENSOR): EntitySelector(
+                        EntitySelectorConfig(integration=DOMAIN, domain=Platform.SENSOR)
+                    ),
+                }
+            ),
+        )
+
+    async def async_step_sensor_throttling(
+        self, user_input: dict[str, Any] | None = None
+    ) -> ConfigFlowResult:
+        """Manage the throttle settings of a sensor.
+
+        The settings are kept in the entity registry options of the sensor
+        and override the ones of its description. Settings left empty use
+        the ones of the description again.
+        """
+        entity_registry = er.async_get(self.hass)
+        if user_input is not None:
+            entity_registry.async_update_entity_options(
+                self.sensor_entity_id,
+                DOMAIN,
+                {
+                    key: value
+                    for key, value in user_input.items()
+                    if key in THROTTLE_SETTINGS
+                },
+            )
+            return self.async_create_entry(data=self.options)
+
+        registry_entry = entity_registry.async_get(self.sensor_entity_id)
+        overrides = registry_entry.options.get(DOMAIN, {}) if registry_entry else {}
+        schema = vol.Schema(
+            {vol.Optional(key): selector for key, selector in THROTTLE_SETTINGS.items()}
+        )
+        return self.async_show_form(
+            step_id="sensor_throttling",
+            data_schema=self.add_suggested_values_to_schema(
+                schema,
+                {key: value for key, value in overrides.items() if value is not None},
+            ),
+            description_placeholders={"entity_id": self.sensor_entity_id},
+        )
@@ -1,8 +1,10 @@
 """Constants used by the SmartThings component and platforms."""
 from datetime import timedelta
-from enum import StrEnum
+from enum import IntEnum, StrEnum
 import re
 
+from pysmartthings import Capability
+
 from homeassistant.const import Platform
 
 DOMAIN = "smartthings"
@@ -12,26 +14,94 @@ APP_OAUTH_SCOPES = ["r:devices:*"]
 APP_NAME_PREFIX = "homeassistant."
 
 CONF_APP_ID = "app_id"
+CONF_CAPTURE_TRAFFIC = "capture_traffic"
 CONF_CLOUDHOOK_URL = "cloudhook_url"
+CONF_DEADBAND = "deadband"
+CONF_HIGH_PRIORITY_CAPABILITIES = "high_priority_capabilities"
+CONF_INGESTION_SIDECAR = "ingestion_sidecar"
 CONF_INSTALLED_APP_ID = "installed_app_id"
 CONF_INSTANCE_ID = "instance_id"
 CONF_LOCATION_ID = "location_id"
+CONF_LOW_PRIORITY_CAPABILITIES = "low_priority_capabilities"
+CONF_MAX_INTERVAL = "max_interval"
+CONF_MIN_INTERVAL = "min_interval"
+CONF_OFFLOAD_VERIFICATION = "offload_verification"
+CONF_OPTIMISTIC_COMMANDS = "optimistic_commands"
 CONF_REFRESH_TOKEN = "refresh_token"
+CONF_RELATIVE_DEADBAND = "relative_deadband"
+CONF_SIDECAR_HOST = "sidecar_host"
+CONF_SIDECAR_PORT = "sidecar_port"
+CONF_THROTTLED_SENSOR = "throttled_sensor"
+CONF_TRANSPORT = "transport"
 
+DATA_API_SESSION = "api_session"
 DATA_MANAGER = "manager"
 DATA_BROKERS = "brokers"
+DATA_CAPTURE = "capture"
+DATA_CAPTURE_REMOVE = "capture_remove"
+DATA_CIRCUIT_BREAKERS = "circuit_breakers"
+DATA_EVENT_ROUTER = "event_router"
+DATA_SIDECAR = "sidecar"
+DATA_SETUP_STAGES = "setup_stages"
+DATA_SIGNATURE_VERIFIER = "signature_verifier"
 
-SIGNAL_SMARTTHINGS_BUTTON = "smartthings_button"
-SIGNAL_SMARTTHINGS_UPDATE = "smartthings_update"
 SIGNAL_SMARTAPP_PREFIX = "smartthings_smartap_"
 
 SETTINGS_INSTANCE_ID = "hassInstanceId"
 
 SUBSCRIPTION_WARNING_LIMIT = 40
 
+# Value of the healthCheck device status of offline devices
+DEVICE_STATUS_OFFLINE = "offline"
+# Subscription changes within this time are synchronized together
+SUBSCRIPTION_SYNC_COOLDOWN = 10
+
+# Connections to the API, kept open for long and sized for the integration's
+# own concurrency, with connections opened ahead of the startup requests
+API_CONNECTION_LIMIT = 16
+API_DNS_CACHE_TTL = 300
+API_KEEPALIVE_TIMEOUT = 120
+API_PREWARM_CONNECTIONS = 8
+API_PREWARM_TIMEOUT = 10
+
+# Setup calls are retried with jittered exponential backoff, and calls to a
+# class of endpoints pause after consecutive failures. Results of successful
+# calls are kept for setup retries for a limited time.
+CIRCUIT_BREAKER_COOLDOWN = 60
+CIRCUIT_BREAKER_THRESHOLD = 5
+SETUP_RETRY_ATTEMPTS = 3
+SETUP_RETRY_BASE_DELAY = 1
+SETUP_RETRY_MAX_DELAY = 10
+SETUP_STAGE_TTL = 300
+
+# Components of commands the device did not confirm in this time are refreshed
+COMMAND_CONFIRMATION_TIMEOUT = 15
+COMPONENT_STATUS_URL = "devices/{device_id}/components/{component_id}/status"
+
+# Commands to a device within this time are sent in one request
+COMMAND_BATCH_DELAY = 0.01
+COMMAND_BATCH_MAX_SIZE = 10
+# Commands still being sent when the entry unloads are cancelled after this time
+COMMAND_SHUTDOWN_TIMEOUT = 5
+
+# Recently seen event ids, used to drop retried deliveries
+EVENT_ID_CACHE_SIZE = 4096
+EVENT_ID_CACHE_TTL = timedelta(minutes=10)
+
 STORAGE_KEY = DOMAIN
 STORAGE_VERSION = 1
 
+CAPTURE_BACKUP_COUNT = 5
+CAPTURE_FILE = f"{DOMAIN}_capture.ndjson.gz"
+CAPTURE_FLUSH_INTERVAL = timedelta(seconds=5)
+CAPTURE_MAX_BYTES = 10 * 1024 * 1024
+
+DEFAULT_SIDECAR_HOST = "127.0.0.1"
+DEFAULT_SIDECAR_PORT = 8124
+SIDECAR_CONFIG = f".{DOMAIN}_sidecar.json"
+SIDECAR_SCRIPT = "sidecar.py"
+SIDECAR_SOCKET = f".{DOMAIN}_sidecar.sock"
+
 # Ordered 'specific to least-specific platform' in order for capabilities
 # to be drawn-down and represented by the most appropriate platform.
 PLATFORMS = [
@@ -50,6 +120,16 @@ VAL_UID = "^(?:([0-9a-fA-F]{32})|([0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[
 VAL_UID_MATCHER = re.compile(VAL_UID)
 
 ATTRIBUTION =  "Data provided by SmartThings"
+ATTR_ARGUMENTS = "arguments"
+ATTR_CAPABILITY = "capability"
+ATTR_COMMAND = "command"
+ATTR_COMPONENT = "component"
+ATTR_PENDING = "pending"
+ATTR_ROOM = "room"
+
+SERVICE_SEND_COMMAND = "send_command"
+# Devices a bulk command is sent to at the same time
+BULK_COMMAND_CONCURRENCY = 10
 DEVICE_INFO_MAP = {
     "Button": ("Aeotec", "GP-AEOBTNUS"),
     "Dome Leak Sensor": ("Dome", "DMWS1"),
@@ -60,6 +140,25 @@ DEVICE_INFO_MAP = {
     "water-temp-battery-tempOffset": ("Aeotec", "GP-AEOWLSUS"),
 }
 
+class EventPriority(IntEnum):
+    """Define the order in which device events are processed."""
+
+    HIGH = 0
+    NORMAL = 1
+    LOW = 2
+
+
+class EventTransport(StrEnum):
+    """Define how device events are received from SmartThings."""
+
+    WEBHOOK = "webhook"
+    STREAM = "stream"
+    BOTH = "both"
+
+
+DEFAULT_TRANSPORT = EventTransport.WEBHOOK
+
+
 class CustomComponent(StrEnum):
     """Define custom components."""
 
@@ -73,13 +172,16 @@ class CustomCapability(StrEnum):
     health_check = "healthCheck"
     hood_fan_speed = "samsungce.hoodFanSpeed"
     lamp = "samsungce.lamp"
+    lock_codes = "lockCodes"
     
 
 class CustomAttribute(StrEnum):
     """Define custom attributes."""
 
     brightness_level = "brightnessLevel"
+    code_changed = "codeChanged"
     completion_time = "completionTime"
+    device_watch_device_status = "DeviceWatch-DeviceStatus"
     door_state = "doorState"
     hood_fan_speed = "hoodFanSpeed"
     lock_codes = "lockCodes"
@@ -87,3 +189,24 @@ class CustomAttribute(StrEnum):
     min_fan_speed = "settableMinFanSpeed"
     supported_brightness_level = "supportedBrightnessLevel"
     supported_hood_fan_speed = "supportedHoodFanSpeed"
+
+
+
+# Events of capabilities that are not listed are processed with normal priority
+DEFAULT_HIGH_PRIORITY_CAPABILITIES = [
+    Capability.button,
+    Capability.carbon_monoxide_detector,
+    Capability.lock,
+    Capability.smoke_detector,
+    Capability.tamper_alert,
+    Capability.water_sensor,
+    CustomCapability.door_state,
+]
+DEFAULT_LOW_PRIORITY_CAPABILITIES = [
+    Capability.battery,
+    Capability.energy_meter,
+    Capability.power_meter,
+    Capability.relative_humidity_measurement,
+    Capability.signal_strength,
+    Capability.temperature_measurement,
+]
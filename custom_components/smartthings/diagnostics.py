@@ -0,0 +1,69 @@
+"""Diagnostics support for SmartThings."""
+from __future__ import annotations
+
+import asyncio
+from typing import Any
+
+from aiohttp.client_exceptions import ClientError
+from pysmartthings.api import Api
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_ACCESS_TOKEN, CONF_CLIENT_ID, CONF_CLIENT_SECRET
+from homeassistant.core import HomeAssistant
+
+from .const import CONF_REFRESH_TOKEN, DATA_BROKERS, DOMAIN
+from .session import async_get_api_session
+
+TO_REDACT = {CONF_ACCESS_TOKEN, CONF_CLIENT_ID, CONF_CLIENT_SECRET, CONF_REFRESH_TOKEN}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry.
+
+    The broker only keeps the attributes that entities use, so the full
+    status of each device is fetched for the diagnostics.
+    """
+    broker = hass.data[DOMAIN][DATA_BROKERS][entry.entry_id]
+    api_session = async_get_api_session(hass)
+    api = Api(api_session.session, entry.data[CONF_ACCESS_TOKEN])
+
+    async def get_device_status(device_id: str) -> dict[str, Any]:
+        try:
+            return await api.get_device_status(device_id)
+        except ClientError as ex:
+            return {"error": repr(ex)}
+
+    devices = list(broker.devices.values())
+    statuses = await asyncio.gather(
+        *(get_device_status(device.device_id) for device in devices)
+    )
+    return {
+        "entry": {
+            "data": async_redact_data(entry.data, TO_REDACT),
+            "options": dict(entry.options),
+        },
+        "stats": dict(broker.stats),
+        "api_session": dict(api_session.stats),
+        "devices": [
+            {
+                "device_id": device.device_id,
+                "label": device.label,
+                "name": device.name,
+                "capabilities": device.capabilities,
+                "components": device.components,
+                "available": broker.is_available(device.device_id),
+                "retained_attributes": {
+                    "main": sorted(device.status.attributes),
+                    **{
+                        component_id: sorted(component.attributes)
+                        for component_id, component in device.status.components.items()
+                    },
+                },
+                "status": status,
+            }
+            for device, status in zip(devices, statuses)
+        ],
+    }
@@ -1,19 +1,45 @@
 """Support for SmartThings Cloud."""
 from __future__ import annotations
 
+from collections.abc import Callable
+from functools import wraps
 import json
 import logging
+from typing import Any, TypeVar
 
+from aiohttp.client_exceptions import ClientError
 from pysmartthings import Capability, DeviceEntity, RoomEntity
 
+from homeassistant.core import callback
 from homeassistant.helpers.device_registry import DeviceInfo
-from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity import Entity, EntityDescription
 
-from .const import DEVICE_INFO_MAP, DOMAIN, SIGNAL_SMARTTHINGS_UPDATE
+from .const import ATTR_PENDING, DEVICE_INFO_MAP, DOMAIN
 
 _LOGGER = logging.getLogger(__name__)
 
+_T = TypeVar("_T")
+
+
+def attribute_cached_property(func: Callable[[Any], _T]) -> property:
+    """Cache a property derived from the device status.
+
+    The value is computed once per change of the device attributes, tracked
+    by the attribute version the broker bumps for every applied update.
+    """
+    name = func.__name__
+
+    @wraps(func)
+    def wrapper(self: SmartThingsEntity) -> _T:
+        version = self._broker.get_attribute_version(self._device.device_id)
+        if (cached := self._attribute_cache.get(name)) and cached[0] == version:
+            return cached[1]
+        value = func(self)
+        self._attribute_cache[name] = (version, value)
+        return value
+
+    return property(wrapper)
+
 
 class SmartThingsEntity(Entity):
     """Defines a SmartThings entity."""
@@ -22,17 +48,21 @@ class SmartThingsEntity(Entity):
 
     def __init__(
         self,
+        broker,
         device: DeviceEntity,
         capability: Capability,
         description: EntityDescription,
         room: RoomEntity,
     ) -> None:
         """Initialize the instance."""
+        self._broker = broker
         self._device = device
-        self._dispatcher_remove = None
         self._capability = capability
         self._room = room
+        self._attribute_cache: dict[str, tuple[int, Any]] = {}
         self.entity_description = description
+        if not _LOGGER.isEnabledFor(logging.DEBUG):
+            return
         _LOGGER.debug(
             "Device status attributes:\n - device: %s\n - attributes: %s",
             self._device.label,
@@ -48,20 +78,150 @@ class SmartThingsEntity(Entity):
 
     async def async_added_to_hass(self):
         """Device added to hass."""
+        self.async_on_remove(
+            self._broker.async_add_device_listener(
+                self._device.device_id, self._handle_device_update
+            )
+        )
+        self.async_on_remove(
+            self._broker.async_register_subscription(
+                self.subscribed_attributes, self._device.device_id
+            )
+        )
+
+    async def _async_send_command(
+        self,
+        component_id: str,
+        capability: str,
+        command: str,
+        args: list[Any] | None = None,
+    ) -> bool:
+        """Send a command to the device, batched with others to the device."""
+        return await self._broker.commands.async_send(
+            self._device.device_id, component_id, capability, command, args
+        )
 
-        async def async_update_state(devices):
-            """Update device state."""
-            if self._device.device_id in devices:
-                await self.async_update_ha_state(True)
+    async def _async_send_latest_command(
+        self,
+        component_id: str,
+        capability: str,
+        command: str,
+        args: list[Any],
+        current: bool,
+    ) -> bool:
+        """Send a command of which only the latest of a burst is needed."""
+        return await self._broker.commands.async_send_latest(
+            self._device.device_id,
+            component_id,
+            capability,
+            command,
+            args,
+            current=current,
+        )
+
+    async def _async_set_attribute_command(
+        self, component_id: str, attribute: str, command: str, value: Any
+    ) -> None:
+        """Send a command that sets an attribute to the value.
 
-        self._dispatcher_remove = async_dispatcher_connect(
-            self.hass, SIGNAL_SMARTTHINGS_UPDATE, async_update_state
+        With optimistic commands the value is written right away and the
+        command is sent in the background, restoring the reported value if
+        it fails. Otherwise the value is written once the command succeeded.
+        """
+        device_id = self._device.device_id
+        # A value sent before may still be applied, even if it differs from
+        # the reported one, so only a settled attribute has a current value
+        current = self._broker.is_settled(
+            device_id, component_id, attribute
+        ) and value == self._broker.get_confirmed_value(
+            device_id, component_id, attribute
+        )
+        if not self._broker.optimistic_commands:
+            if await self._async_send_latest_command(
+                component_id, self._capability, command, [value], current
+            ) and value != self._broker.get_confirmed_value(
+                device_id, component_id, attribute
+            ):
+                # Unless the device reported the value before the response
+                self._update_attribute_value(component_id, attribute, value)
+                self._broker.async_track_confirmation(
+                    device_id, component_id, attribute
+                )
+            # State is set optimistically in the command above, therefore update
+            # the entity state ahead of receiving the confirming push updates
+            self.async_write_ha_state()
+            return
+        token = self._broker.async_set_optimistic_value(
+            device_id, component_id, attribute, value
+        )
+        self.hass.async_create_background_task(
+            self._async_send_optimistic_command(
+                component_id, attribute, command, value, current, token
+            ),
+            f"smartthings {command} {device_id}",
         )
 
-    async def async_will_remove_from_hass(self) -> None:
-        """Disconnect the device when removed."""
-        if self._dispatcher_remove:
-            self._dispatcher_remove()
+    async def _async_send_optimistic_command(
+        self,
+        component_id: str,
+        attribute: str,
+        command: str,
+        value: Any,
+        current: bool,
+        token: int | None,
+    ) -> None:
+        """Send a command of an optimistic value and roll back if it fails."""
+        result = False
+        try:
+            result = await self._async_send_latest_command(
+                component_id, self._capability, command, [value], current
+            )
+        except ClientError as err:
+            _LOGGER.error(
+                "Unable to send %s to %s: %s", command, self._device.label, err
+            )
+        finally:
+            device_id = self._device.device_id
+            if not result:
+                if token is not None:
+                    self._broker.async_rollback_optimistic_value(
+                        device_id, component_id, attribute, token
+                    )
+            # Unless the device reported the value before the response
+            elif self._broker.is_pending(device_id, component_id, attribute):
+                self._broker.async_track_confirmation(
+                    device_id, component_id, attribute
+                )
+
+    def _update_attribute_value(
+        self, component_id: str, attribute: str, value: Any
+    ) -> None:
+        """Update an attribute of the device status optimistically."""
+        status = self._device.status
+        if component_id != "main":
+            status = status.components[component_id]
+        status.update_attribute_value(attribute, value)
+        self._broker.bump_attribute_version(self._device.device_id)
+
+    @callback
+    def _handle_device_update(self) -> None:
+        """Update the state after the status of the device was updated."""
+        self.async_write_ha_state()
+
+    @property
+    def available(self) -> bool:
+        """Return true if the device is not known to be offline."""
+        return self._broker.is_available(self._device.device_id)
+
+    @property
+    def subscribed_attributes(self) -> dict[str, set[str]]:
+        """Return the attributes of each capability the entity uses."""
+        return {self._capability: {self.entity_description.key}}
+
+    @property
+    def _commanded_attribute(self) -> tuple[str, str] | None:
+        """Return the component and attribute the entity sends commands for."""
+        return None
 
     @property
     def device_info(self) -> DeviceInfo:
@@ -97,4 +257,10 @@ class SmartThingsEntity(Entity):
     def extra_state_attributes(self):
         """Return device specific state attributes."""
         state_attrs = {}
+        if self._broker.optimistic_commands and (
+            commanded := self._commanded_attribute
+        ):
+            state_attrs[ATTR_PENDING] = self._broker.is_pending(
+                self._device.device_id, *commanded
+            )
         return state_attrs
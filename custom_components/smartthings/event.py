@@ -11,19 +11,14 @@ from homeassistant.components.event import (
     EventEntityDescription,
 )
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import EntityCategory
-from homeassistant.core import HomeAssistant
-from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.const import STATE_UNAVAILABLE, EntityCategory
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
-from .const import (
-    DATA_BROKERS,
-    DOMAIN,
-    SIGNAL_SMARTTHINGS_BUTTON,
-)
+from .const import DATA_BROKERS, DOMAIN
 from .entity import SmartThingsEntity
 
-@dataclass
+@dataclass(frozen=True, kw_only=True)
 class SmartThingsEventEntityDescription(EventEntityDescription):
     """Class to describe a SmartThings event entity."""
 
@@ -56,7 +51,7 @@ async def async_setup_entry(
                 for attribute in attributes:
                     entities.append(
                         SmartThingsEventEntity(
-                            device, capability, attribute, room,
+                            broker, device, capability, attribute, room,
                         )
                     )
 
@@ -70,14 +65,23 @@ class SmartThingsEventEntity(SmartThingsEntity, EventEntity):
 
     async def async_added_to_hass(self):
         """Device added to hass."""
-
-        async def async_handle_event(devices):
-            """Handle device event."""
-            if self._device.device_id in devices:
-                event_type = self._device.status.attributes[self.entity_description.key].value
-                self._trigger_event(event_type)
-                self.async_write_ha_state()
-
-        self._dispatcher_remove = async_dispatcher_connect(
-            self.hass, SIGNAL_SMARTTHINGS_BUTTON, async_handle_event
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self._broker.async_add_device_listener(
+                self._device.device_id, self._handle_button_event, button=True
+            )
         )
+
+    @callback
+    def _handle_button_event(self) -> None:
+        """Trigger the event of a button press."""
+        event_type = self._device.status.attributes[self.entity_description.key].value
+        self._trigger_event(event_type)
+        self.async_write_ha_state()
+
+    @callback
+    def _handle_device_update(self) -> None:
+        """Write the state when the availability of the device changed."""
+        state = self.hass.states.get(self.entity_id)
+        if state is None or self.available != (state.state != STATE_UNAVAILABLE):
+            self.async_write_ha_state()
@@ -22,7 +22,7 @@ from .const import (
     CustomCapability,
     CustomComponent,
 )
-from .entity import SmartThingsEntity
+from .entity import SmartThingsEntity, attribute_cached_property
 
 HOOD_FAN_SPEED_TO_STATE = {
     "0": "off",
@@ -33,7 +33,7 @@ HOOD_FAN_SPEED_TO_STATE = {
 
 STATE_TO_HOOD_FAN_SPEED = {value: key for key, value in HOOD_FAN_SPEED_TO_STATE.items()}
 
-@dataclass
+@dataclass(frozen=True, kw_only=True)
 class SmartThingsFanEntityDescription(FanEntityDescription):
     """Class to describe a SmartThings fan entity."""
 
@@ -62,7 +62,7 @@ async def async_setup_entry(
                 for attribute in attributes:
                     entities.append(
                         SmartThingsFanEntity(
-                            device, capability, attribute, room,
+                            broker, device, capability, attribute, room,
                         )
                     )
 
@@ -86,17 +86,9 @@ class SmartThingsFanEntity(SmartThingsEntity, FanEntity):
             speed = 0
         else:
             speed = math.ceil(percentage_to_ranged_value(self._speed_range, percentage))
-        result = await self._device.command(
-            CustomComponent.hood,
-            self._capability,
-            "setHoodFanSpeed",
-            [speed],
+        await self._async_set_attribute_command(
+            CustomComponent.hood, self.entity_description.key, "setHoodFanSpeed", speed
         )
-        if result:
-            self._device.status.components[CustomComponent.hood].update_attribute_value(self.entity_description.key, speed)
-        # State is set optimistically in the command above, therefore update
-        # the entity state ahead of receiving the confirming push updates
-        self.async_write_ha_state()
 
     async def async_turn_on(
         self,
@@ -111,6 +103,23 @@ class SmartThingsFanEntity(SmartThingsEntity, FanEntity):
         """Turn the fan off."""
         await self._async_set_percentage(0)
 
+    @property
+    def subscribed_attributes(self) -> dict[str, set[str]]:
+        """Return the attributes of each capability the entity uses."""
+        return {
+            self._capability: {
+                self.entity_description.key,
+                CustomAttribute.max_fan_speed,
+                CustomAttribute.min_fan_speed,
+                CustomAttribute.supported_hood_fan_speed,
+            }
+        }
+
+    @property
+    def _commanded_attribute(self) -> tuple[str, str]:
+        """Return the component and attribute the entity sends commands for."""
+        return (CustomComponent.hood, self.entity_description.key)
+
     @property
     def is_on(self) -> bool:
         """Return true if fan is on."""
@@ -131,7 +140,7 @@ class SmartThingsFanEntity(SmartThingsEntity, FanEntity):
         """Return true if fan is on."""
         return self._device.status.components[CustomComponent.hood].attributes[self.entity_description.key].value
 
-    @property
+    @attribute_cached_property
     def _speed_list(self) -> list[int]:
         """Return valid speeds."""
         speed_list = self._device.status.components[CustomComponent.hood].attributes[CustomAttribute.supported_hood_fan_speed].value
@@ -139,7 +148,7 @@ class SmartThingsFanEntity(SmartThingsEntity, FanEntity):
         min_speed = self._device.status.components[CustomComponent.hood].attributes[CustomAttribute.min_fan_speed].value
         return [speed for speed in speed_list if (speed > min_speed and speed <= max_speed)]
 
-    @property
+    @attribute_cached_property
     def _speed_range(self) -> tuple[int, int]:
         """Return speed range."""
         return (min(self._speed_list), max(self._speed_list))
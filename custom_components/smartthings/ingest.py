@@ -0,0 +1,213 @@
+"""Decoding of SmartApp webhook payloads into compact event records.
+
+This module has no dependency on Home Assistant so that it can be shared
+with tooling that runs outside of it.
+"""
+from __future__ import annotations
+
+import base64
+from collections import OrderedDict
+from datetime import datetime
+from functools import lru_cache
+import json
+from sys import intern
+from threading import Lock
+from time import monotonic
+from typing import Any, NamedTuple
+
+from Crypto.PublicKey import RSA
+from Crypto.Signature import PKCS1_v1_5
+from httpsig.utils import HASHES, generate_message, parse_authorization_header
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+EVENT_TYPE_DEVICE = "DEVICE_EVENT"
+LIFECYCLE_EVENT = "EVENT"
+SETTINGS_APP_ID = "appId"
+# String values up to this length are enum-like and shared between events
+INTERN_MAX_LENGTH = 32
+
+
+class DeviceEvent(NamedTuple):
+    """Define a compact record of a device event."""
+
+    event_id: str | None
+    location_id: str
+    device_id: str
+    component_id: str
+    capability: str
+    attribute: str
+    value: Any
+    data: dict[str, Any] | None
+    event_time: float | None = None
+
+
+def json_loads(body: bytes | str) -> Any:
+    """Decode a JSON payload using the fastest codec available."""
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+
+def json_dumps(obj: Any) -> bytes:
+    """Encode an object as compact JSON using the fastest codec available."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+
+def get_app_id(data: dict[str, Any]) -> str | None:
+    """Return the id of the SmartApp a lifecycle payload was sent to."""
+    return (data.get("settings") or {}).get(SETTINGS_APP_ID)
+
+
+class EventIdCache:
+    """Bounded, time expiring set of recently seen event ids."""
+
+    def __init__(self, size: int, ttl: float) -> None:
+        """Create a new instance of the cache."""
+        self._size = size
+        self._ttl = ttl
+        self._seen: OrderedDict[str, float] = OrderedDict()
+
+    def seen(self, event_id: str | None) -> bool:
+        """Return true if the id was seen before, otherwise remember it."""
+        if event_id is None:
+            return False
+        now = monotonic()
+        seen = self._seen
+        # Entries are ordered by expiry, drop the expired ones
+        while seen and next(iter(seen.values())) <= now:
+            seen.popitem(last=False)
+        if event_id in seen:
+            return True
+        seen[event_id] = now + self._ttl
+        if len(seen) > self._size:
+            seen.popitem(last=False)
+        return False
+
+
+@lru_cache(maxsize=16)
+def _import_public_key(public_key: str):
+    """Parse a PEM encoded public key into a reusable verifier object."""
+    return PKCS1_v1_5.new(RSA.import_key(public_key))
+
+
+class SignatureVerifier:
+    """Verify the HTTP signatures of lifecycle requests.
+
+    Parsed public keys are cached per key and successful verifications are
+    remembered for a while so that retried deliveries of the same signed
+    request are not verified again. Verification is thread safe so it can be
+    run in an executor, which offload tells callers to do.
+    """
+
+    def __init__(
+        self, path: str, *, cache_size: int = 256, cache_ttl: float = 300.0
+    ) -> None:
+        """Create a new instance of the verifier."""
+        self.offload = False
+        self._path = path
+        self._cache_size = cache_size
+        self._cache_ttl = cache_ttl
+        self._results: OrderedDict[tuple, float] = OrderedDict()
+        self._lock = Lock()
+
+    def _signed_message(self, headers: Any) -> tuple[str, str, bytes]:
+        """Return the algorithm, signature and signed message of a request."""
+        _, auth = parse_authorization_header(headers["authorization"])
+        signed_headers = auth.get("headers", "date").split(" ")
+        if "date" not in signed_headers:
+            raise ValueError("date is a required header")
+        message = generate_message(
+            signed_headers, headers, method="POST", path=self._path
+        )
+        return auth["algorithm"], auth["signature"], message
+
+    def is_verified(self, public_key: str, headers: Any) -> bool:
+        """Return true if the request was verified recently."""
+        try:
+            key = (public_key, *self._signed_message(headers))
+        except Exception:  # pylint: disable=broad-except
+            return False
+        with self._lock:
+            return self._results.get(key, 0) > monotonic()
+
+    def verify(self, public_key: str, headers: Any) -> bool:
+        """Verify the signature of a request against the public key."""
+        try:
+            algorithm, signature, message = key = self._signed_message(headers)
+            key = (public_key, *key)
+            with self._lock:
+                if self._results.get(key, 0) > monotonic():
+                    return True
+            sign_algorithm, hash_algorithm = algorithm.split("-")
+            if sign_algorithm != "rsa":
+                return False
+            digest = HASHES[hash_algorithm].new(message)
+            if not _import_public_key(public_key).verify(
+                digest, base64.b64decode(signature)
+            ):
+                return False
+        except Exception:  # pylint: disable=broad-except
+            return False
+        with self._lock:
+            self._results[key] = monotonic() + self._cache_ttl
+            self._results.move_to_end(key)
+            while len(self._results) > self._cache_size:
+                self._results.popitem(last=False)
+        return True
+
+
+def parse_event_time(value: str | None) -> float | None:
+    """Parse the time of an event into a timestamp."""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        return None
+
+
+def get_installed_app_id(data: dict[str, Any]) -> str:
+    """Return the id of the installed app an EVENT lifecycle payload is for."""
+    return data["eventData"]["installedApp"]["installedAppId"]
+
+
+def parse_event_item(item: dict[str, Any]) -> DeviceEvent | None:
+    """Build a device event record from an event item.
+
+    Items of other event types return None.
+    """
+    if item.get("eventType") != EVENT_TYPE_DEVICE:
+        return None
+    device_event = item["deviceEvent"]
+    value = device_event["value"]
+    if isinstance(value, str) and len(value) <= INTERN_MAX_LENGTH:
+        value = intern(value)
+    return DeviceEvent(
+        device_event.get("eventId"),
+        device_event["locationId"],
+        device_event["deviceId"],
+        intern(device_event["componentId"]),
+        intern(device_event["capability"]),
+        intern(device_event["attribute"]),
+        value,
+        device_event.get("data"),
+        parse_event_time(item.get("eventTime")),
+    )
+
+
+def parse_device_events(data: dict[str, Any]) -> list[DeviceEvent]:
+    """Build device event records straight from an EVENT lifecycle payload.
+
+    Events other than device events are skipped.
+    """
+    return [
+        evt
+        for item in data["eventData"]["events"]
+        if (evt := parse_event_item(item)) is not None
+    ]
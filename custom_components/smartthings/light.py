@@ -21,9 +21,9 @@ from .const import (
     CustomCapability,
     CustomComponent,
 )
-from .entity import SmartThingsEntity
+from .entity import SmartThingsEntity, attribute_cached_property
 
-@dataclass
+@dataclass(frozen=True, kw_only=True)
 class SmartThingsLightEntityDescription(LightEntityDescription):
     """Class to describe a SmartThings light entity."""
 
@@ -52,7 +52,7 @@ async def async_setup_entry(
                 for attribute in attributes:
                     entities.append(
                         SmartThingsLightEntity(
-                            device, capability, attribute, room,
+                            broker, device, capability, attribute, room,
                         )
                     )
 
@@ -79,17 +79,27 @@ class SmartThingsLightEntity(SmartThingsEntity, LightEntity):
         await self._async_set_brightness_level("off")
 
     async def _async_set_brightness_level(self, brightness: str | None) -> None:
-        result = await self._device.command(
+        await self._async_set_attribute_command(
             CustomComponent.hood,
-            self._capability,
+            self.entity_description.key,
             "setBrightnessLevel",
-            [brightness],
+            brightness,
         )
-        if result:
-            self._device.status.components[CustomComponent.hood].update_attribute_value(self.entity_description.key, brightness)
-        # State is set optimistically in the command above, therefore update
-        # the entity state ahead of receiving the confirming push updates
-        self.async_write_ha_state()
+
+    @property
+    def subscribed_attributes(self) -> dict[str, set[str]]:
+        """Return the attributes of each capability the entity uses."""
+        return {
+            self._capability: {
+                self.entity_description.key,
+                CustomAttribute.supported_brightness_level,
+            }
+        }
+
+    @property
+    def _commanded_attribute(self) -> tuple[str, str]:
+        """Return the component and attribute the entity sends commands for."""
+        return (CustomComponent.hood, self.entity_description.key)
 
     @property
     def is_on(self) -> bool:
@@ -115,7 +125,7 @@ class SmartThingsLightEntity(SmartThingsEntity, LightEntity):
         """Return brightness level."""
         return self._device.status.components[CustomComponent.hood].attributes[self.entity_description.key].value
 
-    @property
+    @attribute_cached_property
     def _brightness_levels(self) -> list[str]:
         """Return valid brightness levels."""
         brightness_levels = self._device.status.components[CustomComponent.hood].attributes[CustomAttribute.supported_brightness_level].value
@@ -2,18 +2,17 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-import json
 import logging
 from typing import Any
 
-from pysmartthings import Attribute, Capability
+from pysmartthings import Attribute, Capability, Command
 
 from homeassistant.components.lock import LockEntity, LockEntityDescription
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
-from .const import DATA_BROKERS, DOMAIN, CustomAttribute
+from .const import DATA_BROKERS, DOMAIN, CustomAttribute, CustomCapability
 from .entity import SmartThingsEntity
 
 LOCK_ATTR_MAP = {
@@ -25,7 +24,7 @@ LOCK_ATTR_MAP = {
     "usedCode": "used_code",
 }
 
-@dataclass
+@dataclass(frozen=True, kw_only=True)
 class SmartThingsLockEntityDescription(LockEntityDescription):
     """Class to describe a SmartThings lock entity."""
 
@@ -56,7 +55,7 @@ async def async_setup_entry(
                 for attribute in attributes:
                     entities.append(
                         SmartThingsLockEntity(
-                            device, capability, attribute, room,
+                            broker, device, capability, attribute, room,
                         )
                     )
 
@@ -70,14 +69,34 @@ class SmartThingsLockEntity(SmartThingsEntity, LockEntity):
 
     async def async_lock(self, **kwargs: Any) -> None:
         """Lock the lock."""
-        await self._device.lock(set_status=True)
-        self.async_write_ha_state()
+        await self._async_set_lock(Command.lock, "locked")
 
     async def async_unlock(self, **kwargs: Any) -> None:
         """Unlock the lock."""
-        await self._device.unlock(set_status=True)
+        await self._async_set_lock(Command.unlock, "unlocked")
+
+    async def _async_set_lock(self, command: str, value: str) -> None:
+        """Send a lock command and expect the lock to report its state."""
+        key = self.entity_description.key
+        if await self._async_send_command("main", self._capability, command):
+            if value != self._device.status.attributes[key].value:
+                self._update_attribute_value("main", key, value)
+                self._broker.async_track_confirmation(
+                    self._device.device_id, "main", key
+                )
         self.async_write_ha_state()
 
+    @property
+    def subscribed_attributes(self) -> dict[str, set[str]]:
+        """Return the attributes of each capability the entity uses."""
+        attributes = super().subscribed_attributes
+        if CustomCapability.lock_codes in self._device.capabilities:
+            attributes[CustomCapability.lock_codes] = {
+                CustomAttribute.code_changed,
+                CustomAttribute.lock_codes,
+            }
+        return attributes
+
     @property
     def is_locked(self) -> bool | None:
         """Return true if the lock is locked."""
@@ -90,7 +109,7 @@ class SmartThingsLockEntity(SmartThingsEntity, LockEntity):
         status = self._device.status.attributes[self.entity_description.key]
         if isinstance(status.data, dict):
             if code_id := status.data.get("codeId"):
-                if code_name := self._lock_codes.get(code_id):
+                if code_name := self._get_code_name(code_id):
                     return code_name
             if method := status.data.get("method"):
                 return method
@@ -107,12 +126,10 @@ class SmartThingsLockEntity(SmartThingsEntity, LockEntity):
                 if value := status.data.get(key):
                     state_attrs[attr] = value
                     if attr == "code_id":
-                        if code_name := self._lock_codes.get(value):
+                        if code_name := self._get_code_name(value):
                             state_attrs["code_name"] = code_name
         return state_attrs
 
-    @property
-    def _lock_codes(self) -> dict[str, str]:
-        """Return true if the lock is locked."""
-        lock_codes = self._device.status.attributes[CustomAttribute.lock_codes].value
-        return json.loads(lock_codes.replace("'\'", ""))
+    def _get_code_name(self, code_id: str) -> str | None:
+        """Return the name of a lock code."""
+        return self._broker.lock_codes.get_name(self._device.device_id, code_id)
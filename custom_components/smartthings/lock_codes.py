@@ -0,0 +1,65 @@
+"""Index of the lock code names of SmartThings locks."""
+from __future__ import annotations
+
+import json
+import logging
+from typing import Any
+
+_LOGGER = logging.getLogger(__name__)
+
+CODE_CHANGE_DELETED = "deleted"
+CODE_CHANGE_FAILED = "failed"
+CODE_CHANGE_ALL = "all"
+
+
+class LockCodeIndex:
+    """Map the code ids of locks to their names.
+
+    The codes of a device are parsed once from its lockCodes attribute and
+    then patched from codeChanged events, so that looking up the name of a
+    code does not parse the attribute again.
+    """
+
+    def __init__(self) -> None:
+        """Create a new instance of the index."""
+        self._codes: dict[str, dict[str, str]] = {}
+
+    def rebuild(self, device_id: str, lock_codes: Any) -> None:
+        """Replace the codes of a device from its lockCodes attribute."""
+        if isinstance(lock_codes, str):
+            try:
+                lock_codes = json.loads(lock_codes.replace("''", ""))
+            except ValueError:
+                _LOGGER.debug("Unable to parse lock codes of device %s", device_id)
+                lock_codes = None
+        if isinstance(lock_codes, dict):
+            self._codes[device_id] = {
+                str(code_id): name for code_id, name in lock_codes.items()
+            }
+        else:
+            self._codes.pop(device_id, None)
+
+    def apply_change(self, device_id: str, code_changed: Any, data: Any) -> None:
+        """Patch the codes of a device from a codeChanged event.
+
+        The value holds the code id and the change, such as "3 set" or
+        "3 deleted", and the data the name of the code.
+        """
+        if not isinstance(code_changed, str):
+            return
+        code_id, _, change = code_changed.partition(" ")
+        codes = self._codes.setdefault(device_id, {})
+        if change == CODE_CHANGE_DELETED:
+            if code_id == CODE_CHANGE_ALL:
+                codes.clear()
+            else:
+                codes.pop(code_id, None)
+        elif change != CODE_CHANGE_FAILED:
+            if isinstance(data, dict) and (name := data.get("codeName")):
+                codes[code_id] = name
+            else:
+                codes.setdefault(code_id, f"Code {code_id}")
+
+    def get_name(self, device_id: str, code_id: Any) -> str | None:
+        """Return the name of a code of a device."""
+        return self._codes.get(device_id, {}).get(str(code_id))
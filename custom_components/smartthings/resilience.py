@@ -0,0 +1,163 @@
+"""Retries and circuit breakers for the SmartThings API calls of setup."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable
+import logging
+import random
+from time import monotonic
+from typing import Any, TypeVar
+
+from aiohttp.client_exceptions import (
+    ClientConnectionError,
+    ClientError,
+    ClientResponseError,
+)
+
+from .const import (
+    CIRCUIT_BREAKER_COOLDOWN,
+    CIRCUIT_BREAKER_THRESHOLD,
+    SETUP_RETRY_ATTEMPTS,
+    SETUP_RETRY_BASE_DELAY,
+    SETUP_RETRY_MAX_DELAY,
+    SETUP_STAGE_TTL,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+_T = TypeVar("_T")
+
+
+class CircuitOpenError(Exception):
+    """Raised when calls of an endpoint class are not attempted."""
+
+
+class CircuitBreaker:
+    """Stop calling a class of endpoints that keeps failing.
+
+    After a number of consecutive failures, calls fail right away until the
+    cooldown has passed. Then a single trial call is let through while the
+    others keep failing, and the breaker closes again when it succeeds.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        threshold: int = CIRCUIT_BREAKER_THRESHOLD,
+        cooldown: float = CIRCUIT_BREAKER_COOLDOWN,
+    ) -> None:
+        """Create a new instance of the breaker."""
+        self._name = name
+        self._threshold = threshold
+        self._cooldown = cooldown
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._trial = False
+
+    def before_call(self) -> None:
+        """Raise CircuitOpenError if calls are not attempted."""
+        if self._opened_at is None:
+            return
+        if self._trial or monotonic() - self._opened_at < self._cooldown:
+            raise CircuitOpenError(f"Calls to {self._name} are failing")
+        self._trial = True
+
+    def record_success(self) -> None:
+        """Close the breaker after a successful call."""
+        self._failures = 0
+        self._opened_at = None
+        self._trial = False
+
+    def record_failure(self) -> None:
+        """Count a failed call and open the breaker at the threshold."""
+        self._trial = False
+        self._failures += 1
+        if self._failures >= self._threshold:
+            if self._opened_at is None:
+                _LOGGER.warning(
+                    "Pausing calls to %s for %ss after %s failures",
+                    self._name,
+                    self._cooldown,
+                    self._failures,
+                )
+            self._opened_at = monotonic()
+
+    def release_trial(self) -> None:
+        """Let another trial call through when one ended without a verdict."""
+        self._trial = False
+
+
+def is_retryable(err: Exception) -> bool:
+    """Return true if a call that raised the error may succeed when retried."""
+    if isinstance(err, ClientResponseError):
+        return err.status == 429 or err.status >= 500
+    return isinstance(err, (ClientConnectionError, TimeoutError))
+
+
+async def async_call_with_retry(
+    breaker: CircuitBreaker,
+    call: Callable[[], Awaitable[_T]],
+    attempts: int = SETUP_RETRY_ATTEMPTS,
+) -> _T:
+    """Make a call, retrying transient failures with jittered backoff."""
+    for attempt in range(attempts):
+        breaker.before_call()
+        try:
+            result = await call()
+        except (ClientError, TimeoutError) as err:
+            if not is_retryable(err):
+                breaker.release_trial()
+                raise
+            breaker.record_failure()
+            if attempt == attempts - 1:
+                raise
+            delay = random.uniform(
+                0, min(SETUP_RETRY_MAX_DELAY, SETUP_RETRY_BASE_DELAY * 2**attempt)
+            )
+            _LOGGER.debug("Retrying in %.1fs after: %s", delay, err)
+            await asyncio.sleep(delay)
+        except BaseException:
+            breaker.release_trial()
+            raise
+        else:
+            breaker.record_success()
+            return result
+    raise RuntimeError("No attempts were made")
+
+
+class SetupStages:
+    """Run the API calls of a config entry setup and keep their results.
+
+    A setup that is retried after a failure only repeats the calls that did
+    not succeed yet. Results older than the time to live are fetched again
+    so that a late retry does not set up from stale data. Stages whose
+    results go stale quickly, such as device status, are not kept at all.
+    """
+
+    def __init__(
+        self, breakers: dict[str, CircuitBreaker], ttl: float = SETUP_STAGE_TTL
+    ) -> None:
+        """Create a new instance of the stages."""
+        self._breakers = breakers
+        self._ttl = ttl
+        self._results: dict[str, tuple[float, Any]] = {}
+
+    async def async_run(
+        self,
+        name: str,
+        endpoint: str,
+        call: Callable[[], Awaitable[_T]],
+        *,
+        keep: bool = True,
+    ) -> _T:
+        """Return the kept result of a stage or make its call."""
+        if (result := self._results.get(name)) and (
+            monotonic() - result[0] < self._ttl
+        ):
+            return result[1]
+        if (breaker := self._breakers.get(endpoint)) is None:
+            breaker = self._breakers[endpoint] = CircuitBreaker(endpoint)
+        value = await async_call_with_retry(breaker, call)
+        if keep:
+            self._results[name] = (monotonic(), value)
+        return value
@@ -18,7 +18,7 @@ from .const import (
     CustomCapability,
     CustomComponent,
 )
-from .entity import SmartThingsEntity
+from .entity import SmartThingsEntity, attribute_cached_property
 
 HOOD_FAN_SPEED_TO_STATE = {
     "0": "off",
@@ -29,7 +29,7 @@ HOOD_FAN_SPEED_TO_STATE = {
 
 STATE_TO_HOOD_FAN_SPEED = {value: key for key, value in HOOD_FAN_SPEED_TO_STATE.items()}
 
-@dataclass
+@dataclass(frozen=True, kw_only=True)
 class SmartThingsSelectEntityDescription(SelectEntityDescription):
     """Class to describe a SmartThings select entity."""
 
@@ -77,7 +77,7 @@ async def async_setup_entry(
                 for attribute in attributes:
                     entities.append(
                         SmartThingsSelectEntity(
-                            device, capability, attribute, room,
+                            broker, device, capability, attribute, room,
                         )
                     )
 
@@ -93,19 +93,29 @@ class SmartThingsSelectEntity(SmartThingsEntity, SelectEntity):
         """Change the selected option."""
         if self.entity_description.key == CustomAttribute.hood_fan_speed:
             option = int(STATE_TO_HOOD_FAN_SPEED[option])
-        result = await self._device.command(
+        await self._async_set_attribute_command(
             self.entity_description.component,
-            self._capability,
+            self.entity_description.key,
             self.entity_description.select_option,
-            [option],
+            option,
         )
-        if result:
-            self._device.status.components[self.entity_description.component].update_attribute_value(self.entity_description.key, option)
-        # State is set optimistically in the command above, therefore update
-        # the entity state ahead of receiving the confirming push updates
-        self.async_write_ha_state()
 
     @property
+    def subscribed_attributes(self) -> dict[str, set[str]]:
+        """Return the attributes of each capability the entity uses."""
+        attributes = {self.entity_description.key, self.entity_description.options}
+        if self.entity_description.key == CustomAttribute.hood_fan_speed:
+            attributes.update(
+                (CustomAttribute.max_fan_speed, CustomAttribute.min_fan_speed)
+            )
+        return {self._capability: attributes}
+
+    @property
+    def _commanded_attribute(self) -> tuple[str, str]:
+        """Return the component and attribute the entity sends commands for."""
+        return (self.entity_description.component, self.entity_description.key)
+
+    @attribute_cached_property
     def options(self) -> list[str]:
         """Return valid options."""
         options = self._device.status.components[self.entity_description.component].attributes[self.entity_description.options].value
@@ -118,6 +128,10 @@ class SmartThingsSelectEntity(SmartThingsEntity, SelectEntity):
     @property
     def current_option(self) -> str | None:
         """Return current option."""
-        option = self._device.status.components[self.entity_description.component].attributes[self.entity_description.key].value
-        return self.entity_description.current_option(option)
+        return self.entity_description.current_option(self._option)
+
+    @property
+    def _option(self) -> Any:
+        """Return the attribute value of the current option."""
+        return self._device.status.components[self.entity_description.component].attributes[self.entity_description.key].value
 
@@ -3,6 +3,8 @@ from __future__ import annotations
 
 from collections.abc import Callable
 from dataclasses import dataclass
+from datetime import timedelta
+from time import monotonic
 from typing import Any
 
 from pysmartthings import Attribute, Capability
@@ -19,12 +21,20 @@ from homeassistant.const import (
     EntityCategory,
     UnitOfTemperature,
 )
-from homeassistant.core import HomeAssistant
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.event import async_call_later
 from homeassistant.util import dt as dt_util
 
-from .const import DATA_BROKERS, DOMAIN
-from .entity import SmartThingsEntity
+from .const import (
+    CONF_DEADBAND,
+    CONF_MAX_INTERVAL,
+    CONF_MIN_INTERVAL,
+    CONF_RELATIVE_DEADBAND,
+    DATA_BROKERS,
+    DOMAIN,
+)
+from .entity import SmartThingsEntity, attribute_cached_property
 
 OVEN_MODE_MAP = {
     "Autocook": "autocook",
@@ -47,13 +57,21 @@ UNIT_MAP = {
     "%": PERCENTAGE,
 }
 
-@dataclass
+@dataclass(frozen=True, kw_only=True)
 class SmartThingsSensorEntityDescription(SensorEntityDescription):
     """Class to describe a SmartThings sensor entity."""
 
     entity_category: str[EntityCategory] | None = EntityCategory.DIAGNOSTIC
     native_value: Callable[[Any], bool] = lambda value: value
     translation_key: str | None = "all"
+    # Numeric values that change less than the deadband, absolute or
+    # relative to the last written value, are not written
+    deadband: float | None = None
+    relative_deadband: float | None = None
+    # States are written at most once per minimum interval and at least
+    # once per maximum interval while values keep being pushed
+    min_interval: timedelta | None = None
+    max_interval: timedelta | None = None
 
 SENSOR_DESCRIPTIONS: dict[str, list[SmartThingsSensorEntityDescription]] = {
     Capability.battery: [
@@ -103,6 +121,9 @@ SENSOR_DESCRIPTIONS: dict[str, list[SmartThingsSensorEntityDescription]] = {
             name="Temperature Measurement",
             device_class=SensorDeviceClass.TEMPERATURE,
             state_class=SensorStateClass.MEASUREMENT,
+            deadband=0.2,
+            min_interval=timedelta(seconds=30),
+            max_interval=timedelta(minutes=30),
         ),
     ],
 }
@@ -123,7 +144,7 @@ async def async_setup_entry(
                 for attribute in attributes:
                     entities.append(
                         SmartThingsSensorEntity(
-                            device, capability, attribute, room,
+                            broker, device, capability, attribute, room,
                         )
                     )
 
@@ -134,8 +155,101 @@ class SmartThingsSensorEntity(SmartThingsEntity, SensorEntity):
     """Define a SmartThings sensor entity."""
 
     entity_description: SmartThingsSensorEntityDescription
+    _last_written_value: Any = None
+    _last_written_available: bool = True
+    _last_written: float = 0.0
+    _pending_write: CALLBACK_TYPE | None = None
 
-    @property
+    async def async_added_to_hass(self):
+        """Device added to hass."""
+        await super().async_added_to_hass()
+        self._last_written_value = self.native_value
+        self._last_written_available = self.available
+        self._last_written = monotonic()
+        self.async_on_remove(self._async_cancel_pending_write)
+
+    def _get_throttle_option(self, key: str) -> Any:
+        """Return a throttle setting of the entity or its description.
+
+        Settings in the entity registry options override the description,
+        intervals are given there in seconds.
+        """
+        if self.registry_entry and key in (
+            options := self.registry_entry.options.get(DOMAIN, {})
+        ):
+            value = options[key]
+            if value is not None and key in (CONF_MIN_INTERVAL, CONF_MAX_INTERVAL):
+                return timedelta(seconds=value)
+            return value
+        return getattr(self.entity_description, key)
+
+    def _is_within_deadband(self, value: Any) -> bool:
+        """Return true if the value did not change enough to be written."""
+        last = self._last_written_value
+        if not all(
+            isinstance(number, (int, float)) and not isinstance(number, bool)
+            for number in (value, last)
+        ):
+            return False
+        band = max(
+            self._get_throttle_option(CONF_DEADBAND) or 0,
+            (self._get_throttle_option(CONF_RELATIVE_DEADBAND) or 0) * abs(last),
+        )
+        return abs(value - last) < band
+
+    @callback
+    def _handle_device_update(self) -> None:
+        """Write the state unless the value is throttled.
+
+        The status of the device is always up to date, throttling only
+        skips writing the state. Changes of availability and values that
+        appear or go missing, like the first one, are always written.
+        """
+        if self.available != self._last_written_available or (
+            self.native_value is None
+        ) != (self._last_written_value is None):
+            self._async_write_throttled_state()
+            return
+        elapsed = monotonic() - self._last_written
+        max_interval = self._get_throttle_option(CONF_MAX_INTERVAL)
+        if self._is_within_deadband(self.native_value) and (
+            max_interval is None or elapsed < max_interval.total_seconds()
+        ):
+            return
+        min_interval = self._get_throttle_option(CONF_MIN_INTERVAL)
+        if min_interval is not None and elapsed < min_interval.total_seconds():
+            if self._pending_write is None:
+                self._pending_write = async_call_later(
+                    self.hass,
+                    min_interval.total_seconds() - elapsed,
+                    self._async_write_pending,
+                )
+            return
+        self._async_write_throttled_state()
+
+    @callback
+    def _async_write_pending(self, _now) -> None:
+        """Write the state that was held back by the minimum interval."""
+        self._pending_write = None
+        self._async_write_throttled_state()
+
+    @callback
+    def _async_write_throttled_state(self) -> None:
+        """Write the state and remember what was written."""
+        self._async_cancel_pending_write()
+        self._last_written_value = self.native_value
+        self._last_written_available = self.available
+        self._last_written = monotonic()
+        self.async_write_ha_state()
+
+    @callback
+    def _async_cancel_pending_write(self) -> None:
+        """Cancel a pending state write."""
+        if self._pending_write is not None:
+            self._pending_write()
+            self._pending_write = None
+
+    @attribute_cached_property
     def native_value(self):
         """Return the state of the sensor."""
         value = self._device.status.attributes[self.entity_description.key].value
@@ -0,0 +1,176 @@
+"""Services of the SmartThings integration."""
+from __future__ import annotations
+
+import asyncio
+from time import monotonic
+from typing import Any
+
+from aiohttp.client_exceptions import ClientError
+from pysmartthings import DeviceEntity
+import voluptuous as vol
+
+from homeassistant.const import ATTR_AREA_ID, ATTR_ENTITY_ID
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+    callback,
+)
+from homeassistant.exceptions import ServiceValidationError
+from homeassistant.helpers import (
+    config_validation as cv,
+    device_registry as dr,
+    entity_registry as er,
+)
+
+from .const import (
+    ATTR_ARGUMENTS,
+    ATTR_CAPABILITY,
+    ATTR_COMMAND,
+    ATTR_COMPONENT,
+    ATTR_ROOM,
+    BULK_COMMAND_CONCURRENCY,
+    DATA_BROKERS,
+    DOMAIN,
+    SERVICE_SEND_COMMAND,
+)
+
+SEND_COMMAND_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_CAPABILITY): cv.string,
+        vol.Required(ATTR_COMMAND): cv.string,
+        vol.Optional(ATTR_ARGUMENTS, default=list): vol.All(cv.ensure_list),
+        vol.Optional(ATTR_COMPONENT, default="main"): cv.string,
+        vol.Optional(ATTR_ENTITY_ID): cv.entity_ids,
+        vol.Optional(ATTR_AREA_ID): vol.All(cv.ensure_list, [cv.string]),
+        vol.Optional(ATTR_ROOM): vol.All(cv.ensure_list, [cv.string]),
+    }
+)
+
+
+@callback
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the services of the integration."""
+
+    async def async_send_command(call: ServiceCall) -> ServiceResponse:
+        """Send a command to all targeted devices."""
+        return await _async_send_command(hass, call)
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_SEND_COMMAND,
+        async_send_command,
+        schema=SEND_COMMAND_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+
+
+def _get_registry_device_ids(hass: HomeAssistant, call: ServiceCall) -> set[str]:
+    """Return the SmartThings device ids of the targeted entities and areas."""
+    device_registry = dr.async_get(hass)
+    entity_registry = er.async_get(hass)
+    registry_ids: set[str] = set()
+    for entity_id in call.data.get(ATTR_ENTITY_ID, []):
+        if (entry := entity_registry.async_get(entity_id)) and entry.device_id:
+            registry_ids.add(entry.device_id)
+    for area_id in call.data.get(ATTR_AREA_ID, []):
+        registry_ids.update(
+            device.id for device in dr.async_entries_for_area(device_registry, area_id)
+        )
+        registry_ids.update(
+            entry.device_id
+            for entry in er.async_entries_for_area(entity_registry, area_id)
+            if entry.device_id
+        )
+    device_ids = set()
+    for registry_id in registry_ids:
+        if device := device_registry.async_get(registry_id):
+            device_ids.update(
+                identifier
+                for domain, identifier in device.identifiers
+                if domain == DOMAIN
+            )
+    return device_ids
+
+
+def _get_targets(
+    hass: HomeAssistant, call: ServiceCall
+) -> list[tuple[Any, DeviceEntity]]:
+    """Return the brokers and devices the command is sent to.
+
+    Devices are selected by the targeted entities, areas and SmartThings
+    rooms and must have the capability on the component. A call without
+    any of them is rejected rather than sent to every device.
+    """
+    capability = call.data[ATTR_CAPABILITY]
+    component_id = call.data[ATTR_COMPONENT]
+    rooms = {room.lower() for room in call.data.get(ATTR_ROOM, [])}
+    if not (call.data.get(ATTR_ENTITY_ID) or call.data.get(ATTR_AREA_ID) or rooms):
+        raise ServiceValidationError(
+            translation_domain=DOMAIN, translation_key="no_target"
+        )
+    device_ids = _get_registry_device_ids(hass, call)
+    targets = []
+    for broker in hass.data[DOMAIN][DATA_BROKERS].values():
+        for device in broker.devices.values():
+            if device.device_id not in device_ids:
+                room = broker.rooms.get(device.room_id)
+                if not (
+                    room
+                    and (room.room_id in rooms or (room.name or "").lower() in rooms)
+                ):
+                    continue
+            if component_id == "main":
+                capabilities = device.capabilities
+            else:
+                capabilities = device.components.get(component_id, [])
+            if capability in capabilities:
+                targets.append((broker, device))
+    return targets
+
+
+async def _async_send_command(
+    hass: HomeAssistant, call: ServiceCall
+) -> ServiceResponse:
+    """Send the command of the call to its targets with bounded concurrency.
+
+    Each command is sent in a request of its own rather than batched with
+    the commands of entities, so that invalid arguments of a call do not
+    fail the other commands to the device.
+    """
+    semaphore = asyncio.Semaphore(BULK_COMMAND_CONCURRENCY)
+    start = monotonic()
+
+    async def send(broker, device: DeviceEntity) -> dict[str, Any]:
+        async with semaphore:
+            sent = monotonic()
+            outcome: dict[str, Any] = {"label": device.label}
+            try:
+                outcome["success"] = await broker.commands.async_send_now(
+                    device.device_id,
+                    call.data[ATTR_COMPONENT],
+                    call.data[ATTR_CAPABILITY],
+                    call.data[ATTR_COMMAND],
+                    call.data[ATTR_ARGUMENTS],
+                )
+            except ClientError as err:
+                outcome["success"] = False
+                outcome["error"] = str(err) or type(err).__name__
+            outcome["duration_ms"] = round((monotonic() - sent) * 1000)
+            return outcome
+
+    targets = _get_targets(hass, call)
+    outcomes = await asyncio.gather(*(send(*target) for target in targets))
+    if not call.return_response:
+        return None
+    succeeded = sum(1 for outcome in outcomes if outcome["success"])
+    return {
+        "succeeded": succeeded,
+        "failed": len(outcomes) - succeeded,
+        "duration_ms": round((monotonic() - start) * 1000),
+        "devices": {
+            device.device_id: outcome
+            for (_, device), outcome in zip(targets, outcomes)
+        },
+    }
@@ -0,0 +1,136 @@
+"""Dedicated HTTP session for SmartThings API traffic."""
+from __future__ import annotations
+
+import asyncio
+from collections import Counter
+import logging
+from types import SimpleNamespace
+
+from aiohttp import (
+    ClientError,
+    ClientSession,
+    ClientTimeout,
+    TCPConnector,
+    TraceConfig,
+    TraceConnectionCreateEndParams,
+    TraceConnectionReuseconnParams,
+    hdrs,
+)
+from pysmartthings.api import API_BASE
+
+from homeassistant.const import EVENT_HOMEASSISTANT_CLOSE
+from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.util.ssl import client_context
+
+from .const import (
+    API_CONNECTION_LIMIT,
+    API_DNS_CACHE_TTL,
+    API_KEEPALIVE_TIMEOUT,
+    API_PREWARM_TIMEOUT,
+    DATA_API_SESSION,
+    DOMAIN,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class ApiSession:
+    """Own a client session tuned for the SmartThings API.
+
+    All requests go to a single host, so the connection pool is sized for
+    the integration's own concurrency, idle connections are kept open for
+    long and DNS lookups are cached. New and reused connections are counted
+    to tell how often requests pay for a TLS handshake. Event streams hold
+    their connection open indefinitely, so they use a separate session that
+    does not take connections from the pool of the API requests.
+    """
+
+    def __init__(self) -> None:
+        """Create a new instance of the session."""
+        self.stats: Counter[str] = Counter()
+        trace_config = TraceConfig()
+        trace_config.on_connection_create_end.append(self._on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(self._on_connection_reuseconn)
+        self.session = ClientSession(
+            connector=TCPConnector(
+                limit=API_CONNECTION_LIMIT,
+                limit_per_host=API_CONNECTION_LIMIT,
+                keepalive_timeout=API_KEEPALIVE_TIMEOUT,
+                ttl_dns_cache=API_DNS_CACHE_TTL,
+                ssl=client_context(),
+            ),
+            headers={hdrs.ACCEPT_ENCODING: "gzip, deflate"},
+            trace_configs=[trace_config],
+        )
+        self._stream_session: ClientSession | None = None
+
+    @property
+    def stream_session(self) -> ClientSession:
+        """Return the session of the event streams, creating it if needed."""
+        if self._stream_session is None:
+            self._stream_session = ClientSession(
+                connector=TCPConnector(limit=0, ssl=client_context())
+            )
+        return self._stream_session
+
+    async def _on_connection_create_end(
+        self,
+        session: ClientSession,
+        context: SimpleNamespace,
+        params: TraceConnectionCreateEndParams,
+    ) -> None:
+        self.stats["connections_created"] += 1
+
+    async def _on_connection_reuseconn(
+        self,
+        session: ClientSession,
+        context: SimpleNamespace,
+        params: TraceConnectionReuseconnParams,
+    ) -> None:
+        self.stats["connections_reused"] += 1
+
+    async def async_prewarm(self, count: int) -> None:
+        """Open connections ahead of a burst of requests.
+
+        Concurrent requests each open a connection, which then stays in the
+        pool for the requests that follow. Failures are left to the
+        requests of the burst to report.
+        """
+
+        async def connect() -> None:
+            try:
+                async with self.session.head(
+                    API_BASE, timeout=ClientTimeout(total=API_PREWARM_TIMEOUT)
+                ) as resp:
+                    await resp.read()
+            except (ClientError, TimeoutError) as err:
+                _LOGGER.debug("Unable to open a connection to the API: %s", err)
+
+        await asyncio.gather(*(connect() for _ in range(count)))
+
+    async def async_close(self) -> None:
+        """Close the sessions and their connections."""
+        await self.session.close()
+        if self._stream_session is not None:
+            await self._stream_session.close()
+
+
+@callback
+def async_get_api_session(hass: HomeAssistant) -> ApiSession:
+    """Return the session of the SmartThings API, creating it if needed."""
+    data = hass.data[DOMAIN]
+    if api_session := data.get(DATA_API_SESSION):
+        return api_session
+    api_session = data[DATA_API_SESSION] = ApiSession()
+
+    async def async_close(event: Event) -> None:
+        await async_close_api_session(hass)
+
+    hass.bus.async_listen_once(EVENT_HOMEASSISTANT_CLOSE, async_close)
+    return api_session
+
+
+async def async_close_api_session(hass: HomeAssistant) -> None:
+    """Close the session of the SmartThings API if it is open."""
+    if api_session := hass.data.get(DOMAIN, {}).pop(DATA_API_SESSION, None):
+        await api_session.async_close()
@@ -0,0 +1,232 @@
+"""Standalone webhook ingestion process for SmartThings.
+
+The sidecar takes over the CPU heavy part of the SmartApp webhook from the
+Home Assistant event loop. It receives the webhook requests, verifies their
+signature, decodes and deduplicates the device events and forwards them in
+compact batches over a local socket to the integration. Lifecycles other
+than EVENT, and events of apps it does not know the key of, are proxied to
+Home Assistant unchanged.
+
+The integration launches it when enabled in the options. It runs as a
+script so that neither the package nor Home Assistant is imported, and can
+also be run locally against a running Home Assistant instance:
+
+    python -P custom_components/smartthings/sidecar.py --config <file>
+
+The -P flag keeps the directory of the script off the module path, where
+the platform modules would shadow standard library modules such as select.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+from collections import defaultdict
+import logging
+from pathlib import Path
+import sys
+from typing import Any
+
+from aiohttp import ClientSession, web
+
+if __package__:
+    from .ingest import (
+        LIFECYCLE_EVENT,
+        DeviceEvent,
+        EventIdCache,
+        SignatureVerifier,
+        get_app_id,
+        get_installed_app_id,
+        json_dumps,
+        json_loads,
+        parse_device_events,
+    )
+else:
+    # Run as a script, the decoding module is loaded from next to it. The
+    # directory goes last so it cannot shadow any other module.
+    sys.path.append(str(Path(__file__).parent))
+    from ingest import (  # type: ignore[no-redef]
+        LIFECYCLE_EVENT,
+        DeviceEvent,
+        EventIdCache,
+        SignatureVerifier,
+        get_app_id,
+        get_installed_app_id,
+        json_dumps,
+        json_loads,
+        parse_device_events,
+    )
+
+_LOGGER = logging.getLogger(__name__)
+
+# Events received within this window are forwarded as one batch
+BATCH_WINDOW = 0.02
+BATCH_SIZE = 500
+DEFAULT_HOST = "127.0.0.1"
+EVENT_ID_CACHE_SIZE = 4096
+EVENT_ID_CACHE_TTL = 600.0
+RECONNECT_INTERVAL = 5.0
+# Forwarded headers that describe the body and connection rather than the request
+HOP_HEADERS = {"connection", "content-length", "host", "transfer-encoding"}
+
+
+class IngestionSidecar:
+    """Receive webhook requests and forward batched events to the integration.
+
+    Configuration keys:
+    - host/port: address the webhook is served on, host defaults to loopback
+    - path: path of the webhook, also used in signature verification
+    - socket: unix socket the integration listens on for event batches
+    - forward_url: URL of the Home Assistant webhook for other requests
+    """
+
+    def __init__(self, config: dict[str, Any]) -> None:
+        """Create a new instance of the sidecar."""
+        self._config = config
+        self._path = config["path"]
+        self._verifier = SignatureVerifier(self._path)
+        self._seen_events = EventIdCache(EVENT_ID_CACHE_SIZE, EVENT_ID_CACHE_TTL)
+        self._apps: dict[str, str] = {}
+        self._pending: defaultdict[str, list[DeviceEvent]] = defaultdict(list)
+        self._flush_handle: asyncio.TimerHandle | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self._session: ClientSession | None = None
+
+    async def async_run(self) -> None:
+        """Serve the webhook until cancelled."""
+        self._session = ClientSession()
+        app = web.Application()
+        app.router.add_post(self._path, self._handle_webhook)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        host = self._config.get("host", DEFAULT_HOST)
+        site = web.TCPSite(runner, host, self._config["port"])
+        await site.start()
+        _LOGGER.info(
+            "Serving webhook on %s:%s%s", host, self._config["port"], self._path
+        )
+        try:
+            await self._async_maintain_connection()
+        finally:
+            await runner.cleanup()
+            await self._session.close()
+
+    async def _async_maintain_connection(self) -> None:
+        """Keep the socket to the integration connected."""
+        while True:
+            try:
+                reader, self._writer = await asyncio.open_unix_connection(
+                    self._config["socket"]
+                )
+            except OSError as err:
+                _LOGGER.debug("Unable to connect to the integration: %s", err)
+                await asyncio.sleep(RECONNECT_INTERVAL)
+                continue
+            _LOGGER.info("Connected to the integration")
+            try:
+                # The integration sends the public keys of its apps when
+                # connected and again whenever its apps change
+                while line := await reader.readline():
+                    message = json_loads(line)
+                    if "apps" in message:
+                        self._apps = message["apps"]
+            except OSError as err:
+                _LOGGER.debug("Connection to the integration lost: %s", err)
+            finally:
+                writer, self._writer = self._writer, None
+                writer.close()
+            _LOGGER.info("Disconnected from the integration")
+            await asyncio.sleep(RECONNECT_INTERVAL)
+
+    async def _handle_webhook(self, request: web.Request) -> web.StreamResponse:
+        """Handle a lifecycle request from SmartThings."""
+        body = await request.read()
+        try:
+            data = json_loads(body)
+        except ValueError:
+            return web.Response(status=400)
+        if not isinstance(data, dict):
+            return web.Response(status=400)
+        public_key = self._apps.get(get_app_id(data))
+        if (
+            data.get("lifecycle") != LIFECYCLE_EVENT
+            or public_key is None
+            or self._writer is None
+        ):
+            return await self._forward(request, body)
+        if not self._verifier.verify(public_key, request.headers):
+            _LOGGER.warning("Dropped request with an invalid signature")
+            return web.Response(status=401)
+        try:
+            installed_app_id = get_installed_app_id(data)
+            events = parse_device_events(data)
+        except (KeyError, TypeError):
+            _LOGGER.warning("Dropped request with an invalid payload")
+            return web.Response(status=400)
+        self._pending[installed_app_id].extend(
+            evt for evt in events if not self._seen_events.seen(evt.event_id)
+        )
+        if sum(len(events) for events in self._pending.values()) >= BATCH_SIZE:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(
+                BATCH_WINDOW, self._flush
+            )
+        return web.Response(
+            body=json_dumps({"eventData": {}}), content_type="application/json"
+        )
+
+    def _flush(self) -> None:
+        """Forward the pending events to the integration."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        pending, self._pending = self._pending, defaultdict(list)
+        if self._writer is None:
+            _LOGGER.warning("Dropped events, the integration is not connected")
+            return
+        for installed_app_id, events in pending.items():
+            if not events:
+                continue
+            self._writer.write(
+                json_dumps(
+                    {
+                        "installed_app_id": installed_app_id,
+                        "events": [tuple(evt) for evt in events],
+                    }
+                )
+                + b"\n"
+            )
+
+    async def _forward(self, request: web.Request, body: bytes) -> web.Response:
+        """Proxy a request to the Home Assistant webhook unchanged."""
+        headers = {
+            key: value
+            for key, value in request.headers.items()
+            if key.lower() not in HOP_HEADERS
+        }
+        async with self._session.post(
+            self._config["forward_url"], data=body, headers=headers
+        ) as resp:
+            return web.Response(
+                status=resp.status,
+                body=await resp.read(),
+                content_type=resp.content_type,
+            )
+
+
+def main() -> None:
+    """Run the sidecar."""
+    parser = argparse.ArgumentParser(description="SmartThings webhook sidecar")
+    parser.add_argument("--config", required=True, type=Path)
+    parser.add_argument("--debug", action="store_true")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.DEBUG if args.debug else logging.INFO)
+    config = json_loads(args.config.read_bytes())
+    try:
+        asyncio.run(IngestionSidecar(config).async_run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -2,9 +2,12 @@
 from __future__ import annotations
 
 import asyncio
+from collections.abc import Collection, Mapping
 import functools
 import logging
+from pathlib import Path
 import secrets
+import sys
 from typing import Any
 from urllib.parse import urlparse
 from uuid import uuid4
@@ -12,6 +15,7 @@ from uuid import uuid4
 from aiohttp import web
 from pysmartapp import Dispatcher, SmartAppManager
 from pysmartapp.const import SETTINGS_APP_ID
+from pysmartapp.errors import SignatureVerificationError, SmartAppNotRegisteredError
 from pysmartthings import (
     APP_TYPE_WEBHOOK,
     CLASSIFICATION_AUTOMATION,
@@ -28,39 +32,76 @@ from pysmartthings import (
 
 from homeassistant.components import cloud, webhook
 from homeassistant.config_entries import ConfigFlowResult
-from homeassistant.const import CONF_WEBHOOK_ID
-from homeassistant.core import HomeAssistant
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.const import (
+    CONF_WEBHOOK_ID,
+    CONTENT_TYPE_JSON,
+    EVENT_HOMEASSISTANT_STOP,
+)
+from homeassistant.core import Event, HomeAssistant, callback
 from homeassistant.helpers.dispatcher import (
     async_dispatcher_connect,
     async_dispatcher_send,
 )
+from homeassistant.helpers.event import async_track_time_interval
 from homeassistant.helpers.network import NoURLAvailableError, get_url
 from homeassistant.helpers.storage import Store
+from homeassistant.util.file import write_utf8_file
 
 from .const import (
     APP_NAME_PREFIX,
     APP_OAUTH_CLIENT_NAME,
     APP_OAUTH_SCOPES,
+    CAPTURE_BACKUP_COUNT,
+    CAPTURE_FILE,
+    CAPTURE_FLUSH_INTERVAL,
+    CAPTURE_MAX_BYTES,
     CONF_CLOUDHOOK_URL,
     CONF_INSTALLED_APP_ID,
     CONF_INSTANCE_ID,
     CONF_REFRESH_TOKEN,
     DATA_BROKERS,
+    DATA_CAPTURE,
+    DATA_CAPTURE_REMOVE,
+    DATA_CIRCUIT_BREAKERS,
+    DATA_EVENT_ROUTER,
     DATA_MANAGER,
+    DATA_SETUP_STAGES,
+    DATA_SIDECAR,
+    DATA_SIGNATURE_VERIFIER,
     DOMAIN,
     SETTINGS_INSTANCE_ID,
+    SIDECAR_CONFIG,
+    SIDECAR_SCRIPT,
+    SIDECAR_SOCKET,
     SIGNAL_SMARTAPP_PREFIX,
     STORAGE_KEY,
     STORAGE_VERSION,
     SUBSCRIPTION_WARNING_LIMIT,
-    CustomCapability
 )
+from .capture import TrafficCapture
+from .ingest import (
+    LIFECYCLE_EVENT,
+    DeviceEvent,
+    SignatureVerifier,
+    get_app_id,
+    get_installed_app_id,
+    json_dumps,
+    json_loads,
+    parse_device_events,
+)
+from .session import async_get_api_session
+
+# Subscribes to every attribute of a capability
+ATTRIBUTE_ALL = "*"
+
+# Capabilities that report repeated values as separate events
+ALL_EVENTS_CAPABILITIES = [
+    Capability.button,
+]
 
 IGNORED_CAPABILITIES = [
     Capability.execute,
     Capability.ocf,
-    CustomCapability.health_check,
 ]
 
 _LOGGER = logging.getLogger(__name__)
@@ -203,6 +244,7 @@ def setup_smartapp(hass, app):
     smartapp.name = app.display_name
     smartapp.description = app.description
     smartapp.permissions.extend(APP_OAUTH_SCOPES)
+    async_update_sidecar_apps(hass)
     return smartapp
 
 
@@ -271,8 +313,12 @@ async def setup_smartapp_endpoint(hass: HomeAssistant, fresh_install: bool):
 
     hass.data[DOMAIN] = {
         DATA_MANAGER: manager,
+        DATA_SIGNATURE_VERIFIER: SignatureVerifier(path),
         CONF_INSTANCE_ID: config[CONF_INSTANCE_ID],
         DATA_BROKERS: {},
+        DATA_CIRCUIT_BREAKERS: {},
+        DATA_EVENT_ROUTER: {},
+        DATA_SETUP_STAGES: {},
         CONF_WEBHOOK_ID: config[CONF_WEBHOOK_ID],
         # Will not be present if not enabled
         CONF_CLOUDHOOK_URL: config.get(CONF_CLOUDHOOK_URL),
@@ -303,11 +349,14 @@ async def unload_smartapp_endpoint(hass: HomeAssistant):
             }
         )
         _LOGGER.debug("Cloudhook '%s' was removed", cloudhook_url)
+    # Stop the ingestion sidecar and traffic capture
+    await async_stop_sidecar(hass)
+    await async_stop_capture(hass)
     # Remove the webhook
     webhook.async_unregister(hass, hass.data[DOMAIN][CONF_WEBHOOK_ID])
     # Disconnect all brokers
     for broker in hass.data[DOMAIN][DATA_BROKERS].values():
-        broker.disconnect()
+        await broker.async_disconnect()
     # Remove all handlers from manager
     hass.data[DOMAIN][DATA_MANAGER].dispatcher.disconnect_all()
     # Remove the component data
@@ -319,18 +368,26 @@ async def smartapp_sync_subscriptions(
     auth_token: str,
     location_id: str,
     installed_app_id: str,
-    devices,
+    targets: Mapping[str, Collection[str]],
 ):
-    """Synchronize subscriptions of an installed up."""
-    api = SmartThings(async_get_clientsession(hass), auth_token)
+    """Synchronize subscriptions of an installed up.
+
+    Targets map each capability to the attributes of it that are used. The
+    attributes are subscribed to individually and only on state changes,
+    unless the limit of subscriptions would be exceeded. Then capabilities
+    with the most attributes are subscribed to as a whole instead.
+    Capabilities whose repeated values matter receive all their events.
+    """
+    api = SmartThings(async_get_api_session(hass).session, auth_token)
     tasks = []
 
-    async def create_subscription(target: str):
+    async def create_subscription(target: tuple[str, str]):
         sub = Subscription()
         sub.installed_app_id = installed_app_id
         sub.location_id = location_id
         sub.source_type = SourceType.CAPABILITY
-        sub.capability = target
+        sub.capability, sub.attribute = target
+        sub.state_change_only = sub.capability not in ALL_EVENTS_CAPABILITIES
         try:
             await api.create_subscription(sub)
             _LOGGER.debug(
@@ -352,44 +409,38 @@ async def smartapp_sync_subscriptions(
                     "Removed subscription for '%s' under app '%s' because it was no"
                     " longer needed"
                 ),
-                sub.capability,
+                (sub.capability, sub.attribute),
                 installed_app_id,
             )
         except Exception as error:  # pylint:disable=broad-except
             _LOGGER.error(
                 "Failed to remove subscription for '%s' under app '%s': %s",
-                sub.capability,
+                (sub.capability, sub.attribute),
                 installed_app_id,
                 error,
             )
 
-    # Build set of capabilities and prune unsupported ones
-    capabilities = set()
-    # Custom Component >>
-    disabled_capabilities = list[str]
-    for device in devices:
-        if all(
-            [
-                "custom.disabledCapabilities" in device.capabilities,
-                device.status.attributes["disabledCapabilities"].value is not None,
-            ]
-        ):
-            disabled_capabilities = device.status.attributes["disabledCapabilities"].value
-            new_capabilities = device.capabilities
-            for disabled_capability in disabled_capabilities:
-                if disabled_capability in new_capabilities:
-                    new_capabilities.remove(disabled_capability)
-            capabilities.update(new_capabilities)
-        else:
-            capabilities.update(device.capabilities)
-
-        for _capabilities in device.components.values():
-            capabilities.update(_capabilities)
-    # Custom Component <<
-    # Remove unused capabilities
-    capabilities.difference_update(IGNORED_CAPABILITIES)
-    capability_count = len(capabilities)
-    if capability_count > SUBSCRIPTION_WARNING_LIMIT:
+    # Build set of capability attributes and prune unsupported ones
+    attributes = {
+        capability: {ATTRIBUTE_ALL} if ATTRIBUTE_ALL in used else set(used)
+        for capability, used in targets.items()
+        if used and capability not in IGNORED_CAPABILITIES
+    }
+    required = {
+        (capability, attribute)
+        for capability, used in attributes.items()
+        for attribute in used
+    }
+    # Subscribe to whole capabilities when there are too many attributes
+    for capability, used in sorted(
+        attributes.items(), key=lambda item: len(item[1]), reverse=True
+    ):
+        if len(required) <= SUBSCRIPTION_WARNING_LIMIT or len(used) == 1:
+            break
+        required.difference_update((capability, attribute) for attribute in used)
+        required.add((capability, ATTRIBUTE_ALL))
+    subscription_count = len(required)
+    if subscription_count > SUBSCRIPTION_WARNING_LIMIT:
         _LOGGER.warning(
             (
                 "Some device attributes may not receive push updates and there may be"
@@ -397,27 +448,32 @@ async def smartapp_sync_subscriptions(
                 " subscriptions are required but there is a limit of %s per app"
             ),
             installed_app_id,
-            capability_count,
+            subscription_count,
             SUBSCRIPTION_WARNING_LIMIT,
         )
     _LOGGER.debug(
-        "Synchronizing subscriptions for %s capabilities under app '%s': %s",
-        capability_count,
+        "Synchronizing %s subscriptions under app '%s': %s",
+        subscription_count,
         installed_app_id,
-        capabilities,
+        required,
     )
 
     # Get current subscriptions and find differences
     subscriptions = await api.subscriptions(installed_app_id)
     for subscription in subscriptions:
-        if subscription.capability in capabilities:
-            capabilities.remove(subscription.capability)
+        target = (subscription.capability, subscription.attribute)
+        state_change_only = subscription.capability not in ALL_EVENTS_CAPABILITIES
+        if (
+            target in required
+            and subscription.state_change_only == state_change_only
+        ):
+            required.remove(target)
         else:
             # Delete the subscription
             tasks.append(delete_subscription(subscription))
 
-    # Remaining capabilities need subscriptions created
-    tasks.extend([create_subscription(c) for c in capabilities])
+    # Remaining attributes need subscriptions created
+    tasks.extend([create_subscription(target) for target in required])
 
     if tasks:
         await asyncio.gather(*tasks)
@@ -555,13 +611,203 @@ async def smartapp_uninstall(hass: HomeAssistant, req, resp, app):
     )
 
 
+async def smartapp_event(hass: HomeAssistant, data: dict[str, Any], headers) -> dict:
+    """Handle an EVENT lifecycle request.
+
+    Device events are decoded straight into compact records and routed to
+    the broker of the installed app, bypassing the generic request objects
+    of pysmartapp.
+    """
+    manager = hass.data[DOMAIN][DATA_MANAGER]
+    installed_app_id = get_installed_app_id(data)
+    if not (smartapp := manager.smartapps.get(get_app_id(data))):
+        raise SmartAppNotRegisteredError(installed_app_id)
+    verifier = hass.data[DOMAIN][DATA_SIGNATURE_VERIFIER]
+    # RSA verification costs the same for any batch size, so only requests
+    # that were not verified recently are worth moving off the event loop
+    if verifier.offload and not verifier.is_verified(smartapp.public_key, headers):
+        verified = await hass.async_add_executor_job(
+            verifier.verify, smartapp.public_key, headers
+        )
+    else:
+        verified = verifier.verify(smartapp.public_key, headers)
+    if not verified:
+        raise SignatureVerificationError
+    events = parse_device_events(data)
+    _LOGGER.debug(
+        "%s: %s received for installed app %s",
+        data.get("executionId"),
+        LIFECYCLE_EVENT,
+        installed_app_id,
+    )
+    router = hass.data[DOMAIN][DATA_EVENT_ROUTER]
+    if events and (handler := router.get(installed_app_id)):
+        handler(events)
+    return {"eventData": {}}
+
+
 async def smartapp_webhook(hass: HomeAssistant, webhook_id: str, request):
     """Handle a smartapp lifecycle event callback from SmartThings.
 
-    Requests from SmartThings are digitally signed and the SmartAppManager
-    validates the signature for authenticity.
+    Requests from SmartThings are digitally signed and the signature is
+    validated for authenticity before the request is processed. The body is
+    read once and decoded with the fastest JSON codec available.
+    """
+    data = json_loads(await request.read())
+    if data.get("lifecycle") == LIFECYCLE_EVENT:
+        result = await smartapp_event(hass, data, request.headers)
+    else:
+        manager = hass.data[DOMAIN][DATA_MANAGER]
+        result = await manager.handle_request(data, request.headers)
+    # Requests that fail verification raise above and are never captured
+    if capture := hass.data[DOMAIN].get(DATA_CAPTURE):
+        capture.record(request.headers, data)
+    return web.Response(body=json_dumps(result), content_type=CONTENT_TYPE_JSON)
+
+
+async def async_start_capture(hass: HomeAssistant) -> None:
+    """Start capturing the webhook traffic if it is not captured yet.
+
+    Lifecycle payloads are written periodically to a rotated file in the
+    configuration directory that the replay tooling can read. Only the
+    requests of the webhook are captured, events received through the
+    ingestion sidecar or the event stream are not.
+    """
+    data = hass.data[DOMAIN]
+    if data.get(DATA_CAPTURE):
+        return
+    capture = TrafficCapture(
+        Path(hass.config.path(CAPTURE_FILE)), CAPTURE_MAX_BYTES, CAPTURE_BACKUP_COUNT
+    )
+
+    async def async_flush(now) -> None:
+        if lines := capture.pop_pending():
+            await hass.async_add_executor_job(capture.write, lines)
+
+    async def async_stop(event: Event) -> None:
+        await async_stop_capture(hass)
+
+    data[DATA_CAPTURE] = capture
+    data[DATA_CAPTURE_REMOVE] = async_track_time_interval(
+        hass, async_flush, CAPTURE_FLUSH_INTERVAL
+    )
+    hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, async_stop)
+    _LOGGER.debug("Started capturing webhook traffic to %s", CAPTURE_FILE)
+
+
+async def async_stop_capture(hass: HomeAssistant) -> None:
+    """Stop capturing the webhook traffic and write what is buffered."""
+    data = hass.data.get(DOMAIN, {})
+    if not (capture := data.pop(DATA_CAPTURE, None)):
+        return
+    data.pop(DATA_CAPTURE_REMOVE)()
+    await hass.async_add_executor_job(capture.close, capture.pop_pending())
+    _LOGGER.debug("Stopped capturing webhook traffic")
+
+
+async def async_start_sidecar(hass: HomeAssistant, host: str, port: int) -> None:
+    """Launch the webhook ingestion sidecar if it is not running yet.
+
+    The sidecar serves the webhook on its own address, which the reverse
+    proxy in front of Home Assistant should route the webhook path to. Event
+    batches are received from it on a local unix socket. The sidecar runs
+    as a script so that it does not import Home Assistant.
     """
+    data = hass.data[DOMAIN]
+    if data.get(DATA_SIDECAR):
+        return
+    try:
+        internal_url = get_url(hass, allow_external=False, allow_cloud=False)
+    except NoURLAvailableError:
+        _LOGGER.warning(
+            "Unable to start the ingestion sidecar without an internal URL"
+        )
+        return
+
+    socket_path = hass.config.path(SIDECAR_SOCKET)
+    config_path = hass.config.path(SIDECAR_CONFIG)
+    config = {
+        "host": host,
+        "port": port,
+        "path": data[DATA_MANAGER].path,
+        "socket": socket_path,
+        "forward_url": internal_url
+        + webhook.async_generate_path(data[CONF_WEBHOOK_ID]),
+    }
+    await hass.async_add_executor_job(
+        write_utf8_file, config_path, json_dumps(config).decode()
+    )
+    writers: set[asyncio.StreamWriter] = set()
+    server = await asyncio.start_unix_server(
+        functools.partial(_async_handle_sidecar, hass, writers), path=socket_path
+    )
+    process = await asyncio.create_subprocess_exec(
+        sys.executable,
+        "-P",
+        str(Path(__file__).with_name(SIDECAR_SCRIPT)),
+        "--config",
+        config_path,
+        cwd=hass.config.config_dir,
+    )
+    data[DATA_SIDECAR] = (server, process, writers)
+
+    async def async_stop(event: Event) -> None:
+        await async_stop_sidecar(hass)
+
+    hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, async_stop)
+    _LOGGER.debug("Started ingestion sidecar on port %s (pid %s)", port, process.pid)
+
+
+async def async_stop_sidecar(hass: HomeAssistant) -> None:
+    """Stop the webhook ingestion sidecar if it is running."""
+    if not (sidecar := hass.data.get(DOMAIN, {}).pop(DATA_SIDECAR, None)):
+        return
+    server, process, writers = sidecar
+    server.close()
+    for writer in writers:
+        writer.close()
+    if process.returncode is None:
+        process.terminate()
+        await process.wait()
+    _LOGGER.debug("Stopped ingestion sidecar")
+
+
+def _sidecar_apps_message(hass: HomeAssistant) -> bytes:
+    """Return the message with the public keys of the registered apps."""
     manager = hass.data[DOMAIN][DATA_MANAGER]
-    data = await request.json()
-    result = await manager.handle_request(data, request.headers)
-    return web.json_response(result)
+    apps = {app_id: app.public_key for app_id, app in manager.smartapps.items()}
+    return json_dumps({"apps": apps}) + b"\n"
+
+
+@callback
+def async_update_sidecar_apps(hass: HomeAssistant) -> None:
+    """Send the public keys of the registered apps to the ingestion sidecar."""
+    if not (sidecar := hass.data.get(DOMAIN, {}).get(DATA_SIDECAR)):
+        return
+    message = _sidecar_apps_message(hass)
+    for writer in sidecar[2]:
+        writer.write(message)
+
+
+async def _async_handle_sidecar(
+    hass: HomeAssistant,
+    writers: set[asyncio.StreamWriter],
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+) -> None:
+    """Route the event batches received from the ingestion sidecar."""
+    router = hass.data[DOMAIN][DATA_EVENT_ROUTER]
+    # The sidecar verifies signatures with the public keys of the apps, which
+    # are sent again whenever they change
+    writer.write(_sidecar_apps_message(hass))
+    writers.add(writer)
+    try:
+        while line := await reader.readline():
+            message = json_loads(line)
+            if handler := router.get(message["installed_app_id"]):
+                handler([DeviceEvent(*record) for record in message["events"]])
+    except (OSError, ValueError) as err:
+        _LOGGER.debug("Connection to the ingestion sidecar lost: %s", err)
+    finally:
+        writers.discard(writer)
+        writer.close()
@@ -0,0 +1,180 @@
+"""Server-sent events transport for SmartThings device events."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable
+from http import HTTPStatus
+import logging
+
+from aiohttp import ClientError, ClientResponseError, ClientSession, ClientTimeout
+from pysmartthings.api import API_BASE
+
+from homeassistant.core import HomeAssistant
+
+from .ingest import (
+    EVENT_TYPE_DEVICE,
+    DeviceEvent,
+    json_dumps,
+    json_loads,
+    parse_event_item,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+API_SUBSCRIPTIONS = "subscriptions"
+RECONNECT_MIN_INTERVAL = 1
+RECONNECT_MAX_INTERVAL = 300
+# The stream sends keep-alives, treat a silent connection as lost
+READ_TIMEOUT = 120
+
+
+class SmartThingsEventStream:
+    """Receive the device events of a location over a long-lived event stream.
+
+    The stream subscribes to the device events of the location and feeds
+    them into the same handler as the webhook. It reconnects automatically
+    with backoff and resumes from the last received event.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        session: ClientSession,
+        location_id: str,
+        installed_app_id: str,
+        get_token: Callable[[], str],
+        refresh_token: Callable[[str], Awaitable[None]],
+        handler: Callable[[list[DeviceEvent]], None],
+        *,
+        api_base: str = API_BASE,
+    ) -> None:
+        """Create a new instance of the event stream."""
+        self._hass = hass
+        self._session = session
+        self._location_id = location_id
+        self._installed_app_id = installed_app_id
+        self._get_token = get_token
+        self._refresh_token = refresh_token
+        self._handler = handler
+        self._api_base = api_base
+        self._registration_url: str | None = None
+        self._last_event_id: str | None = None
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        """Start receiving events in the background."""
+        self._task = self._hass.async_create_background_task(
+            self._async_run(), f"SmartThings event stream {self._installed_app_id}"
+        )
+
+    def stop(self) -> None:
+        """Stop receiving events."""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    @property
+    def _headers(self) -> dict[str, str]:
+        return {"Authorization": f"Bearer {self._get_token()}"}
+
+    async def _async_subscribe(self) -> str:
+        """Create a subscription to the events of the location."""
+        data = {
+            "name": f"Home Assistant {self._installed_app_id}",
+            "version": 1,
+            "subscriptionFilters": [
+                {
+                    "type": "LOCATIONIDS",
+                    "value": [self._location_id],
+                    "eventType": [EVENT_TYPE_DEVICE],
+                }
+            ],
+        }
+        async with self._session.post(
+            self._api_base + API_SUBSCRIPTIONS,
+            data=json_dumps(data),
+            headers={**self._headers, "Content-Type": "application/json"},
+        ) as resp:
+            resp.raise_for_status()
+            return json_loads(await resp.read())["registrationUrl"]
+
+    async def _async_run(self) -> None:
+        """Keep the event stream connected."""
+        interval = RECONNECT_MIN_INTERVAL
+        refreshed = False
+        while True:
+            token = self._get_token()
+            try:
+                if self._registration_url is None:
+                    self._registration_url = await self._async_subscribe()
+                await self._async_receive()
+                interval = RECONNECT_MIN_INTERVAL
+                refreshed = False
+            except ClientResponseError as err:
+                _LOGGER.debug("Event stream request failed: %s", err)
+                if err.status == HTTPStatus.UNAUTHORIZED:
+                    # Retry right away once the token was replaced
+                    if not refreshed and await self._async_refresh_token(token):
+                        refreshed = True
+                        continue
+                elif err.status in (HTTPStatus.NOT_FOUND, HTTPStatus.GONE):
+                    # The subscription expired, create a new one
+                    self._registration_url = None
+            except (ClientError, asyncio.TimeoutError) as err:
+                _LOGGER.debug("Event stream disconnected: %s", err)
+            await asyncio.sleep(interval)
+            interval = min(interval * 2, RECONNECT_MAX_INTERVAL)
+
+    async def _async_refresh_token(self, expired_token: str) -> bool:
+        """Refresh the rejected access token and return whether it succeeded."""
+        try:
+            await self._refresh_token(expired_token)
+        except Exception:  # pylint: disable=broad-except
+            _LOGGER.exception("Unable to refresh the event stream token")
+            return False
+        return True
+
+    async def _async_receive(self) -> None:
+        """Read events from the stream until it is closed."""
+        headers = {**self._headers, "Accept": "text/event-stream"}
+        if self._last_event_id:
+            headers["Last-Event-ID"] = self._last_event_id
+        async with self._session.get(
+            self._registration_url,
+            headers=headers,
+            timeout=ClientTimeout(total=None, sock_read=READ_TIMEOUT),
+        ) as resp:
+            resp.raise_for_status()
+            _LOGGER.debug(
+                "Event stream connected for installed app %s", self._installed_app_id
+            )
+            event_id = None
+            data: list[str] = []
+            async for raw_line in resp.content:
+                line = raw_line.decode().rstrip("\r\n")
+                if line:
+                    field, _, value = line.partition(":")
+                    value = value.removeprefix(" ")
+                    if field == "data":
+                        data.append(value)
+                    elif field == "id":
+                        event_id = value
+                    continue
+                # A blank line dispatches the message
+                if event_id:
+                    self._last_event_id = event_id
+                if data:
+                    self._dispatch("\n".join(data))
+                event_id = None
+                data = []
+
+    def _dispatch(self, data: str) -> None:
+        """Hand the device event of a message to the handler."""
+        try:
+            item = json_loads(data)
+            evt = parse_event_item(item.get("event", item))
+        except (ValueError, KeyError, AttributeError):
+            _LOGGER.debug("Ignored unexpected event stream message: %s", data)
+            return
+        if evt is not None:
+            self._handler([evt])
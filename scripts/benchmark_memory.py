@@ -0,0 +1,192 @@
+"""Memory benchmark of devices and entities for synthetic fleets.
+
+Builds fleets of synthetic devices with their status, sets up the device
+broker and creates the entities of every platform through the platforms'
+own setup, and reports the memory traced per device and per entity. It
+then replays a round of events for every device to show what applying
+updates retains.
+
+Requires Home Assistant and the integration's requirements to be installed.
+
+Usage: python scripts/benchmark_memory.py [--sizes 100 1000 10000]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gc
+from pathlib import Path
+import random
+import sys
+import tempfile
+import tracemalloc
+from types import SimpleNamespace
+import uuid
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+# pylint: disable=wrong-import-position
+from pysmartthings import DeviceEntity, RoomEntity  # noqa: E402
+
+from homeassistant.core import HomeAssistant  # noqa: E402
+
+from custom_components.smartthings import DeviceBroker  # noqa: E402
+from custom_components.smartthings.const import (  # noqa: E402
+    CONF_INSTALLED_APP_ID,
+    DATA_BROKERS,
+    DATA_EVENT_ROUTER,
+    DOMAIN,
+    PLATFORMS,
+)
+from custom_components.smartthings.ingest import DeviceEvent  # noqa: E402
+
+DEFAULT_SIZES = (100, 1000, 10000)
+
+# Capabilities, attributes and value factories of the synthetic devices
+PROFILES = (
+    {
+        "lock": ("lock", lambda: random.choice(["locked", "unlocked"])),
+        "battery": ("battery", lambda: random.randint(0, 100)),
+        "healthCheck": ("DeviceWatch-DeviceStatus", lambda: "online"),
+    },
+    {
+        "waterSensor": ("water", lambda: random.choice(["dry", "wet"])),
+        "temperatureMeasurement": ("temperature", lambda: random.uniform(15, 30)),
+        "tamperAlert": ("tamper", lambda: random.choice(["clear", "detected"])),
+        "battery": ("battery", lambda: random.randint(0, 100)),
+        "healthCheck": ("DeviceWatch-DeviceStatus", lambda: "online"),
+    },
+    {
+        "button": ("button", lambda: random.choice(["pushed", "held"])),
+        "battery": ("battery", lambda: random.randint(0, 100)),
+        "healthCheck": ("DeviceWatch-DeviceStatus", lambda: "online"),
+    },
+)
+
+
+def build_devices(count: int, location_id: str, room_id: str) -> list[DeviceEntity]:
+    """Build synthetic devices with their status."""
+    devices = []
+    for index in range(count):
+        profile = PROFILES[index % len(PROFILES)]
+        device_id = str(uuid.uuid4())
+        device = DeviceEntity(
+            None,
+            {
+                "deviceId": device_id,
+                "name": f"Device {index}",
+                "label": f"Device {index}",
+                "locationId": location_id,
+                "roomId": room_id,
+                "components": [
+                    {
+                        "id": "main",
+                        "capabilities": [{"id": capability} for capability in profile],
+                    }
+                ],
+            },
+        )
+        device.status.apply_data(
+            {
+                "components": {
+                    "main": {
+                        capability: {attribute: {"value": value()}}
+                        for capability, (attribute, value) in profile.items()
+                    }
+                }
+            }
+        )
+        devices.append(device)
+    return devices
+
+
+def build_events(devices: list[DeviceEntity], location_id: str) -> list[DeviceEvent]:
+    """Build one event per attribute of every device."""
+    events = []
+    for index, device in enumerate(devices):
+        profile = PROFILES[index % len(PROFILES)]
+        events.extend(
+            DeviceEvent(
+                str(uuid.uuid4()),
+                location_id,
+                device.device_id,
+                "main",
+                capability,
+                attribute,
+                value(),
+                None,
+            )
+            for capability, (attribute, value) in profile.items()
+        )
+    return events
+
+
+def traced() -> int:
+    """Return the currently traced memory after collecting garbage."""
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0]
+
+
+async def measure(count: int) -> tuple[int, int, int, int]:
+    """Measure a fleet of the given size."""
+    location_id = str(uuid.uuid4())
+    room = RoomEntity(None, {"roomId": str(uuid.uuid4()), "name": "Room"})
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = HomeAssistant(config_dir)
+        entry = SimpleNamespace(
+            entry_id="benchmark",
+            data={CONF_INSTALLED_APP_ID: str(uuid.uuid4())},
+            options={},
+        )
+        hass.data[DOMAIN] = {DATA_EVENT_ROUTER: {}, DATA_BROKERS: {}}
+
+        tracemalloc.start()
+        start = traced()
+        devices = build_devices(count, location_id, room.room_id)
+        after_devices = traced()
+
+        broker = DeviceBroker(hass, entry, None, None, devices, [room], [])
+        hass.data[DOMAIN][DATA_BROKERS][entry.entry_id] = broker
+        entities: list = []
+        for platform in PLATFORMS:
+            module = __import__(
+                f"custom_components.smartthings.{platform}", fromlist=["_"]
+            )
+            await module.async_setup_entry(hass, entry, entities.extend)
+        after_entities = traced()
+
+        broker._event_handler(build_events(devices, location_id))  # pylint: disable=protected-access
+        after_events = traced()
+        tracemalloc.stop()
+
+    return (
+        (after_devices - start) // count,
+        len(entities),
+        (after_entities - after_devices) // max(len(entities), 1),
+        (after_events - after_entities) // count,
+    )
+
+
+async def run(sizes: list[int]) -> None:
+    """Run the benchmark for all sizes."""
+    print(
+        f"{'devices':>8} {'B/device':>10} {'entities':>9} {'B/entity':>10}"
+        f" {'B/device after events':>22}"
+    )
+    for count in sizes:
+        per_device, entity_count, per_entity, per_event_round = await measure(count)
+        print(
+            f"{count:>8} {per_device:>10} {entity_count:>9} {per_entity:>10}"
+            f" {per_event_round:>22}"
+        )
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    asyncio.run(run(parser.parse_args().sizes))
+
+
+if __name__ == "__main__":
+    main()
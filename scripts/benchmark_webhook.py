@@ -0,0 +1,123 @@
+"""Micro-benchmark of SmartApp webhook payload decoding.
+
+Compares the previous path (stdlib JSON decoding followed by pysmartapp
+building request and event objects) with the integration's decoding into
+compact event records for realistic EVENT batch sizes.
+
+Usage: python scripts/benchmark_webhook.py [--iterations N]
+"""
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import json
+from pathlib import Path
+import random
+import timeit
+import uuid
+
+INGEST_PATH = (
+    Path(__file__).parent.parent / "custom_components" / "smartthings" / "ingest.py"
+)
+BATCH_SIZES = (1, 10, 50, 200)
+
+SAMPLE_EVENTS = (
+    ("temperatureMeasurement", "temperature", lambda: round(random.uniform(15, 30), 1)),
+    ("battery", "battery", lambda: random.randint(0, 100)),
+    ("waterSensor", "water", lambda: random.choice(["dry", "wet"])),
+    ("lock", "lock", lambda: random.choice(["locked", "unlocked"])),
+    ("button", "button", lambda: random.choice(["pushed", "held", "double"])),
+)
+
+
+def load_ingest():
+    """Load the ingest module without importing Home Assistant."""
+    spec = importlib.util.spec_from_file_location("ingest", INGEST_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def build_payload(batch_size: int) -> bytes:
+    """Build an EVENT lifecycle payload with the given number of events."""
+    location_id = str(uuid.uuid4())
+    device_ids = [str(uuid.uuid4()) for _ in range(max(1, batch_size // 4))]
+    events = []
+    for _ in range(batch_size):
+        capability, attribute, value = random.choice(SAMPLE_EVENTS)
+        events.append(
+            {
+                "eventTime": "2024-01-01T00:00:00.000Z",
+                "eventType": "DEVICE_EVENT",
+                "deviceEvent": {
+                    "subscriptionName": f"{capability}_subscription",
+                    "eventId": str(uuid.uuid4()),
+                    "locationId": location_id,
+                    "deviceId": random.choice(device_ids),
+                    "componentId": "main",
+                    "capability": capability,
+                    "attribute": attribute,
+                    "value": value(),
+                    "valueType": "string",
+                    "stateChange": True,
+                    "data": {},
+                },
+            }
+        )
+    payload = {
+        "lifecycle": "EVENT",
+        "executionId": str(uuid.uuid4()),
+        "locale": "en",
+        "version": "0.1.0",
+        "settings": {"appId": str(uuid.uuid4())},
+        "eventData": {
+            "authToken": str(uuid.uuid4()),
+            "installedApp": {
+                "installedAppId": str(uuid.uuid4()),
+                "locationId": location_id,
+                "config": {},
+                "permissions": ["r:devices:*"],
+            },
+            "events": events,
+        },
+    }
+    return json.dumps(payload).encode()
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    ingest = load_ingest()
+    try:
+        from pysmartapp.event import EventRequest  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        EventRequest = None
+
+    def baseline(body: bytes):
+        data = json.loads(body)
+        result = EventRequest(data).events if EventRequest else data
+        return result, json.dumps({"eventData": {}})
+
+    def compact(body: bytes):
+        data = ingest.json_loads(body)
+        return ingest.parse_device_events(data), ingest.json_dumps({"eventData": {}})
+
+    print(f"JSON codec: {'orjson' if ingest.orjson else 'json'}")
+    if EventRequest is None:
+        print("pysmartapp is not installed, baseline excludes event object creation")
+    print(f"{'events':>8} {'baseline us':>12} {'compact us':>12} {'speedup':>8}")
+    for batch_size in BATCH_SIZES:
+        body = build_payload(batch_size)
+        base = timeit.timeit(lambda: baseline(body), number=args.iterations)
+        fast = timeit.timeit(lambda: compact(body), number=args.iterations)
+        print(
+            f"{batch_size:>8} {base / args.iterations * 1e6:>12.1f}"
+            f" {fast / args.iterations * 1e6:>12.1f} {base / fast:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
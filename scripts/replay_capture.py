@@ -0,0 +1,144 @@
+"""Replay captured SmartApp webhook traffic through the device broker.
+
+Feeds the EVENT lifecycles of a capture written by the integration's
+traffic capture option into DeviceBroker._event_handler, either with the
+captured timing (optionally accelerated) or as fast as possible, and
+reports throughput and the broker's event statistics. Devices come from a
+fixture file of device and status payloads as returned by the SmartThings
+API, or are generated from the device ids seen in the capture.
+
+Requires Home Assistant and the integration's requirements to be installed.
+
+Usage: python scripts/replay_capture.py CAPTURE [--devices FIXTURE]
+       [--speed N] [--profile]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import cProfile
+import json
+from pathlib import Path
+import pstats
+import sys
+import tempfile
+from time import perf_counter
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+# pylint: disable=wrong-import-position
+from pysmartthings import DeviceEntity  # noqa: E402
+
+from homeassistant.core import HomeAssistant  # noqa: E402
+
+from custom_components.smartthings import DeviceBroker  # noqa: E402
+from custom_components.smartthings.capture import read_capture  # noqa: E402
+from custom_components.smartthings.const import (  # noqa: E402
+    CONF_INSTALLED_APP_ID,
+    DATA_EVENT_ROUTER,
+    DOMAIN,
+)
+from custom_components.smartthings.ingest import (  # noqa: E402
+    LIFECYCLE_EVENT,
+    get_installed_app_id,
+    parse_device_events,
+)
+
+
+def load_devices(fixture: Path | None, records: list[dict]) -> list[DeviceEntity]:
+    """Load the fixture devices or generate them from the capture."""
+    if fixture is not None:
+        devices = []
+        for item in json.loads(fixture.read_text()):
+            device = DeviceEntity(None, item["device"])
+            device.status.apply_data(item.get("status", {}))
+            devices.append(device)
+        return devices
+    device_ids = {
+        evt.device_id
+        for record in records
+        for evt in parse_device_events(record["payload"])
+    }
+    return [
+        DeviceEntity(
+            None,
+            {
+                "deviceId": device_id,
+                "name": device_id,
+                "label": device_id,
+                "components": [{"id": "main", "capabilities": []}],
+            },
+        )
+        for device_id in device_ids
+    ]
+
+
+async def replay(args: argparse.Namespace) -> None:
+    """Replay the capture and report the results."""
+    records = [
+        record
+        for record in read_capture(args.capture)
+        if record["payload"].get("lifecycle") == LIFECYCLE_EVENT
+    ]
+    if not records:
+        print("The capture holds no EVENT lifecycles")
+        return
+    devices = load_devices(args.devices, records)
+
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = HomeAssistant(config_dir)
+        hass.data[DOMAIN] = {DATA_EVENT_ROUTER: {}}
+        entry = SimpleNamespace(
+            entry_id="replay",
+            data={CONF_INSTALLED_APP_ID: get_installed_app_id(records[0]["payload"])},
+            options={},
+        )
+        broker = DeviceBroker(hass, entry, None, None, devices, [], [])
+
+        profiler = cProfile.Profile() if args.profile else None
+        event_count = 0
+        first_time = records[0]["time"]
+        start = perf_counter()
+        if profiler:
+            profiler.enable()
+        for record in records:
+            if args.speed:
+                delay = (record["time"] - first_time) / args.speed - (
+                    perf_counter() - start
+                )
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            events = parse_device_events(record["payload"])
+            event_count += len(events)
+            broker._event_handler(events)  # pylint: disable=protected-access
+            await asyncio.sleep(0)
+        elapsed = perf_counter() - start
+        if profiler:
+            profiler.disable()
+
+    print(f"Requests: {len(records)}, events: {event_count}, devices: {len(devices)}")
+    print(f"Elapsed: {elapsed:.3f}s, {event_count / elapsed:.0f} events/s")
+    for key, value in sorted(broker.stats.items()):
+        print(f"{key}: {value}")
+    if profiler:
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(25)
+
+
+def main() -> None:
+    """Run the replay."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("capture", type=Path)
+    parser.add_argument("--devices", type=Path, help="fixture of device payloads")
+    parser.add_argument(
+        "--speed",
+        type=float,
+        default=0,
+        help="replay speed relative to the capture, 0 for as fast as possible",
+    )
+    parser.add_argument("--profile", action="store_true")
+    asyncio.run(replay(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""Local stand-in for the SmartThings event stream endpoints.
+
+Serves the subscription endpoint and an event stream of synthetic device
+events so that the integration's event stream transport can be exercised
+without the SmartThings cloud. Point the stream at it with
+``api_base="http://127.0.0.1:8090/"``.
+
+The stream honours ``Last-Event-ID`` by replaying the events that were
+missed, and can be made to drop connections periodically to exercise
+reconnection.
+
+Usage: python scripts/sse_standin.py [--port N] [--rate N] [--drop-after N]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+from collections import deque
+from datetime import UTC, datetime
+import json
+import random
+import uuid
+
+from aiohttp import web
+
+SAMPLE_EVENTS = (
+    ("temperatureMeasurement", "temperature", lambda: round(random.uniform(15, 30), 1)),
+    ("battery", "battery", lambda: random.randint(0, 100)),
+    ("waterSensor", "water", lambda: random.choice(["dry", "wet"])),
+    ("lock", "lock", lambda: random.choice(["locked", "unlocked"])),
+    ("switch", "switch", lambda: random.choice(["on", "off"])),
+)
+HISTORY_SIZE = 1000
+KEEP_ALIVE_INTERVAL = 15
+
+
+class StandIn:
+    """Generate device events and serve them to subscribers."""
+
+    def __init__(self, args: argparse.Namespace) -> None:
+        """Create a new instance of the stand-in."""
+        self._args = args
+        self._device_ids = args.device or [str(uuid.uuid4()) for _ in range(5)]
+        self._history: deque[tuple[int, bytes]] = deque(maxlen=HISTORY_SIZE)
+        self._sequence = 0
+        self._new_event = asyncio.Condition()
+        self._subscriptions: dict[str, str] = {}
+
+    def _authorized(self, request: web.Request) -> bool:
+        if self._args.token is None:
+            return True
+        return request.headers.get("Authorization") == f"Bearer {self._args.token}"
+
+    async def subscribe(self, request: web.Request) -> web.Response:
+        """Create a subscription and return its registration URL."""
+        if not self._authorized(request):
+            return web.Response(status=401)
+        body = await request.json()
+        location_id = body["subscriptionFilters"][0]["value"][0]
+        subscription_id = str(uuid.uuid4())
+        self._subscriptions[subscription_id] = location_id
+        print(f"Subscription {subscription_id} created for location {location_id}")
+        return web.json_response(
+            {
+                "id": subscription_id,
+                "registrationUrl": str(
+                    request.url.with_path(f"/stream/{subscription_id}")
+                ),
+            }
+        )
+
+    async def stream(self, request: web.Request) -> web.StreamResponse:
+        """Stream device events from the last received event on."""
+        if not self._authorized(request):
+            return web.Response(status=401)
+        location_id = self._subscriptions.get(request.match_info["subscription_id"])
+        if location_id is None:
+            return web.Response(status=404)
+        response = web.StreamResponse(
+            headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"}
+        )
+        await response.prepare(request)
+        last_id = int(request.headers.get("Last-Event-ID", self._sequence))
+        print(f"Stream connected, resuming after event {last_id}")
+        sent = 0
+        while True:
+            for sequence, message in list(self._history):
+                if sequence <= last_id:
+                    continue
+                await response.write(message)
+                last_id = sequence
+                sent += 1
+                if self._args.drop_after and sent >= self._args.drop_after:
+                    print(f"Dropping stream after event {last_id}")
+                    return response
+            async with self._new_event:
+                try:
+                    await asyncio.wait_for(
+                        self._new_event.wait(), KEEP_ALIVE_INTERVAL
+                    )
+                except TimeoutError:
+                    await response.write(b": keep-alive\n\n")
+
+    async def generate(self) -> None:
+        """Generate device events at the configured rate."""
+        location_id = str(uuid.uuid4())
+        while True:
+            await asyncio.sleep(1 / self._args.rate)
+            capability, attribute, value = random.choice(SAMPLE_EVENTS)
+            self._sequence += 1
+            event = {
+                "eventTime": datetime.now(UTC).isoformat(),
+                "eventType": "DEVICE_EVENT",
+                "deviceEvent": {
+                    "eventId": str(uuid.uuid4()),
+                    "locationId": location_id,
+                    "deviceId": random.choice(self._device_ids),
+                    "componentId": "main",
+                    "capability": capability,
+                    "attribute": attribute,
+                    "value": value(),
+                    "stateChange": True,
+                    "data": {},
+                },
+            }
+            message = (
+                f"id: {self._sequence}\nevent: DEVICE_EVENT\n"
+                f"data: {json.dumps(event)}\n\n"
+            ).encode()
+            self._history.append((self._sequence, message))
+            async with self._new_event:
+                self._new_event.notify_all()
+
+
+async def main() -> None:
+    """Run the stand-in."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--rate", type=float, default=2.0, help="events per second")
+    parser.add_argument(
+        "--drop-after", type=int, default=0, help="close streams after N events"
+    )
+    parser.add_argument("--token", help="require this bearer token")
+    parser.add_argument(
+        "--device", action="append", help="device id to generate events for"
+    )
+    args = parser.parse_args()
+
+    stand_in = StandIn(args)
+    app = web.Application()
+    app.router.add_post("/subscriptions", stand_in.subscribe)
+    app.router.add_get("/stream/{subscription_id}", stand_in.stream)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", args.port).start()
+    print(f"Serving on http://127.0.0.1:{args.port}/")
+    try:
+        await stand_in.generate()
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
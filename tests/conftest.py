@@ -0,0 +1,210 @@
+"""Fixtures for SmartThings tests."""
+from __future__ import annotations
+
+from collections.abc import Callable, Generator, Iterable
+from typing import Any
+from unittest.mock import AsyncMock, Mock, patch
+from uuid import uuid4
+
+from aiohttp import TCPConnector, ThreadedResolver
+from pysmartthings import DeviceEntity, InstalledAppStatus
+import pytest
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from homeassistant.const import CONF_ACCESS_TOKEN, CONF_CLIENT_ID, CONF_CLIENT_SECRET
+from homeassistant.core import HomeAssistant
+
+from custom_components.smartthings import DeviceBroker
+from custom_components.smartthings.const import (
+    CONF_APP_ID,
+    CONF_INSTALLED_APP_ID,
+    CONF_LOCATION_ID,
+    CONF_REFRESH_TOKEN,
+    DATA_BROKERS,
+    DATA_EVENT_ROUTER,
+    DOMAIN,
+)
+from custom_components.smartthings.ingest import DeviceEvent
+
+LOCATION_ID = str(uuid4())
+ROOM_ID = str(uuid4())
+
+
+@pytest.fixture(autouse=True)
+def auto_enable_custom_integrations(enable_custom_integrations):
+    """Enable loading the integration from custom_components."""
+    return
+
+
+@pytest.fixture(name="config_entry")
+def config_entry_fixture() -> MockConfigEntry:
+    """Return a config entry of an installed app."""
+    return MockConfigEntry(
+        domain=DOMAIN,
+        title="Home",
+        version=2,
+        data={
+            CONF_ACCESS_TOKEN: str(uuid4()),
+            CONF_APP_ID: str(uuid4()),
+            CONF_CLIENT_ID: str(uuid4()),
+            CONF_CLIENT_SECRET: str(uuid4()),
+            CONF_INSTALLED_APP_ID: str(uuid4()),
+            CONF_LOCATION_ID: LOCATION_ID,
+            CONF_REFRESH_TOKEN: str(uuid4()),
+        },
+    )
+
+
+@pytest.fixture(name="device_factory")
+def device_factory_fixture() -> Callable[..., DeviceEntity]:
+    """Return a factory of devices with their status.
+
+    Capabilities map to the values of their attributes.
+    """
+
+    def _factory(
+        label: str,
+        capabilities: dict[str, dict[str, Any]],
+        components: dict[str, dict[str, dict[str, Any]]] | None = None,
+    ) -> DeviceEntity:
+        components = {"main": capabilities, **(components or {})}
+        device = DeviceEntity(
+            None,
+            {
+                "deviceId": str(uuid4()),
+                "name": label,
+                "label": label,
+                "locationId": LOCATION_ID,
+                "roomId": ROOM_ID,
+                "components": [
+                    {
+                        "id": component_id,
+                        "capabilities": [{"id": capability} for capability in values],
+                    }
+                    for component_id, values in components.items()
+                ],
+            },
+        )
+        device.status.apply_data(
+            {
+                "components": {
+                    component_id: {
+                        capability: {
+                            attribute: {"value": value}
+                            for attribute, value in attributes.items()
+                        }
+                        for capability, attributes in values.items()
+                    }
+                    for component_id, values in components.items()
+                }
+            }
+        )
+        return device
+
+    return _factory
+
+
+@pytest.fixture(name="event_factory")
+def event_factory_fixture() -> Callable[..., DeviceEvent]:
+    """Return a factory of device events."""
+
+    def _factory(
+        device: DeviceEntity,
+        capability: str,
+        attribute: str,
+        value: Any,
+        *,
+        component_id: str = "main",
+        event_id: str | None = None,
+        event_time: float | None = None,
+        data: dict[str, Any] | None = None,
+    ) -> DeviceEvent:
+        return DeviceEvent(
+            event_id or str(uuid4()),
+            LOCATION_ID,
+            device.device_id,
+            component_id,
+            capability,
+            attribute,
+            value,
+            data,
+            event_time,
+        )
+
+    return _factory
+
+
+@pytest.fixture(name="broker_factory")
+def broker_factory_fixture(
+    hass: HomeAssistant, config_entry: MockConfigEntry
+) -> Callable[..., DeviceBroker]:
+    """Return a factory of device brokers that are not connected."""
+    config_entry.add_to_hass(hass)
+    hass.data[DOMAIN] = {DATA_BROKERS: {}, DATA_EVENT_ROUTER: {}}
+
+    def _factory(
+        devices: Iterable[DeviceEntity], options: dict[str, Any] | None = None
+    ) -> DeviceBroker:
+        if options:
+            hass.config_entries.async_update_entry(config_entry, options=options)
+        token = Mock(access_token=config_entry.data[CONF_ACCESS_TOKEN])
+        return DeviceBroker(hass, config_entry, token, None, devices, [], [])
+
+    return _factory
+
+
+@pytest.fixture(name="threaded_resolver")
+def threaded_resolver_fixture() -> Generator[None]:
+    """Resolve the hosts of the API sessions without aiodns.
+
+    The aiodns resolver leaves a thread behind once a session closes.
+    """
+
+    def connector(**kwargs: Any) -> TCPConnector:
+        return TCPConnector(resolver=ThreadedResolver(), **kwargs)
+
+    with patch("custom_components.smartthings.session.TCPConnector", connector):
+        yield
+
+
+@pytest.fixture(name="smartthings_mock")
+def smartthings_mock_fixture(
+    config_entry: MockConfigEntry, threaded_resolver: None
+) -> Generator[Mock]:
+    """Patch the SmartThings API that config entries are set up with.
+
+    Devices are returned without status, so they keep the one they were
+    created with.
+    """
+    api = Mock()
+    api.app = AsyncMock(
+        return_value=Mock(
+            app_id=config_entry.data[CONF_APP_ID],
+            webhook_public_key=None,
+            display_name="Home Assistant",
+            description="Home Assistant",
+        )
+    )
+    api.installed_app = AsyncMock(
+        return_value=Mock(
+            installed_app_status=InstalledAppStatus.AUTHORIZED,
+            location_id=LOCATION_ID,
+        )
+    )
+    room = Mock(room_id=ROOM_ID)
+    room.name = "Living Room"
+    api.rooms = AsyncMock(return_value=[room])
+    api.scenes = AsyncMock(return_value=[])
+    token = Mock(access_token=str(uuid4()), refresh_token=str(uuid4()))
+    token.refresh = AsyncMock()
+    api.generate_tokens = AsyncMock(return_value=token)
+    api.devices = AsyncMock(return_value=[])
+    with patch("custom_components.smartthings.SmartThings", return_value=api), patch(
+        "custom_components.smartthings.Api.get_device_status", return_value=None
+    ), patch(
+        "custom_components.smartthings.validate_webhook_requirements",
+        return_value=True,
+    ), patch(
+        "custom_components.smartthings.session.ApiSession.async_prewarm"
+    ):
+        yield api
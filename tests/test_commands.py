@@ -0,0 +1,133 @@
+"""Tests for the batching of device commands."""
+from __future__ import annotations
+
+import asyncio
+from collections import Counter
+from typing import Any
+from unittest.mock import AsyncMock, patch
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.smartthings.commands import CommandBatcher
+
+
+def _commands(api: AsyncMock) -> list[list[str]]:
+    """Return the commands of each request that was sent."""
+    return [
+        [command["command"] for command in call[0][1]["commands"]]
+        for call in api.post.call_args_list
+    ]
+
+
+async def test_commands_batched(hass: HomeAssistant) -> None:
+    """Test commands to a device are sent together with their own results."""
+    api = AsyncMock()
+    api.post.return_value = {"results": [{"status": "ACCEPTED"}, {"status": "FAILED"}]}
+    batcher = CommandBatcher(hass, api, Counter())
+
+    results = await asyncio.gather(
+        batcher.async_send("device", "main", "switch", "on"),
+        batcher.async_send("device", "main", "switchLevel", "setLevel", [50]),
+    )
+
+    assert results == [True, False]
+    assert _commands(api) == [["on", "setLevel"]]
+    assert api.post.call_args[0][1]["commands"][1]["arguments"] == [50]
+
+
+async def test_batch_sent_at_max_size(hass: HomeAssistant) -> None:
+    """Test a full batch is sent without waiting for the delay."""
+    api = AsyncMock()
+    api.post.return_value = {"results": [{"status": "COMPLETED"}] * 2}
+    batcher = CommandBatcher(hass, api, Counter(), delay=60, max_size=2)
+
+    assert await asyncio.gather(
+        batcher.async_send("device", "main", "switch", "on"),
+        batcher.async_send("device", "main", "switch", "off"),
+    ) == [True, True]
+    assert _commands(api) == [["on", "off"]]
+
+
+async def test_latest_wins(hass: HomeAssistant) -> None:
+    """Test only the latest of the commands issued during a send is sent."""
+    release = asyncio.Event()
+
+    async def post(*args: Any) -> dict[str, Any]:
+        await release.wait()
+        return {"results": [{"status": "ACCEPTED"}]}
+
+    api = AsyncMock()
+    api.post.side_effect = post
+    stats: Counter[str] = Counter()
+    batcher = CommandBatcher(hass, api, stats)
+
+    first = hass.async_create_task(
+        batcher.async_send_latest("device", "main", "switchLevel", "setLevel", [10])
+    )
+    await asyncio.sleep(0.05)
+    second = hass.async_create_task(
+        batcher.async_send_latest("device", "main", "switchLevel", "setLevel", [20])
+    )
+    await asyncio.sleep(0)
+    third = hass.async_create_task(
+        batcher.async_send_latest("device", "main", "switchLevel", "setLevel", [30])
+    )
+    await asyncio.sleep(0)
+    assert await second is False
+
+    release.set()
+    assert await first is True
+    assert await third is True
+    await hass.async_block_till_done()
+
+    sent = [call[0][1]["commands"][0] for call in api.post.call_args_list]
+    assert [command["arguments"] for command in sent] == [[10], [30]]
+    assert stats["superseded_commands"] == 1
+    assert not batcher._in_flight
+
+
+async def test_current_value_skipped(hass: HomeAssistant) -> None:
+    """Test a value the device already has is not sent when nothing is in flight."""
+    api = AsyncMock()
+    stats: Counter[str] = Counter()
+    batcher = CommandBatcher(hass, api, stats)
+
+    assert await batcher.async_send_latest(
+        "device", "main", "switchLevel", "setLevel", [10], current=True
+    )
+    api.post.assert_not_called()
+    assert stats["skipped_commands"] == 1
+
+
+async def test_shutdown_settles_commands(hass: HomeAssistant) -> None:
+    """Test shutting down resolves every command and clears the state."""
+
+    async def post(*args: Any) -> dict[str, Any]:
+        await asyncio.Event().wait()
+        return {}
+
+    api = AsyncMock()
+    api.post.side_effect = post
+    batcher = CommandBatcher(hass, api, Counter(), delay=60)
+
+    in_flight = hass.async_create_task(
+        batcher.async_send_latest("device", "main", "switchLevel", "setLevel", [10])
+    )
+    await asyncio.sleep(0)
+    batcher._async_flush("device")
+    await asyncio.sleep(0)
+    waiting = hass.async_create_task(
+        batcher.async_send_latest("device", "main", "switchLevel", "setLevel", [20])
+    )
+    queued = hass.async_create_task(batcher.async_send("other", "main", "switch", "on"))
+    await asyncio.sleep(0)
+
+    with patch("custom_components.smartthings.commands.COMMAND_SHUTDOWN_TIMEOUT", 0):
+        await batcher.async_shutdown()
+
+    assert await in_flight is False
+    assert await waiting is False
+    assert await queued is False
+    assert _commands(api) == [["setLevel"], ["on"]]
+    assert not batcher._in_flight
+    assert not batcher._tasks
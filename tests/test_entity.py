@@ -0,0 +1,132 @@
+"""Tests for the commands of SmartThings entities."""
+from __future__ import annotations
+
+from unittest.mock import AsyncMock, Mock
+
+from aiohttp import ClientConnectionError
+from pysmartthings.device import Status
+import pytest
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.smartthings.const import (
+    CONF_OPTIMISTIC_COMMANDS,
+    CustomAttribute,
+    CustomCapability,
+    CustomComponent,
+)
+from custom_components.smartthings.select import (
+    SELECT_DESCRIPTIONS,
+    SmartThingsSelectEntity,
+)
+
+
+@pytest.fixture(name="lamp")
+def lamp_fixture(hass: HomeAssistant, device_factory, broker_factory):
+    """Return the lamp brightness entity of a hood with optimistic commands."""
+    device = device_factory(
+        "Hood",
+        {},
+        {
+            CustomComponent.hood: {
+                CustomCapability.lamp: {
+                    CustomAttribute.brightness_level: "low",
+                    CustomAttribute.supported_brightness_level: ["low", "high"],
+                }
+            }
+        },
+    )
+    broker = broker_factory([device], {CONF_OPTIMISTIC_COMMANDS: True})
+    broker.commands = Mock(async_send_latest=AsyncMock(return_value=True))
+    entity = SmartThingsSelectEntity(
+        broker,
+        device,
+        CustomCapability.lamp,
+        SELECT_DESCRIPTIONS[CustomCapability.lamp][0],
+        None,
+    )
+    entity.hass = hass
+    yield entity
+    broker.disconnect()
+
+
+def _brightness(entity: SmartThingsSelectEntity) -> str:
+    status = entity._device.status.components[CustomComponent.hood]
+    return status.attributes[CustomAttribute.brightness_level].value
+
+
+async def test_current_value_skipped_once_settled(
+    hass: HomeAssistant, lamp: SmartThingsSelectEntity
+) -> None:
+    """Test the reported value is marked current when no command is pending."""
+    await lamp.async_select_option("low")
+    await hass.async_block_till_done()
+
+    assert lamp._broker.commands.async_send_latest.call_args[1]["current"] is True
+
+
+async def test_value_sent_back_while_unconfirmed(
+    hass: HomeAssistant, lamp: SmartThingsSelectEntity
+) -> None:
+    """Test moving back to the reported value is sent while another is pending."""
+    await lamp.async_select_option("high")
+    await hass.async_block_till_done()
+    assert _brightness(lamp) == "high"
+    assert lamp._broker.commands.async_send_latest.call_args[1]["current"] is False
+
+    await lamp.async_select_option("low")
+    await hass.async_block_till_done()
+
+    assert _brightness(lamp) == "low"
+    assert lamp._broker.commands.async_send_latest.call_count == 2
+    assert lamp._broker.commands.async_send_latest.call_args[1]["current"] is False
+
+
+@pytest.mark.parametrize(
+    "send",
+    [AsyncMock(return_value=False), AsyncMock(side_effect=ClientConnectionError)],
+)
+async def test_failed_command_rolled_back(
+    hass: HomeAssistant, lamp: SmartThingsSelectEntity, send: AsyncMock
+) -> None:
+    """Test the reported value is restored when the command fails."""
+    lamp._broker.commands.async_send_latest = send
+    listener = Mock()
+    lamp._broker.async_add_device_listener(lamp._device.device_id, listener)
+
+    await lamp.async_select_option("high")
+    await hass.async_block_till_done()
+
+    assert _brightness(lamp) == "low"
+    assert lamp._broker.is_settled(
+        lamp._device.device_id, CustomComponent.hood, CustomAttribute.brightness_level
+    )
+    # Once for the optimistic value and once for the rollback
+    assert listener.call_count == 2
+
+
+async def test_options_computed_once_per_update(
+    hass: HomeAssistant, lamp: SmartThingsSelectEntity, event_factory
+) -> None:
+    """Test derived values are reused until the device attributes change."""
+    status = lamp._device.status.components[CustomComponent.hood]
+    assert lamp.options == ["low", "high"]
+
+    # Changes that bypass the broker are not seen
+    status.attributes[CustomAttribute.supported_brightness_level] = Status(
+        ["high"], None, None
+    )
+    assert lamp.options == ["low", "high"]
+
+    lamp._broker._event_handler(
+        [
+            event_factory(
+                lamp._device,
+                CustomCapability.lamp,
+                CustomAttribute.supported_brightness_level,
+                ["off", "low"],
+                component_id=CustomComponent.hood,
+            )
+        ]
+    )
+    assert lamp.options == ["off", "low"]
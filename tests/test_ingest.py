@@ -0,0 +1,130 @@
+"""Tests for the decoding of SmartApp webhook payloads."""
+from __future__ import annotations
+
+import base64
+from unittest.mock import patch
+
+from Crypto.Hash import SHA256
+from Crypto.PublicKey import RSA
+from Crypto.Signature import PKCS1_v1_5
+from httpsig.utils import generate_message
+import pytest
+
+from custom_components.smartthings import ingest
+from custom_components.smartthings.ingest import (
+    EventIdCache,
+    SignatureVerifier,
+    parse_device_events,
+)
+
+WEBHOOK_PATH = "/api/webhook/test"
+
+
+@pytest.fixture(name="key", scope="module")
+def key_fixture() -> RSA.RsaKey:
+    """Return the key requests are signed with."""
+    return RSA.generate(1024)
+
+
+def _sign(key: RSA.RsaKey, date: str = "Mon, 19 Oct 2026 10:00:00 GMT") -> dict:
+    """Return the headers of a request signed with the key."""
+    headers = {"date": date, "digest": "SHA-256=body"}
+    message = generate_message(
+        ["(request-target)", "date", "digest"],
+        headers,
+        method="POST",
+        path=WEBHOOK_PATH,
+    )
+    signature = base64.b64encode(PKCS1_v1_5.new(key).sign(SHA256.new(message)))
+    headers["authorization"] = (
+        'Signature keyId="key",algorithm="rsa-sha256",'
+        f'headers="(request-target) date digest",signature="{signature.decode()}"'
+    )
+    return headers
+
+
+def test_event_id_cache_expires() -> None:
+    """Test event ids are forgotten after their time to live."""
+    cache = EventIdCache(10, 60)
+    with patch("custom_components.smartthings.ingest.monotonic", return_value=0):
+        assert not cache.seen("a")
+        assert cache.seen("a")
+    with patch("custom_components.smartthings.ingest.monotonic", return_value=61):
+        assert not cache.seen("a")
+
+
+def test_event_id_cache_bounded() -> None:
+    """Test the oldest event ids are dropped beyond the size."""
+    cache = EventIdCache(2, 60)
+    for event_id in ("a", "b", "c"):
+        assert not cache.seen(event_id)
+    assert not cache.seen("a")
+    assert cache.seen("c")
+    assert not cache.seen(None)
+    assert not cache.seen(None)
+
+
+def test_parse_device_events() -> None:
+    """Test device events are decoded and other events skipped."""
+    events = parse_device_events(
+        {
+            "eventData": {
+                "events": [
+                    {
+                        "eventTime": "2024-01-01T00:00:00+00:00",
+                        "eventType": "DEVICE_EVENT",
+                        "deviceEvent": {
+                            "eventId": "1",
+                            "locationId": "location",
+                            "deviceId": "device",
+                            "componentId": "main",
+                            "capability": "switch",
+                            "attribute": "switch",
+                            "value": "on",
+                        },
+                    },
+                    {"eventType": "TIMER_EVENT", "timerEvent": {}},
+                ]
+            }
+        }
+    )
+
+    assert len(events) == 1
+    assert events[0].device_id == "device"
+    assert events[0].value == "on"
+    assert events[0].event_time == 1704067200
+
+
+def test_signature_verified(key: RSA.RsaKey) -> None:
+    """Test requests are only verified with the key they were signed with."""
+    verifier = SignatureVerifier(WEBHOOK_PATH)
+    public_key = key.public_key().export_key().decode()
+    headers = _sign(key)
+
+    assert verifier.verify(public_key, headers)
+    other_key = RSA.generate(1024).public_key().export_key().decode()
+    assert not verifier.verify(other_key, headers)
+    assert not verifier.verify(public_key, {**headers, "digest": "SHA-256=other"})
+    assert not verifier.verify(public_key, {"date": headers["date"]})
+    assert not SignatureVerifier("/other").verify(public_key, headers)
+
+
+def test_verification_remembered(key: RSA.RsaKey) -> None:
+    """Test a retried request is not verified again until the result expires."""
+    verifier = SignatureVerifier(WEBHOOK_PATH, cache_ttl=60)
+    public_key = key.public_key().export_key().decode()
+    headers = _sign(key)
+
+    with patch.object(
+        ingest, "_import_public_key", wraps=ingest._import_public_key
+    ) as import_key, patch.object(ingest, "monotonic", return_value=0):
+        assert not verifier.is_verified(public_key, headers)
+        assert verifier.verify(public_key, headers)
+        assert verifier.is_verified(public_key, headers)
+        assert verifier.verify(public_key, headers)
+        assert import_key.call_count == 1
+        # A request signed at another time is verified on its own
+        assert not verifier.is_verified(public_key, _sign(key, "later"))
+
+    with patch.object(ingest, "monotonic", return_value=61):
+        assert not verifier.is_verified(public_key, headers)
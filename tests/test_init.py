@@ -0,0 +1,582 @@
+"""Tests for the SmartThings device broker."""
+from __future__ import annotations
+
+import asyncio
+from datetime import timedelta
+from http import HTTPStatus
+from typing import Any
+from unittest.mock import AsyncMock, Mock, patch
+
+from aiohttp import ClientConnectionError, ClientResponseError
+from pysmartthings import Attribute, Capability, DeviceEntity
+import pytest
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.core import HomeAssistant
+import homeassistant.util.dt as dt_util
+
+from custom_components.smartthings.const import (
+    COMMAND_CONFIRMATION_TIMEOUT,
+    CONF_REFRESH_TOKEN,
+    CONF_TRANSPORT,
+    DATA_API_SESSION,
+    DATA_BROKERS,
+    DATA_EVENT_ROUTER,
+    DOMAIN,
+    SUBSCRIPTION_SYNC_COOLDOWN,
+    CustomAttribute,
+    CustomCapability,
+    EventTransport,
+)
+from custom_components.smartthings.smartapp import ATTRIBUTE_ALL
+
+
+async def test_device_events_keep_arrival_order(
+    hass: HomeAssistant, device_factory, event_factory, broker_factory
+) -> None:
+    """Test the events of a device are applied in the order they arrived."""
+    device = device_factory(
+        "Plug",
+        {Capability.switch: {Attribute.switch: "off"}, Capability.power_meter: {}},
+    )
+    broker = broker_factory([device])
+    applied = []
+    apply = device.status.apply_attribute_update
+
+    def record(component_id, capability, attribute, value, data=None):
+        applied.append(attribute)
+        apply(component_id, capability, attribute, value, data=data)
+
+    with patch.object(device.status, "apply_attribute_update", record):
+        broker._event_handler(
+            [
+                event_factory(device, Capability.power_meter, Attribute.power, 100),
+                event_factory(device, Capability.switch, Attribute.switch, "on"),
+                event_factory(device, Capability.power_meter, Attribute.power, 0),
+            ]
+        )
+
+    assert applied == [Attribute.power, Attribute.switch, Attribute.power]
+    assert device.status.attributes[Attribute.power].value == 0
+
+
+async def test_devices_with_important_events_update_first(
+    hass: HomeAssistant, device_factory, event_factory, broker_factory
+) -> None:
+    """Test devices are updated in order of their most important event."""
+    sensor = device_factory(
+        "Sensor", {Capability.temperature_measurement: {Attribute.temperature: 20}}
+    )
+    button = device_factory("Button", {Capability.button: {Attribute.button: None}})
+    broker = broker_factory([sensor, button])
+    updated = []
+    broker.async_add_device_listener(sensor.device_id, lambda: updated.append("sensor"))
+
+    def button_pressed() -> None:
+        updated.append("button")
+        hass.loop.call_soon(updated.append, "reaction")
+
+    broker.async_add_device_listener(button.device_id, button_pressed, button=True)
+
+    broker._event_handler(
+        [
+            event_factory(
+                sensor, Capability.temperature_measurement, Attribute.temperature, 21
+            ),
+            event_factory(button, Capability.button, Attribute.button, "pushed"),
+        ]
+    )
+    assert updated == ["button"]
+
+    # Events arriving meanwhile are applied after the pending ones
+    broker._event_handler(
+        [
+            event_factory(
+                sensor, Capability.temperature_measurement, Attribute.temperature, 22
+            )
+        ]
+    )
+    await hass.async_block_till_done()
+
+    assert updated == ["button", "reaction", "sensor"]
+    assert sensor.status.attributes[Attribute.temperature].value == 22
+    broker.disconnect()
+
+
+async def test_duplicate_events_dropped(
+    hass: HomeAssistant, device_factory, event_factory, broker_factory
+) -> None:
+    """Test a retried delivery of an event is only applied once."""
+    device = device_factory("Switch", {Capability.switch: {Attribute.switch: "off"}})
+    broker = broker_factory([device])
+    updates = []
+    broker.async_add_device_listener(device.device_id, lambda: updates.append(1))
+    evt = event_factory(device, Capability.switch, Attribute.switch, "on")
+
+    broker._event_handler([evt])
+    broker._event_handler([evt])
+
+    assert len(updates) == 1
+    assert broker.stats["duplicate_events"] == 1
+
+
+async def test_stale_events_dropped(
+    hass: HomeAssistant, device_factory, event_factory, broker_factory
+) -> None:
+    """Test an event older than the applied one does not overwrite it."""
+    device = device_factory("Switch", {Capability.switch: {Attribute.switch: "off"}})
+    broker = broker_factory([device])
+
+    broker._event_handler(
+        [event_factory(device, Capability.switch, Attribute.switch, "on", event_time=2)]
+    )
+    broker._event_handler(
+        [
+            event_factory(
+                device, Capability.switch, Attribute.switch, "off", event_time=1
+            )
+        ]
+    )
+
+    assert device.status.attributes[Attribute.switch].value == "on"
+    assert broker.stats["stale_events"] == 1
+    # Events without a time are always applied
+    broker._event_handler(
+        [event_factory(device, Capability.switch, Attribute.switch, "off")]
+    )
+    assert device.status.attributes[Attribute.switch].value == "off"
+
+
+async def test_listeners_notified_per_device(
+    hass: HomeAssistant, device_factory, event_factory, broker_factory
+) -> None:
+    """Test an update only reaches the listeners of the updated device."""
+    switch = device_factory("Switch", {Capability.switch: {Attribute.switch: "off"}})
+    other = device_factory("Other", {Capability.switch: {Attribute.switch: "off"}})
+    broker = broker_factory([switch, other])
+    updated = []
+    broker.async_add_device_listener(switch.device_id, Mock(side_effect=ValueError))
+    remove = broker.async_add_device_listener(
+        switch.device_id, lambda: updated.append("switch")
+    )
+    broker.async_add_device_listener(other.device_id, lambda: updated.append("other"))
+    broker.async_add_device_listener(
+        switch.device_id, lambda: updated.append("button"), button=True
+    )
+
+    broker._event_handler(
+        [event_factory(switch, Capability.switch, Attribute.switch, "on")]
+    )
+    assert updated == ["switch"]
+
+    remove()
+    broker._event_handler(
+        [event_factory(switch, Capability.switch, Attribute.switch, "off")]
+    )
+    assert updated == ["switch"]
+
+
+async def test_disconnect_keeps_route_of_newer_broker(
+    hass: HomeAssistant, broker_factory
+) -> None:
+    """Test a broker only removes its own route to the installed app."""
+    old = broker_factory([])
+    new = broker_factory([])
+    router = hass.data[DOMAIN][DATA_EVENT_ROUTER]
+    router[new._installed_app_id] = new._event_handler
+
+    old.disconnect()
+    assert router[new._installed_app_id] == new._event_handler
+    new.disconnect()
+    assert new._installed_app_id not in router
+
+
+async def test_availability_follows_health_events(
+    hass: HomeAssistant, device_factory, event_factory, broker_factory
+) -> None:
+    """Test devices are available unless their health reports them offline."""
+    offline = device_factory(
+        "Offline",
+        {
+            CustomCapability.health_check: {
+                CustomAttribute.device_watch_device_status: "offline"
+            }
+        },
+    )
+    unmonitored = device_factory("Plug", {Capability.switch: {Attribute.switch: "on"}})
+    broker = broker_factory([offline, unmonitored])
+    assert not broker.is_available(offline.device_id)
+    assert broker.is_available(unmonitored.device_id)
+    updates = []
+    broker.async_add_device_listener(offline.device_id, lambda: updates.append(1))
+
+    broker._event_handler(
+        [
+            event_factory(
+                offline,
+                CustomCapability.health_check,
+                CustomAttribute.device_watch_device_status,
+                "online",
+            )
+        ]
+    )
+
+    assert broker.is_available(offline.device_id)
+    assert updates == [1]
+
+
+async def test_health_subscribed_on_setup(
+    hass: HomeAssistant, config_entry, device_factory, smartthings_mock
+) -> None:
+    """Test the health of all devices is subscribed to once set up."""
+    smartthings_mock.devices.return_value = [
+        device_factory("Sensor", {Capability.battery: {Attribute.battery: 50}})
+    ]
+    config_entry.add_to_hass(hass)
+    with patch(
+        "custom_components.smartthings.smartapp_sync_subscriptions"
+    ) as sync_subscriptions:
+        assert await hass.config_entries.async_setup(config_entry.entry_id)
+        await hass.async_block_till_done()
+
+    targets = sync_subscriptions.call_args[0][4]
+    assert CustomAttribute.device_watch_device_status in (
+        targets[CustomCapability.health_check]
+    )
+
+
+async def test_device_status_pruned(
+    hass: HomeAssistant, device_factory, event_factory, broker_factory
+) -> None:
+    """Test only registered attributes are kept and receive events."""
+    washer = device_factory(
+        "Washer",
+        {
+            Capability.switch: {Attribute.switch: "on"},
+            Capability.washer_mode: {
+                Attribute.washer_mode: "normal",
+                "supportedWasherModes": ["normal", "quick"],
+            },
+        },
+        {"sub": {Capability.switch: {Attribute.switch: "off"}}},
+    )
+    thermostat = device_factory(
+        "Thermostat",
+        {Capability.thermostat_mode: {Attribute.thermostat_mode: "heat"}},
+    )
+    broker = broker_factory([washer, thermostat])
+    broker.async_register_subscription(
+        {Capability.washer_mode: [Attribute.washer_mode]}, washer.device_id
+    )
+    broker.async_register_subscription({Capability.switch: [Attribute.switch]})
+    broker.async_register_subscription(
+        {Capability.thermostat_mode: [ATTRIBUTE_ALL]}, thermostat.device_id
+    )
+    with patch("custom_components.smartthings.smartapp_sync_subscriptions"):
+        await broker.async_sync_subscriptions()
+
+    assert set(washer.status.attributes) == {Attribute.switch, Attribute.washer_mode}
+    assert set(washer.status.components["sub"].attributes) == {Attribute.switch}
+    assert Attribute.thermostat_mode in thermostat.status.attributes
+    assert broker.stats["pruned_attributes"]
+
+    broker._event_handler(
+        [
+            event_factory(
+                washer, Capability.washer_mode, "supportedWasherModes", ["normal"]
+            )
+        ]
+    )
+    assert "supportedWasherModes" not in washer.status.attributes
+    assert broker.stats["unsubscribed_events"] == 1
+    broker.disconnect()
+
+
+@pytest.fixture(name="lock")
+def lock_fixture(device_factory) -> DeviceEntity:
+    """Return an unlocked lock that is online and has one code."""
+    return device_factory(
+        "Lock",
+        {
+            Capability.lock: {Attribute.lock: "unlocked"},
+            CustomCapability.lock_codes: {
+                CustomAttribute.lock_codes: '{"1": "Alice"}',
+                CustomAttribute.code_changed: None,
+            },
+            CustomCapability.health_check: {
+                CustomAttribute.device_watch_device_status: "online"
+            },
+        },
+    )
+
+
+def _time_out_command(hass: HomeAssistant, broker, lock: DeviceEntity) -> None:
+    """Lock the lock optimistically and let its confirmation time out."""
+    broker.async_set_optimistic_value(lock.device_id, "main", Attribute.lock, "locked")
+    broker.async_track_confirmation(lock.device_id, "main", Attribute.lock)
+    async_fire_time_changed(
+        hass,
+        dt_util.utcnow() + timedelta(seconds=COMMAND_CONFIRMATION_TIMEOUT + 1),
+    )
+
+
+async def test_timed_out_command_reconciled(
+    hass: HomeAssistant, broker_factory, lock: DeviceEntity
+) -> None:
+    """Test the refetched status of a component is applied like events."""
+    broker = broker_factory([lock])
+    broker._api = AsyncMock()
+    broker._api.get.return_value = {
+        Capability.lock: {Attribute.lock: {"value": "unlocked"}},
+        CustomCapability.lock_codes: {
+            CustomAttribute.lock_codes: {"value": '{"2": "Bob"}'},
+        },
+        CustomCapability.health_check: {
+            CustomAttribute.device_watch_device_status: {"value": "offline"}
+        },
+    }
+    broker.async_register_subscription({Capability.lock: [Attribute.lock]})
+    updates = []
+    broker.async_add_device_listener(lock.device_id, lambda: updates.append(1))
+
+    _time_out_command(hass, broker, lock)
+    await hass.async_block_till_done()
+
+    broker._api.get.assert_awaited_once_with(
+        f"devices/{lock.device_id}/components/main/status"
+    )
+    assert lock.status.attributes[Attribute.lock].value == "unlocked"
+    assert broker.is_settled(lock.device_id, "main", Attribute.lock)
+    assert not broker.is_available(lock.device_id)
+    assert broker.lock_codes.get_name(lock.device_id, 1) is None
+    assert broker.lock_codes.get_name(lock.device_id, 2) == "Bob"
+    # Once for the optimistic value and once for the refetched status
+    assert updates == [1, 1]
+    assert broker.stats["confirmation_timeouts"] == 1
+    assert broker.stats["reconciliations"] == 1
+
+    # The device reports its status once it is back online
+    _time_out_command(hass, broker, lock)
+    await hass.async_block_till_done()
+    assert broker._api.get.await_count == 1
+    assert broker.stats["skipped_reconciliations"] == 1
+    broker.disconnect()
+
+
+async def test_failed_reconciliation(
+    hass: HomeAssistant, broker_factory, lock: DeviceEntity
+) -> None:
+    """Test a component that cannot be refetched keeps its status."""
+    broker = broker_factory([lock])
+    broker._api = AsyncMock()
+    broker._api.get.side_effect = ClientConnectionError
+
+    _time_out_command(hass, broker, lock)
+    await hass.async_block_till_done()
+
+    assert broker.get_confirmed_value(lock.device_id, "main", Attribute.lock) == (
+        "unlocked"
+    )
+    assert broker.is_pending(lock.device_id, "main", Attribute.lock)
+    assert broker.stats["failed_reconciliations"] == 1
+    assert not broker._reconciling
+    broker.disconnect()
+
+
+@pytest.mark.parametrize(
+    ("transport", "targets"),
+    [
+        (EventTransport.WEBHOOK, {Capability.switch: {Attribute.switch}}),
+        (EventTransport.STREAM, {}),
+    ],
+)
+async def test_stream_transport_removes_subscriptions(
+    hass: HomeAssistant,
+    device_factory,
+    broker_factory,
+    transport: EventTransport,
+    targets: dict[str, set[str]],
+) -> None:
+    """Test webhook subscriptions are removed when events arrive over the stream."""
+    device = device_factory("Plug", {Capability.switch: {Attribute.switch: "off"}})
+    broker = broker_factory([device], {CONF_TRANSPORT: transport})
+    broker.async_register_subscription({Capability.switch: [Attribute.switch]})
+
+    with patch(
+        "custom_components.smartthings.smartapp_sync_subscriptions"
+    ) as sync_subscriptions:
+        await broker.async_sync_subscriptions()
+        await broker.async_sync_subscriptions()
+
+    sync_subscriptions.assert_called_once()
+    assert sync_subscriptions.call_args[0][4] == targets
+
+
+async def test_reload_does_not_sync_subscriptions_afterwards(
+    hass: HomeAssistant, config_entry, device_factory, smartthings_mock
+) -> None:
+    """Test entities removed while unloading do not sync the subscriptions."""
+    smartthings_mock.devices.return_value = [
+        device_factory("Sensor", {Capability.battery: {Attribute.battery: 50}})
+    ]
+    config_entry.add_to_hass(hass)
+    with patch(
+        "custom_components.smartthings.smartapp_sync_subscriptions"
+    ) as sync_subscriptions:
+        assert await hass.config_entries.async_setup(config_entry.entry_id)
+        await hass.async_block_till_done()
+        assert sync_subscriptions.call_count == 1
+
+        assert await hass.config_entries.async_reload(config_entry.entry_id)
+        await hass.async_block_till_done()
+        assert sync_subscriptions.call_count == 2
+
+        async_fire_time_changed(
+            hass, dt_util.utcnow() + timedelta(seconds=SUBSCRIPTION_SYNC_COOLDOWN + 1)
+        )
+        await hass.async_block_till_done()
+        assert sync_subscriptions.call_count == 2
+
+        assert await hass.config_entries.async_unload(config_entry.entry_id)
+        await hass.async_block_till_done()
+
+
+async def test_unload_keeps_broker_when_platforms_fail(
+    hass: HomeAssistant, config_entry, device_factory, smartthings_mock
+) -> None:
+    """Test the broker and the session outlive platforms that fail to unload."""
+    smartthings_mock.devices.return_value = [
+        device_factory("Sensor", {Capability.battery: {Attribute.battery: 50}})
+    ]
+    config_entry.add_to_hass(hass)
+    with patch("custom_components.smartthings.smartapp_sync_subscriptions"):
+        assert await hass.config_entries.async_setup(config_entry.entry_id)
+        await hass.async_block_till_done()
+    broker = hass.data[DOMAIN][DATA_BROKERS][config_entry.entry_id]
+
+    with patch.object(
+        hass.config_entries, "async_unload_platforms", return_value=False
+    ):
+        assert not await hass.config_entries.async_unload(config_entry.entry_id)
+    assert hass.data[DOMAIN][DATA_BROKERS][config_entry.entry_id] is broker
+    assert DATA_API_SESSION in hass.data[DOMAIN]
+
+    async def unload_platforms(*args: Any) -> bool:
+        # Entities are removed while the broker and the session still work
+        assert hass.data[DOMAIN][DATA_BROKERS][config_entry.entry_id] is broker
+        assert DATA_API_SESSION in hass.data[DOMAIN]
+        return True
+
+    config_entry.mock_state(hass, ConfigEntryState.LOADED)
+    with patch.object(
+        hass.config_entries, "async_unload_platforms", side_effect=unload_platforms
+    ):
+        assert await hass.config_entries.async_unload(config_entry.entry_id)
+    assert config_entry.entry_id not in hass.data[DOMAIN][DATA_BROKERS]
+    assert DATA_API_SESSION not in hass.data[DOMAIN]
+
+
+async def test_failed_setup_cancels_prewarm(
+    hass: HomeAssistant, config_entry, smartthings_mock
+) -> None:
+    """Test the connections opened ahead of the status requests are abandoned."""
+    prewarm_cancelled = asyncio.Event()
+
+    async def prewarm(*args: Any) -> None:
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            prewarm_cancelled.set()
+            raise
+
+    smartthings_mock.devices.side_effect = ClientResponseError(
+        Mock(), (), status=HTTPStatus.BAD_REQUEST
+    )
+    config_entry.add_to_hass(hass)
+    with patch(
+        "custom_components.smartthings.session.ApiSession.async_prewarm",
+        side_effect=prewarm,
+    ):
+        assert not await hass.config_entries.async_setup(config_entry.entry_id)
+        await hass.async_block_till_done()
+
+    assert config_entry.state is ConfigEntryState.SETUP_RETRY
+    assert prewarm_cancelled.is_set()
+
+
+async def test_token_refresh_does_not_reload(
+    hass: HomeAssistant, config_entry, smartthings_mock
+) -> None:
+    """Test updates of the entry data leave the entry loaded and options reload it."""
+    config_entry.add_to_hass(hass)
+    with patch("custom_components.smartthings.smartapp_sync_subscriptions"):
+        assert await hass.config_entries.async_setup(config_entry.entry_id)
+        await hass.async_block_till_done()
+    broker = hass.data[DOMAIN][DATA_BROKERS][config_entry.entry_id]
+
+    with patch.object(hass.config_entries, "async_reload") as reload:
+        await broker.async_refresh_token()
+        await hass.async_block_till_done()
+        reload.assert_not_called()
+        assert broker.stats["token_refreshes"] == 1
+
+        hass.config_entries.async_update_entry(
+            config_entry, options={CONF_TRANSPORT: EventTransport.STREAM}
+        )
+        await hass.async_block_till_done()
+        reload.assert_called_once_with(config_entry.entry_id)
+
+
+def _unauthorized() -> ClientResponseError:
+    return ClientResponseError(Mock(), (), status=HTTPStatus.UNAUTHORIZED)
+
+
+async def test_unauthorized_calls_share_one_refresh(
+    hass: HomeAssistant, config_entry, broker_factory
+) -> None:
+    """Test calls rejected together refresh the token once and are retried."""
+    broker = broker_factory([])
+    expired = broker._token.access_token
+
+    async def refresh(*args: Any) -> None:
+        await asyncio.sleep(0)
+        broker._token.access_token = "fresh"
+        broker._token.refresh_token = "refresh"
+
+    broker._token.refresh = AsyncMock(side_effect=refresh)
+    tokens = []
+
+    async def call(token: str) -> str:
+        tokens.append(token)
+        await asyncio.sleep(0)
+        if token == expired:
+            raise _unauthorized()
+        return token
+
+    assert (
+        await asyncio.gather(*(broker.async_call_with_token(call) for _ in range(3)))
+        == ["fresh"] * 3
+    )
+
+    broker._token.refresh.assert_awaited_once()
+    assert tokens == [expired] * 3 + ["fresh"] * 3
+    assert broker.stats["token_refreshes"] == 1
+    assert broker.stats["token_retries"] == 3
+    assert config_entry.data[CONF_REFRESH_TOKEN] == "refresh"
+
+
+async def test_unauthorized_call_retried_once(
+    hass: HomeAssistant, broker_factory
+) -> None:
+    """Test a call rejected with the new token is not retried again."""
+    broker = broker_factory([])
+    broker._token.refresh = AsyncMock()
+    broker._token.refresh_token = "refresh"
+    call = AsyncMock(side_effect=_unauthorized())
+
+    with pytest.raises(ClientResponseError):
+        await broker.async_call_with_token(call)
+
+    assert call.await_count == 2
+    broker._token.refresh.assert_awaited_once()
@@ -0,0 +1,98 @@
+"""Tests for the index of lock code names."""
+from __future__ import annotations
+
+import pytest
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.smartthings.const import CustomAttribute, CustomCapability
+from custom_components.smartthings.lock_codes import LockCodeIndex
+
+
+@pytest.mark.parametrize(
+    "lock_codes",
+    ['{"1": "Alice", "2": "Bob"}', {1: "Alice", 2: "Bob"}],
+)
+def test_rebuild(lock_codes) -> None:
+    """Test the codes are read from a JSON string or a mapping."""
+    index = LockCodeIndex()
+    index.rebuild("lock", lock_codes)
+    assert index.get_name("lock", 1) == "Alice"
+    assert index.get_name("lock", "2") == "Bob"
+    assert index.get_name("lock", 3) is None
+    assert index.get_name("other", 1) is None
+
+
+@pytest.mark.parametrize("lock_codes", ["{not json", None, ["Alice"]])
+def test_rebuild_invalid(lock_codes) -> None:
+    """Test codes that cannot be read clear the codes of the device."""
+    index = LockCodeIndex()
+    index.rebuild("lock", '{"1": "Alice"}')
+    index.rebuild("lock", lock_codes)
+    assert index.get_name("lock", 1) is None
+
+
+def test_apply_change() -> None:
+    """Test codeChanged events patch the codes of the device."""
+    index = LockCodeIndex()
+    index.rebuild("lock", '{"1": "Alice", "2": "Bob"}')
+
+    index.apply_change("lock", "3 set", {"codeName": "Carol"})
+    assert index.get_name("lock", 3) == "Carol"
+    index.apply_change("lock", "4 set", None)
+    assert index.get_name("lock", 4) == "Code 4"
+    index.apply_change("lock", "1 changed", None)
+    assert index.get_name("lock", 1) == "Alice"
+    index.apply_change("lock", "5 failed", {"codeName": "Dave"})
+    assert index.get_name("lock", 5) is None
+    index.apply_change("lock", "2 deleted", None)
+    assert index.get_name("lock", 2) is None
+    index.apply_change("lock", None, None)
+    assert index.get_name("lock", 1) == "Alice"
+
+    index.apply_change("lock", "all deleted", None)
+    for code_id in (1, 3, 4):
+        assert index.get_name("lock", code_id) is None
+
+
+async def test_broker_keeps_index_current(
+    hass: HomeAssistant, device_factory, event_factory, broker_factory
+) -> None:
+    """Test lock code events of a device update its codes."""
+    device = device_factory(
+        "Lock",
+        {
+            CustomCapability.lock_codes: {
+                CustomAttribute.lock_codes: '{"1": "Alice"}',
+                CustomAttribute.code_changed: None,
+            }
+        },
+    )
+    broker = broker_factory([device])
+    assert broker.lock_codes.get_name(device.device_id, 1) == "Alice"
+
+    broker._event_handler(
+        [
+            event_factory(
+                device,
+                CustomCapability.lock_codes,
+                CustomAttribute.code_changed,
+                "2 set",
+                data={"codeName": "Bob"},
+            )
+        ]
+    )
+    assert broker.lock_codes.get_name(device.device_id, 2) == "Bob"
+
+    broker._event_handler(
+        [
+            event_factory(
+                device,
+                CustomCapability.lock_codes,
+                CustomAttribute.lock_codes,
+                '{"3": "Carol"}',
+            ),
+        ]
+    )
+    assert broker.lock_codes.get_name(device.device_id, 2) is None
+    assert broker.lock_codes.get_name(device.device_id, 3) == "Carol"
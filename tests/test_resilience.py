@@ -0,0 +1,96 @@
+"""Tests for the retries and circuit breakers of setup calls."""
+from __future__ import annotations
+
+import asyncio
+from unittest.mock import AsyncMock, Mock, patch
+
+from aiohttp import ClientConnectionError, ClientResponseError
+import pytest
+
+from custom_components.smartthings.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    SetupStages,
+    async_call_with_retry,
+)
+
+
+async def test_retry_transient_failures() -> None:
+    """Test transient failures are retried until the call succeeds."""
+    call = AsyncMock(side_effect=[ClientConnectionError(), "result"])
+    with patch("custom_components.smartthings.resilience.asyncio.sleep"):
+        assert await async_call_with_retry(CircuitBreaker("test"), call) == "result"
+    assert call.await_count == 2
+
+
+async def test_breaker_opens_after_failures() -> None:
+    """Test calls are not attempted once the breaker opened."""
+    breaker = CircuitBreaker("test", threshold=2)
+    call = AsyncMock(side_effect=ClientConnectionError())
+    with patch("custom_components.smartthings.resilience.asyncio.sleep"):
+        with pytest.raises(ClientConnectionError):
+            await async_call_with_retry(breaker, call, attempts=2)
+        with pytest.raises(CircuitOpenError):
+            await async_call_with_retry(breaker, call)
+    assert call.await_count == 2
+
+
+async def test_stages_keep_results() -> None:
+    """Test kept results are reused until they expire and others are not."""
+    stages = SetupStages({}, ttl=60)
+    call = AsyncMock(side_effect=["first", "second", "third", "fourth"])
+
+    with patch("custom_components.smartthings.resilience.monotonic", return_value=0):
+        assert await stages.async_run("devices", "devices", call) == "first"
+        assert await stages.async_run("devices", "devices", call) == "first"
+        assert await stages.async_run("status", "devices", call, keep=False) == (
+            "second"
+        )
+        assert await stages.async_run("status", "devices", call, keep=False) == (
+            "third"
+        )
+    with patch("custom_components.smartthings.resilience.monotonic", return_value=61):
+        assert await stages.async_run("devices", "devices", call) == "fourth"
+
+
+async def test_breaker_lets_single_trial_through() -> None:
+    """Test only one call is attempted once the cooldown has passed."""
+    breaker = CircuitBreaker("test", threshold=1, cooldown=60)
+    with patch("custom_components.smartthings.resilience.monotonic", return_value=0):
+        breaker.record_failure()
+    release = asyncio.Event()
+
+    async def trial() -> str:
+        await release.wait()
+        return "result"
+
+    with patch("custom_components.smartthings.resilience.monotonic", return_value=61):
+        first = asyncio.create_task(async_call_with_retry(breaker, trial))
+        await asyncio.sleep(0)
+        with pytest.raises(CircuitOpenError):
+            await async_call_with_retry(breaker, AsyncMock())
+        release.set()
+        assert await first == "result"
+        # The successful trial closed the breaker
+        assert await async_call_with_retry(breaker, AsyncMock(return_value=1)) == 1
+
+
+async def test_breaker_trial_released_without_verdict() -> None:
+    """Test another trial is let through when one was not retryable."""
+    breaker = CircuitBreaker("test", threshold=1, cooldown=60)
+    with patch("custom_components.smartthings.resilience.monotonic", return_value=0):
+        breaker.record_failure()
+
+    with patch("custom_components.smartthings.resilience.monotonic", return_value=61):
+        with pytest.raises(ClientResponseError):
+            await async_call_with_retry(
+                breaker,
+                AsyncMock(side_effect=ClientResponseError(Mock(), (), status=400)),
+            )
+        with pytest.raises(ClientConnectionError):
+            await async_call_with_retry(
+                breaker, AsyncMock(side_effect=ClientConnectionError()), attempts=1
+            )
+        # The failed trial opened the breaker again
+        with pytest.raises(CircuitOpenError):
+            await async_call_with_retry(breaker, AsyncMock())
@@ -0,0 +1,213 @@
+"""Tests for the throttling of SmartThings sensors."""
+from __future__ import annotations
+
+from collections.abc import Callable, Generator
+from datetime import timedelta
+from unittest.mock import patch
+
+from pysmartthings import Attribute, Capability, DeviceEntity
+import pytest
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+
+from homeassistant.const import STATE_UNAVAILABLE, STATE_UNKNOWN
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import entity_registry as er
+import homeassistant.util.dt as dt_util
+
+from custom_components.smartthings.const import (
+    DATA_BROKERS,
+    DOMAIN,
+    CustomAttribute,
+    CustomCapability,
+)
+
+ENTITY_ID = "sensor.thermometer_temperature_measurement"
+
+
+class Clock:
+    """Stand-in for the monotonic clock of the sensors."""
+
+    def __init__(self) -> None:
+        """Create a new clock."""
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture(name="clock")
+def clock_fixture() -> Generator[Clock]:
+    """Patch the clock the sensors throttle with."""
+    clock = Clock()
+    with patch("custom_components.smartthings.sensor.monotonic", clock):
+        yield clock
+
+
+@pytest.fixture(name="thermometer")
+async def thermometer_fixture(
+    hass: HomeAssistant, config_entry, device_factory, smartthings_mock, clock
+) -> DeviceEntity:
+    """Set up the entry with a thermometer that has no temperature yet."""
+    device = device_factory(
+        "Thermometer",
+        {
+            Capability.temperature_measurement: {Attribute.temperature: None},
+            CustomCapability.health_check: {
+                CustomAttribute.device_watch_device_status: "online"
+            },
+        },
+    )
+    smartthings_mock.devices.return_value = [device]
+    config_entry.add_to_hass(hass)
+    with patch("custom_components.smartthings.smartapp_sync_subscriptions"):
+        assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    return device
+
+
+@pytest.fixture(name="report")
+def report_fixture(
+    hass: HomeAssistant, thermometer: DeviceEntity, event_factory
+) -> Callable[..., None]:
+    """Return a function that reports an attribute of the thermometer."""
+    broker = next(iter(hass.data[DOMAIN][DATA_BROKERS].values()))
+
+    def _report(
+        value, capability=Capability.temperature_measurement, attribute=None
+    ) -> None:
+        broker._event_handler(
+            [
+                event_factory(
+                    thermometer,
+                    capability,
+                    attribute or Attribute.temperature,
+                    value,
+                )
+            ]
+        )
+
+    return _report
+
+
+def _state(hass: HomeAssistant) -> str:
+    return hass.states.get(ENTITY_ID).state
+
+
+async def test_first_sample_written(
+    hass: HomeAssistant, thermometer: DeviceEntity, report, clock: Clock
+) -> None:
+    """Test the first value is written right away after an unknown state."""
+    assert _state(hass) == STATE_UNKNOWN
+
+    clock.now += 1
+    report(20.0)
+    assert _state(hass) == "20.0"
+
+
+async def test_deadband(
+    hass: HomeAssistant, thermometer: DeviceEntity, report, clock: Clock
+) -> None:
+    """Test changes within the deadband of the written value are not written."""
+    report(20.0)
+    clock.now += 60
+    report(20.1)
+    assert _state(hass) == "20.0"
+    clock.now += 60
+    report(20.15)
+    assert _state(hass) == "20.0"
+    clock.now += 60
+    report(20.3)
+    assert _state(hass) == "20.3"
+
+
+async def test_min_interval(
+    hass: HomeAssistant, thermometer: DeviceEntity, report, clock: Clock
+) -> None:
+    """Test changes are held back until the minimum interval has passed."""
+    report(20.0)
+    clock.now += 10
+    report(21.0)
+    report(22.0)
+    assert _state(hass) == "20.0"
+
+    clock.now += 20
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=20))
+    await hass.async_block_till_done()
+    assert _state(hass) == "22.0"
+
+
+async def test_max_interval_forces_write(
+    hass: HomeAssistant, thermometer: DeviceEntity, report, clock: Clock
+) -> None:
+    """Test a value within the deadband is written after the maximum interval."""
+    report(20.0)
+    clock.now += 29 * 60
+    report(20.1)
+    assert _state(hass) == "20.0"
+    clock.now += 60
+    report(20.1)
+    assert _state(hass) == "20.1"
+
+
+async def test_unavailable_values_written(
+    hass: HomeAssistant, thermometer: DeviceEntity, report, clock: Clock
+) -> None:
+    """Test missing values and changes of availability are not throttled."""
+    report(20.0)
+    clock.now += 1
+    report(None)
+    assert _state(hass) == STATE_UNKNOWN
+
+    clock.now += 30
+    report(20.0)
+    clock.now += 1
+    report(
+        "offline",
+        CustomCapability.health_check,
+        CustomAttribute.device_watch_device_status,
+    )
+    assert _state(hass) == STATE_UNAVAILABLE
+    clock.now += 1
+    report(
+        "online",
+        CustomCapability.health_check,
+        CustomAttribute.device_watch_device_status,
+    )
+    assert _state(hass) == "20.0"
+
+
+async def test_overrides_set_in_options(
+    hass: HomeAssistant, config_entry, thermometer: DeviceEntity, report, clock: Clock
+) -> None:
+    """Test throttle settings of a sensor are set through the options flow."""
+    with patch.object(hass.config_entries, "async_reload") as reload:
+        # Save the default options first
+        result = await hass.config_entries.options.async_init(config_entry.entry_id)
+        await hass.config_entries.options.async_configure(result["flow_id"], {})
+        await hass.async_block_till_done()
+        reload.reset_mock()
+
+        result = await hass.config_entries.options.async_init(config_entry.entry_id)
+        result = await hass.config_entries.options.async_configure(
+            result["flow_id"], {"throttled_sensor": ENTITY_ID}
+        )
+        assert result["step_id"] == "sensor_throttling"
+        result = await hass.config_entries.options.async_configure(
+            result["flow_id"], {"deadband": 1, "min_interval": 0}
+        )
+        await hass.async_block_till_done()
+
+    assert result["type"] == "create_entry"
+    assert "throttled_sensor" not in config_entry.options
+    reload.assert_not_called()
+    assert er.async_get(hass).async_get(ENTITY_ID).options[DOMAIN] == {
+        "deadband": 1,
+        "min_interval": 0,
+    }
+
+    report(20.0)
+    clock.now += 1
+    report(20.5)
+    assert _state(hass) == "20.0"
+    report(21.5)
+    assert _state(hass) == "21.5"
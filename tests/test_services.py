@@ -0,0 +1,137 @@
+"""Tests for the services of the SmartThings integration."""
+from __future__ import annotations
+
+from http import HTTPStatus
+from typing import Any
+from unittest.mock import Mock, patch
+
+from aiohttp import ClientResponseError
+from pysmartthings import Attribute, Capability
+import pytest
+
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import ServiceValidationError
+from homeassistant.helpers import entity_registry as er
+
+from custom_components.smartthings.const import (
+    DATA_BROKERS,
+    DOMAIN,
+    SERVICE_SEND_COMMAND,
+)
+
+
+@pytest.fixture(name="devices")
+async def devices_fixture(
+    hass: HomeAssistant, config_entry, device_factory, smartthings_mock
+) -> list:
+    """Set up the entry with a sensor in the living room and one elsewhere."""
+    devices = [
+        device_factory("Living Sensor", {Capability.battery: {Attribute.battery: 50}}),
+        device_factory("Other Sensor", {Capability.battery: {Attribute.battery: 50}}),
+    ]
+    devices[1]._room_id = "other"
+    room = Mock(room_id="other")
+    room.name = "Kitchen"
+    smartthings_mock.rooms.return_value.append(room)
+    smartthings_mock.devices.return_value = devices
+    config_entry.add_to_hass(hass)
+    with patch("custom_components.smartthings.smartapp_sync_subscriptions"):
+        assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    return devices
+
+
+async def _post(url: str, data: dict[str, Any]) -> dict[str, Any]:
+    """Reject requests with arguments and accept all others."""
+    if any("arguments" in command for command in data["commands"]):
+        raise ClientResponseError(Mock(), (), status=HTTPStatus.UNPROCESSABLE_ENTITY)
+    return {"results": [{"status": "ACCEPTED"}] * len(data["commands"])}
+
+
+async def test_target_required(hass: HomeAssistant, devices: list) -> None:
+    """Test a command without entities, areas or rooms is not sent."""
+    with patch("custom_components.smartthings.Api.post") as post, pytest.raises(
+        ServiceValidationError
+    ):
+        await hass.services.async_call(
+            DOMAIN,
+            SERVICE_SEND_COMMAND,
+            {"capability": Capability.battery, "command": "refresh"},
+            blocking=True,
+        )
+    post.assert_not_called()
+
+
+async def test_send_to_rooms_and_entities(hass: HomeAssistant, devices: list) -> None:
+    """Test the devices of the targeted rooms and entities receive the command."""
+    living, other = devices
+    with patch("custom_components.smartthings.Api.post", side_effect=_post) as post:
+        response = await hass.services.async_call(
+            DOMAIN,
+            SERVICE_SEND_COMMAND,
+            {
+                "capability": Capability.battery,
+                "command": "refresh",
+                "room": "living room",
+            },
+            blocking=True,
+            return_response=True,
+        )
+        assert response["succeeded"] == 1
+        assert response["failed"] == 0
+        assert list(response["devices"]) == [living.device_id]
+        assert post.call_args[0][0] == f"devices/{living.device_id}/commands"
+
+        entity_id = next(
+            entry.entity_id
+            for entry in er.async_entries_for_config_entry(
+                er.async_get(hass),
+                hass.config_entries.async_entries(DOMAIN)[0].entry_id,
+            )
+            if entry.unique_id.startswith(other.device_id)
+        )
+        response = await hass.services.async_call(
+            DOMAIN,
+            SERVICE_SEND_COMMAND,
+            {
+                "capability": Capability.battery,
+                "command": "refresh",
+                "entity_id": entity_id,
+                "room": ["Living Room"],
+            },
+            blocking=True,
+            return_response=True,
+        )
+    assert response["succeeded"] == 2
+    assert set(response["devices"]) == {living.device_id, other.device_id}
+
+
+async def test_failed_command_keeps_queued_commands(
+    hass: HomeAssistant, devices: list
+) -> None:
+    """Test a rejected service command does not fail commands of entities."""
+    living = devices[0]
+    broker = next(iter(hass.data[DOMAIN][DATA_BROKERS].values()))
+    with patch("custom_components.smartthings.Api.post", side_effect=_post) as post:
+        queued = hass.async_create_task(
+            broker.commands.async_send(
+                living.device_id, "main", Capability.battery, "refresh"
+            )
+        )
+        response = await hass.services.async_call(
+            DOMAIN,
+            SERVICE_SEND_COMMAND,
+            {
+                "capability": Capability.battery,
+                "command": "refresh",
+                "arguments": ["invalid"],
+                "room": "Living Room",
+            },
+            blocking=True,
+            return_response=True,
+        )
+        assert await queued is True
+
+    assert response["failed"] == 1
+    assert not response["devices"][living.device_id]["success"]
+    assert post.call_count == 2
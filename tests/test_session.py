@@ -0,0 +1,20 @@
+"""Tests for the sessions of the SmartThings API."""
+from __future__ import annotations
+
+from custom_components.smartthings.const import API_CONNECTION_LIMIT
+from custom_components.smartthings.session import ApiSession
+
+
+async def test_streams_use_separate_session(threaded_resolver: None) -> None:
+    """Test event streams do not take connections from the API pool."""
+    api_session = ApiSession()
+    stream_session = api_session.stream_session
+
+    assert stream_session is not api_session.session
+    assert api_session.stream_session is stream_session
+    assert api_session.session.connector.limit == API_CONNECTION_LIMIT
+    assert stream_session.connector.limit == 0
+
+    await api_session.async_close()
+    assert api_session.session.closed
+    assert stream_session.closed
@@ -0,0 +1,126 @@
+"""Tests for the webhook ingestion sidecar."""
+from __future__ import annotations
+
+import asyncio
+import json
+from pathlib import Path
+import socket
+import subprocess
+import sys
+from typing import Any
+from unittest.mock import AsyncMock, Mock, patch
+
+from aiohttp import web
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.smartthings import smartapp
+from custom_components.smartthings.const import (
+    DATA_EVENT_ROUTER,
+    DATA_MANAGER,
+    DATA_SIDECAR,
+    DOMAIN,
+)
+from custom_components.smartthings.sidecar import IngestionSidecar
+
+SIDECAR = Path(smartapp.__file__).with_name("sidecar.py")
+
+
+def test_runs_without_home_assistant(tmp_path: Path) -> None:
+    """Test the sidecar script imports neither the package nor Home Assistant."""
+    code = "\n".join(
+        [
+            "import runpy, sys",
+            "sys.argv = ['sidecar', '--help']",
+            "try:",
+            f"    runpy.run_path({str(SIDECAR)!r}, run_name='__main__')",
+            "except SystemExit:",
+            "    pass",
+            "print(sorted({name.split('.')[0] for name in sys.modules}))",
+        ]
+    )
+    result = subprocess.run(
+        [sys.executable, "-P", "-c", code],
+        capture_output=True,
+        check=True,
+        cwd=tmp_path,
+        text=True,
+    )
+    modules = result.stdout.splitlines()[-1]
+    assert "'ingest'" in modules
+    assert "homeassistant" not in modules
+    assert "custom_components" not in modules
+
+
+async def test_invalid_payload_rejected() -> None:
+    """Test payloads without the expected keys are rejected."""
+    sidecar = IngestionSidecar({"path": "/webhook"})
+    sidecar._apps = {"app": "key"}
+    sidecar._writer = Mock()
+
+    async def post(payload: Any) -> web.StreamResponse:
+        request = Mock(headers={}, read=AsyncMock(return_value=json.dumps(payload)))
+        return await sidecar._handle_webhook(request)
+
+    with patch.object(sidecar._verifier, "verify", return_value=True):
+        resp = await post({"lifecycle": "EVENT", "settings": {"appId": "app"}})
+        assert resp.status == 400
+        resp = await post(["EVENT"])
+        assert resp.status == 400
+        resp = await post(
+            {
+                "lifecycle": "EVENT",
+                "settings": {"appId": "app"},
+                "eventData": {
+                    "installedApp": {"installedAppId": "installed"},
+                    "events": [
+                        {
+                            "eventType": "DEVICE_EVENT",
+                            "deviceEvent": {
+                                "eventId": "1",
+                                "locationId": "location",
+                                "deviceId": "device",
+                                "componentId": "main",
+                                "capability": "switch",
+                                "attribute": "switch",
+                                "value": "on",
+                            },
+                        }
+                    ],
+                },
+            }
+        )
+        assert resp.status == 200
+
+    sidecar._flush()
+    message = json.loads(sidecar._writer.write.call_args[0][0])
+    assert message["installed_app_id"] == "installed"
+    assert [record[2] for record in message["events"]] == ["device"]
+
+
+async def test_apps_sent_again_when_registered(
+    hass: HomeAssistant, socket_enabled
+) -> None:
+    """Test the sidecar receives the public keys of apps registered later."""
+    manager = Mock(smartapps={"app1": Mock(public_key="key1")})
+    hass.data[DOMAIN] = {DATA_MANAGER: manager, DATA_EVENT_ROUTER: {}}
+    writers: set[asyncio.StreamWriter] = set()
+    hass.data[DOMAIN][DATA_SIDECAR] = (Mock(), Mock(), writers)
+    sidecar_socket, integration_socket = socket.socketpair()
+    handler = hass.async_create_task(
+        smartapp._async_handle_sidecar(
+            hass, writers, *await asyncio.open_connection(sock=integration_socket)
+        )
+    )
+    reader, writer = await asyncio.open_connection(sock=sidecar_socket)
+
+    assert json.loads(await reader.readline()) == {"apps": {"app1": "key1"}}
+    manager.smartapps["app2"] = Mock(public_key="key2")
+    smartapp.async_update_sidecar_apps(hass)
+    assert json.loads(await reader.readline()) == {
+        "apps": {"app1": "key1", "app2": "key2"}
+    }
+
+    writer.close()
+    await handler
+    assert not writers
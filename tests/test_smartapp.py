@@ -0,0 +1,254 @@
+"""Tests for the SmartApp webhook."""
+from __future__ import annotations
+
+from collections.abc import Generator
+import json
+from typing import Any
+from unittest.mock import AsyncMock, Mock, patch
+
+from pysmartapp.errors import SignatureVerificationError
+from pysmartthings import Attribute, Capability
+import pytest
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.smartthings.const import (
+    DATA_CAPTURE,
+    DATA_EVENT_ROUTER,
+    DATA_MANAGER,
+    DATA_SIGNATURE_VERIFIER,
+    DOMAIN,
+)
+from custom_components.smartthings.smartapp import (
+    ATTRIBUTE_ALL,
+    smartapp_event,
+    smartapp_sync_subscriptions,
+    smartapp_webhook,
+)
+
+
+@pytest.fixture(name="subscriptions_api")
+def subscriptions_api_fixture() -> Generator[Mock]:
+    """Patch the API the subscriptions are synchronized with."""
+    api = Mock()
+    api.subscriptions = AsyncMock(return_value=[])
+    api.create_subscription = AsyncMock()
+    api.delete_subscription = AsyncMock()
+    with patch(
+        "custom_components.smartthings.smartapp.SmartThings", return_value=api
+    ), patch("custom_components.smartthings.smartapp.async_get_api_session"):
+        yield api
+
+
+def _subscription(
+    capability: str, attribute: str, state_change_only: bool = True
+) -> Mock:
+    return Mock(
+        subscription_id=f"{capability}.{attribute}",
+        capability=capability,
+        attribute=attribute,
+        state_change_only=state_change_only,
+    )
+
+
+def _created(api: Mock) -> dict[tuple[str, str], bool]:
+    """Return the created subscriptions and whether they are for changes only."""
+    return {
+        (call[0][0].capability, call[0][0].attribute): call[0][0].state_change_only
+        for call in api.create_subscription.call_args_list
+    }
+
+
+def _deleted(api: Mock) -> set[str]:
+    return {call[0][1] for call in api.delete_subscription.call_args_list}
+
+
+async def _sync(hass: HomeAssistant, targets: dict[str, Any]) -> None:
+    await smartapp_sync_subscriptions(hass, "token", "location", "installed", targets)
+
+
+@pytest.mark.parametrize("verified", [True, False])
+async def test_only_verified_requests_captured(
+    hass: HomeAssistant, verified: bool
+) -> None:
+    """Test requests failing the signature check are not captured."""
+    manager = Mock(smartapps={"app": Mock(public_key="key")})
+    capture = Mock()
+    hass.data[DOMAIN] = {
+        DATA_CAPTURE: capture,
+        DATA_EVENT_ROUTER: {},
+        DATA_MANAGER: manager,
+        DATA_SIGNATURE_VERIFIER: Mock(
+            offload=False, verify=Mock(return_value=verified)
+        ),
+    }
+    payload = {
+        "lifecycle": "EVENT",
+        "settings": {"appId": "app"},
+        "eventData": {"installedApp": {"installedAppId": "installed"}, "events": []},
+    }
+    request = Mock(headers={}, read=AsyncMock(return_value=json.dumps(payload)))
+
+    if verified:
+        resp = await smartapp_webhook(hass, "webhook", request)
+        assert resp.status == 200
+        capture.record.assert_called_once_with({}, payload)
+    else:
+        with pytest.raises(SignatureVerificationError):
+            await smartapp_webhook(hass, "webhook", request)
+        capture.record.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    ("offload", "recently_verified", "offloaded"),
+    [(False, False, False), (True, False, True), (True, True, False)],
+)
+async def test_verification_offloaded(
+    hass: HomeAssistant, offload: bool, recently_verified: bool, offloaded: bool
+) -> None:
+    """Test only requests that were not verified recently leave the loop."""
+    verifier = Mock(
+        offload=offload,
+        is_verified=Mock(return_value=recently_verified),
+        verify=Mock(return_value=True),
+    )
+    hass.data[DOMAIN] = {
+        DATA_EVENT_ROUTER: {},
+        DATA_MANAGER: Mock(smartapps={"app": Mock(public_key="key")}),
+        DATA_SIGNATURE_VERIFIER: verifier,
+    }
+    payload = {
+        "lifecycle": "EVENT",
+        "settings": {"appId": "app"},
+        "eventData": {"installedApp": {"installedAppId": "installed"}, "events": []},
+    }
+
+    with patch.object(
+        hass, "async_add_executor_job", AsyncMock(return_value=True)
+    ) as executor:
+        assert await smartapp_event(hass, payload, {}) == {"eventData": {}}
+
+    if offloaded:
+        executor.assert_awaited_once_with(verifier.verify, "key", {})
+        verifier.verify.assert_not_called()
+    else:
+        executor.assert_not_called()
+        verifier.verify.assert_called_once_with("key", {})
+
+
+async def test_events_routed_to_installed_app(hass: HomeAssistant) -> None:
+    """Test device events only reach the handler of their installed app."""
+    handlers = {"installed": Mock(), "other": Mock()}
+    hass.data[DOMAIN] = {
+        DATA_EVENT_ROUTER: handlers,
+        DATA_MANAGER: Mock(smartapps={"app": Mock(public_key="key")}),
+        DATA_SIGNATURE_VERIFIER: Mock(offload=False, verify=Mock(return_value=True)),
+    }
+    payload = {
+        "lifecycle": "EVENT",
+        "settings": {"appId": "app"},
+        "eventData": {
+            "installedApp": {"installedAppId": "installed"},
+            "events": [
+                {
+                    "eventType": "DEVICE_EVENT",
+                    "deviceEvent": {
+                        "eventId": "1",
+                        "locationId": "location",
+                        "deviceId": "device",
+                        "componentId": "main",
+                        "capability": "switch",
+                        "attribute": "switch",
+                        "value": "on",
+                    },
+                }
+            ],
+        },
+    }
+
+    await smartapp_event(hass, payload, {})
+    payload["eventData"]["installedApp"]["installedAppId"] = "unknown"
+    await smartapp_event(hass, payload, {})
+
+    handlers["installed"].assert_called_once()
+    assert handlers["installed"].call_args[0][0][0].device_id == "device"
+    handlers["other"].assert_not_called()
+
+
+async def test_sync_subscriptions(hass: HomeAssistant, subscriptions_api: Mock) -> None:
+    """Test missing subscriptions are added and unused ones removed."""
+    subscriptions_api.subscriptions.return_value = [
+        _subscription(Capability.switch, Attribute.switch),
+        _subscription(Capability.lock, Attribute.lock),
+    ]
+
+    await _sync(
+        hass,
+        {
+            Capability.switch: {Attribute.switch},
+            Capability.battery: {Attribute.battery},
+            Capability.execute: {Attribute.data},
+            Capability.power_meter: set(),
+        },
+    )
+
+    assert _created(subscriptions_api) == {
+        (Capability.battery, Attribute.battery): True
+    }
+    assert _deleted(subscriptions_api) == {f"{Capability.lock}.{Attribute.lock}"}
+
+
+async def test_sync_unchanged_subscriptions(
+    hass: HomeAssistant, subscriptions_api: Mock
+) -> None:
+    """Test nothing is sent when the subscriptions are up to date."""
+    subscriptions_api.subscriptions.return_value = [
+        _subscription(Capability.switch, Attribute.switch),
+        _subscription(Capability.button, Attribute.button, False),
+    ]
+
+    await _sync(
+        hass,
+        {
+            Capability.switch: {Attribute.switch},
+            Capability.button: {Attribute.button},
+        },
+    )
+
+    subscriptions_api.create_subscription.assert_not_called()
+    subscriptions_api.delete_subscription.assert_not_called()
+
+
+async def test_sync_all_events_capabilities(
+    hass: HomeAssistant, subscriptions_api: Mock
+) -> None:
+    """Test capabilities whose repeated values matter receive all events."""
+    subscriptions_api.subscriptions.return_value = [
+        _subscription(Capability.button, Attribute.button),
+    ]
+
+    await _sync(hass, {Capability.button: {Attribute.button, ATTRIBUTE_ALL}})
+
+    assert _created(subscriptions_api) == {(Capability.button, ATTRIBUTE_ALL): False}
+    assert _deleted(subscriptions_api) == {f"{Capability.button}.{Attribute.button}"}
+
+
+async def test_sync_collapses_over_limit(
+    hass: HomeAssistant, subscriptions_api: Mock
+) -> None:
+    """Test capabilities with the most attributes are subscribed as a whole."""
+    with patch("custom_components.smartthings.smartapp.SUBSCRIPTION_WARNING_LIMIT", 3):
+        await _sync(
+            hass,
+            {
+                Capability.thermostat: {"a", "b", "c"},
+                Capability.color_control: {Attribute.hue, Attribute.saturation},
+                Capability.switch: {Attribute.switch},
+            },
+        )
+
+    assert _created(subscriptions_api) == {
+        (Capability.thermostat, ATTRIBUTE_ALL): True,
+        (Capability.color_control, ATTRIBUTE_ALL): True,
+        (Capability.switch, Attribute.switch): True,
+    }
@@ -0,0 +1,188 @@
+"""Tests for the server-sent events transport."""
+from __future__ import annotations
+
+from collections.abc import AsyncIterator
+import json
+from typing import Any
+from unittest.mock import AsyncMock, Mock, patch
+
+from aiohttp import ClientConnectionError, ClientResponseError
+import pytest
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.smartthings.stream import SmartThingsEventStream
+
+API_BASE = "https://api.test/"
+
+
+class StreamDone(Exception):
+    """Raised by the stand-in once all responses were served."""
+
+
+class FakeResponse:
+    """Stand-in for a response of the SmartThings API."""
+
+    def __init__(
+        self, status: int = 200, body: Any = None, lines: list[str] | None = None
+    ) -> None:
+        """Create a new response."""
+        self.status = status
+        self._body = body
+        self._lines = lines or []
+
+    async def __aenter__(self) -> FakeResponse:
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        return None
+
+    def raise_for_status(self) -> None:
+        if self.status >= 400:
+            raise ClientResponseError(Mock(), (), status=self.status)
+
+    async def read(self) -> bytes:
+        return json.dumps(self._body).encode()
+
+    @property
+    def content(self) -> AsyncIterator[bytes]:
+        async def lines() -> AsyncIterator[bytes]:
+            for line in self._lines:
+                yield f"{line}\n".encode()
+
+        return lines()
+
+
+class FakeSession:
+    """Stand-in for the client session that serves responses in order."""
+
+    def __init__(self, posts: list[Any], gets: list[Any]) -> None:
+        """Create a new session."""
+        self._responses = {"post": posts, "get": gets}
+        self.calls: list[tuple[str, str, dict[str, str]]] = []
+
+    def _request(self, method: str, url: str, headers: dict[str, str]) -> Any:
+        self.calls.append((method, url, headers))
+        if not self._responses[method]:
+            raise StreamDone
+        response = self._responses[method].pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    def post(self, url: str, *, headers: dict[str, str], **kwargs: Any) -> Any:
+        return self._request("post", url, headers)
+
+    def get(self, url: str, *, headers: dict[str, str], **kwargs: Any) -> Any:
+        return self._request("get", url, headers)
+
+
+def _subscribed(url: str) -> FakeResponse:
+    return FakeResponse(body={"registrationUrl": url})
+
+
+def _message(event_id: str, value: str) -> list[str]:
+    data = {
+        "event": {
+            "eventType": "DEVICE_EVENT",
+            "deviceEvent": {
+                "eventId": event_id,
+                "locationId": "location",
+                "deviceId": "device",
+                "componentId": "main",
+                "capability": "switch",
+                "attribute": "switch",
+                "value": value,
+            },
+        }
+    }
+    return [f"id: {event_id}", f"data: {json.dumps(data)}", ""]
+
+
+def _create_stream(
+    hass: HomeAssistant, session: FakeSession, tokens: list[str] | None = None
+) -> tuple[SmartThingsEventStream, Mock, AsyncMock]:
+    tokens = tokens or ["token"]
+    handler = Mock()
+
+    async def refresh_token(expired_token: str) -> None:
+        tokens.pop(0)
+
+    refresh = AsyncMock(side_effect=refresh_token)
+    stream = SmartThingsEventStream(
+        hass,
+        session,
+        "location",
+        "installed",
+        lambda: tokens[0],
+        refresh,
+        handler,
+        api_base=API_BASE,
+    )
+    return stream, handler, refresh
+
+
+async def _run(stream: SmartThingsEventStream) -> None:
+    with patch(
+        "custom_components.smartthings.stream.RECONNECT_MIN_INTERVAL", 0
+    ), pytest.raises(StreamDone):
+        await stream._async_run()
+
+
+async def test_reconnect_resumes_from_last_event(hass: HomeAssistant) -> None:
+    """Test a lost stream reconnects and resumes after the last event."""
+    session = FakeSession(
+        [_subscribed("https://stream.test/1")],
+        [
+            FakeResponse(lines=[": keep-alive", "", *_message("1", "on")]),
+            ClientConnectionError(),
+            FakeResponse(lines=_message("2", "off")),
+        ],
+    )
+    stream, handler, _ = _create_stream(hass, session)
+
+    await _run(stream)
+
+    assert [call[0][0][0].value for call in handler.call_args_list] == ["on", "off"]
+    gets = [headers for method, _, headers in session.calls if method == "get"]
+    assert "Last-Event-ID" not in gets[0]
+    assert gets[1]["Last-Event-ID"] == "1"
+    assert gets[2]["Last-Event-ID"] == "1"
+    assert gets[3]["Last-Event-ID"] == "2"
+    assert [method for method, _, _ in session.calls].count("post") == 1
+
+
+async def test_unauthorized_refreshes_token(hass: HomeAssistant) -> None:
+    """Test a rejected token is refreshed once and the stream retried."""
+    session = FakeSession(
+        [_subscribed("https://stream.test/1")],
+        [FakeResponse(status=401), FakeResponse()],
+    )
+    stream, _, refresh = _create_stream(hass, session, ["expired", "fresh"])
+
+    await _run(stream)
+
+    refresh.assert_awaited_once_with("expired")
+    gets = [headers for method, _, headers in session.calls if method == "get"]
+    assert gets[0]["Authorization"] == "Bearer expired"
+    assert gets[1]["Authorization"] == "Bearer fresh"
+
+
+@pytest.mark.parametrize("status", [404, 410])
+async def test_expired_subscription_recreated(hass: HomeAssistant, status: int) -> None:
+    """Test a subscription that is gone is created again."""
+    session = FakeSession(
+        [_subscribed("https://stream.test/1"), _subscribed("https://stream.test/2")],
+        [FakeResponse(status=status), FakeResponse()],
+    )
+    stream, _, _ = _create_stream(hass, session)
+
+    await _run(stream)
+
+    assert [(method, url) for method, url, _ in session.calls] == [
+        ("post", f"{API_BASE}subscriptions"),
+        ("get", "https://stream.test/1"),
+        ("post", f"{API_BASE}subscriptions"),
+        ("get", "https://stream.test/2"),
+        ("get", "https://stream.test/2"),
+    ]